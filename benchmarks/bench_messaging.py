@@ -0,0 +1,38 @@
+"""
+Measures clickio message throughput through the threadsafe message router.
+
+    python benchmarks/bench_messaging.py [N_MESSAGES]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from clickio.msgevent import OutputConfig, OutputModeConfig
+from clickio.output import echo_info, setup_messaging, teardown_messaging
+
+
+def bench(destination: str, n: int, batch_size: int) -> float:
+    mode = OutputModeConfig(info=destination, out=destination, err=destination)
+    conf = OutputConfig(non_interactive=mode, interactive=mode)
+    setup_messaging(threadsafe=True, conf=conf, batch_size=batch_size, flush_interval=0.05)
+    start = time.perf_counter()
+    for i in range(n):
+        echo_info(f"item {i}: synced")
+    teardown_messaging()
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    with tempfile.TemporaryDirectory() as tmp:
+        for destination in [os.path.join(tmp, "out.txt"), f"console[{os.path.join(tmp, 'c.txt')}]"]:
+            label = "console" if destination.startswith("console") else "file"
+            for batch_size in [1, 256]:
+                rate = bench(destination, n, batch_size)
+                print(f"{label:8} batch_size={batch_size:<4} {rate:>12,.0f} messages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares parsing op item output in-process and in a process pool.
+
+    python benchmarks/bench_parsing.py [N_ITEMS] [WORKERS]
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from onepassvault.opw.client import DETAILS_CHUNK_SIZE, parse_items
+from onepassvault.opw.schema import OpItem
+
+
+def make_chunk(start: int, n: int, n_fields: int = 40) -> bytes:
+    items = [
+        {
+            "id": f"item{i}",
+            "title": f"Item {i}",
+            "version": 1,
+            "category": "LOGIN",
+            "vault": {"id": "vault1", "name": "Vault"},
+            "fields": [
+                {"id": f"f{j}", "label": f"field {j}", "type": "CONCEALED", "value": "x" * 64}
+                for j in range(n_fields)
+            ],
+        }
+        for i in range(start, start + n)
+    ]
+    return "\n".join(json.dumps(item, indent=2) for item in items).encode("utf-8")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    chunks = [make_chunk(i, DETAILS_CHUNK_SIZE) for i in range(0, n, DETAILS_CHUNK_SIZE)]
+
+    start = time.perf_counter()
+    items = [OpItem.from_parsed(*parsed) for chunk in chunks for parsed in parse_items(chunk)]
+    elapsed = time.perf_counter() - start
+    print(f"in-process         {len(items) / elapsed:>10,.0f} items/s")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pool.submit(int).result()  # Start the workers before timing
+        start = time.perf_counter()
+        items = [
+            OpItem.from_parsed(*parsed)
+            for result in pool.map(parse_items, chunks)
+            for parsed in result
+        ]
+        elapsed = time.perf_counter() - start
+    print(f"{workers:>2} worker processes {len(items) / elapsed:>10,.0f} items/s")
+
+
+if __name__ == "__main__":
+    main()
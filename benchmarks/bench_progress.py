@@ -0,0 +1,46 @@
+"""
+Measures the cost of Stage.advance, the per-item call made by workers, against
+a bare loop, with and without a Progress rendering in the background.
+
+    python benchmarks/bench_progress.py [N_ITEMS] [THREADS]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from clickio.output import setup_messaging, teardown_messaging
+from clickio.progress import Progress
+
+
+def bench(n: int, threads: int, advance: bool) -> float:
+    with Progress(interactive=False, summary_interval=0.5) as progress:
+        stage = progress.stage("fetch")
+        stage.start(total=n * threads)
+
+        def work(_):
+            for _ in range(n):
+                if advance:
+                    stage.advance()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(work, range(threads)))
+        return time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    setup_messaging(threadsafe=True)
+    try:
+        bare = bench(n, threads, advance=False)
+        advanced = bench(n, threads, advance=True)
+    finally:
+        teardown_messaging()
+    per_call = (advanced - bare) / (n * threads) * 1e9
+    print(f"{n * threads:,} advance() calls on {threads} threads: {per_call:.0f}ns per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Runs the push sync engine against synthetic fixtures served by the fake op CLI
+and the Vault stub, at increasing item counts.
+
+    PYTHONPATH=. python benchmarks/bench_sync.py [N_ITEMS ...] [--fetch-workers N]
+
+Each size is pushed twice: a cold run writing every item, and a warm run where
+every item is unchanged. Pre-existing KV secrets (half as many as items) are
+spread at various path depths.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from onepassvault.opw import OnePassword
+from onepassvault.sync import push
+from onepassvault.vault import VaultClientConfig, open_vault
+from tests.fakes.generate import LoadProfile, generate_items, generate_kv_secrets, populate_kv
+from tests.fakes.op import install_fake_op
+from tests.fakes.vault import VaultStub
+
+
+def run(n: int, fetch_workers: int, profile: LoadProfile):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        items, documents = generate_items(n, profile)
+        op_exe = install_fake_op(Path(tmp), items, documents)
+        stub = VaultStub().start()
+        populate_kv(stub.kv(), generate_kv_secrets(n // 2, profile))
+        setup = time.perf_counter() - start
+        try:
+            op = OnePassword(op_executable=str(op_exe), fetch_workers=fetch_workers)
+            client = open_vault(VaultClientConfig(url=stub.url, token=stub.token, timeout=60))
+            for run_name in ("cold", "warm"):
+                stub.requests.clear()
+                start = time.perf_counter()
+                summary = push(op, client, mount_point="secret", prefix="bench")
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{n:>7} items {run_name}  {elapsed:8.2f}s {n / elapsed:>8,.0f} items/s"
+                    f"  {sum(stub.requests.values()):>7} Vault requests  ({summary})"
+                )
+            op.close()
+        finally:
+            stub.stop()
+        print(f"{n:>7} items setup {setup:8.2f}s ({len(documents)} documents)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=[1_000, 10_000, 100_000])
+    parser.add_argument("--fetch-workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # Keep large documents rare, so that 100k items fit in memory
+    profile = LoadProfile(
+        seed=args.seed, document_sizes={1024: 70, 16 * 1024: 25, 256 * 1024: 4, 1024 * 1024: 1}
+    )
+    for n in args.sizes:
+        run(n, args.fetch_workers, profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,15 @@
+import base64
+import json
 import queue
 import re
 import sys
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum, IntEnum
 from threading import Thread
 from typing import Any, Dict, List, Optional
 
-from rich.console import Console
-from rich.text import Text
-
 from .core import get_verbosity, is_interactive
 
 
@@ -20,6 +20,17 @@ class MessageBodyType(IntEnum):
     RICH = 3
 
 
+# CSI sequences (colors, cursor moves) and OSC sequences (hyperlinks, titles)
+RE_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]|\x1b\].*?(?:\x07|\x1b\\)")
+
+
+def _is_rich_text(data: Any) -> bool:
+    # rich is imported lazily, if Text was never defined data cannot be a Text.
+    # The module may be partially initialized while another thread imports it.
+    text_cls = getattr(sys.modules.get("rich.text"), "Text", None)
+    return text_cls is not None and isinstance(data, text_cls)
+
+
 @dataclass
 class MessageBody:
     data: Any
@@ -41,12 +52,12 @@ class MessageBody:
         elif self.type == MessageBodyType.BYTES:
             raise TypeError("binary message cannot be converted to str safely")
         elif self.type == MessageBodyType.ANSI:
-            return str(Text.from_ansi(self.data))
+            return RE_ANSI_ESCAPE.sub("", self.data)
         elif self.type == MessageBodyType.RICH:
             return str(self.data)
 
     def __post_init__(self):
-        if isinstance(self.data, Text):
+        if _is_rich_text(self.data):
             self.type = MessageBodyType.RICH
         elif isinstance(self.data, bytes):
             self.type = MessageBodyType.BYTES
@@ -78,6 +89,7 @@ class Message:
     body: Optional[MessageBody] = None
     newline: bool = True
     verbosity: int = 0
+    timestamp: float = field(default_factory=time.time)
 
 
 class ByteWriteError(Exception):
@@ -93,15 +105,31 @@ class MessageWriter(ABC):
     def writes_bytes(self) -> bool:
         pass
 
+    def write_batch(self, messages: List[Message]):
+        for message in messages:
+            self.write(message)
+
 
 class ConsoleWriter(MessageWriter):
     def __init__(self, stream):
-        self.console = Console(file=stream)
+        self.stream = stream
+        self._console = None
+
+    @property
+    def console(self):
+        # Importing rich is slow, only pay for it once something is printed
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console(file=self.stream)
+        return self._console
 
     def writes_bytes(self) -> bool:
         return False
 
     def write(self, message: Message):
+        from rich.text import Text
+
         nl = "\n" if message.newline else ""
         if message.body.type == MessageBodyType.BYTES:
             raise ByteWriteError(str(self))
@@ -110,6 +138,11 @@ class ConsoleWriter(MessageWriter):
         else:
             self.console.print(message.body.data, end=nl)
 
+    def write_batch(self, messages: List[Message]):
+        # The console buffers everything printed in its context and writes it once on exit
+        with self.console:
+            super().write_batch(messages)
+
 
 class TextIOWriter(MessageWriter):
     def __init__(self, stream, flush=True):
@@ -135,8 +168,76 @@ class TextIOWriter(MessageWriter):
         if self.flush:
             self.stream.flush()
 
+    def write_batch(self, messages: List[Message]):
+        "Coalesces consecutive text or bytes messages into a single write, flushes once."
+        chunks = []
+        chunks_are_bytes = False
+        for message in messages:
+            is_bytes = message.body.is_bytes()
+            if chunks and is_bytes != chunks_are_bytes:
+                self._write_chunks(chunks, chunks_are_bytes)
+                chunks = []
+            chunks_are_bytes = is_bytes
+            if is_bytes:
+                chunks.append(message.body.data)
+                if message.newline:
+                    chunks.append(b"\n")
+            else:
+                chunks.append(str(message.body))
+                if message.newline:
+                    chunks.append("\n")
+        if chunks:
+            self._write_chunks(chunks, chunks_are_bytes)
+
+        if self.flush:
+            self.stream.flush()
+
+    def _write_chunks(self, chunks: list, is_bytes: bool):
+        if is_bytes:
+            try:
+                self.stream.buffer.write(b"".join(chunks))
+            except AttributeError:
+                raise ByteWriteError(str(self))
+        else:
+            self.stream.write("".join(chunks))
+
+
+class JsonlWriter(MessageWriter):
+    "Writes each message as one JSON object per line, for machine consumers."
+
+    def __init__(self, stream, flush=True):
+        self.stream = stream
+        self.flush = flush
+
+    def writes_bytes(self) -> bool:
+        return True
+
+    @staticmethod
+    def to_json(message: Message) -> str:
+        record = {
+            "intent": message.intent.name.lower(),
+            "verbosity": message.verbosity,
+            "timestamp": message.timestamp,
+        }
+        if message.body.is_bytes():
+            record["body_base64"] = base64.b64encode(message.body.data).decode("ascii")
+        else:
+            record["body"] = str(message.body)
+        return json.dumps(record)
+
+    def write(self, message: Message):
+        self.write_batch([message])
+
+    def write_batch(self, messages: List[Message]):
+        self.stream.write("".join(self.to_json(message) + "\n" for message in messages))
+        if self.flush:
+            self.stream.flush()
+
 
 class NullWriter(MessageWriter):
+    def writes_bytes(self) -> bool:
+        return True
+
     def write(self, message: Message):
         pass
 
@@ -149,6 +250,10 @@ class MessageSender(ABC):
     def finish(self) -> None:
         pass
 
+    def console(self, intent: Intent) -> Optional[Any]:
+        "Returns the rich Console that messages of intent are printed on, if any."
+        return None
+
 
 def open_file(name: str):
     if name == "stdout":
@@ -161,10 +266,12 @@ def open_file(name: str):
 
 def make_writer(destination: str) -> List[MessageWriter]:
     if destination == "null":
-        return [NullWriter]
+        return [NullWriter()]
     elif m := re.match(r"console\[(.*)\]$", destination):
         file = open_file(m.group(1))
         return [ConsoleWriter(file), TextIOWriter(file)]
+    elif m := re.match(r"jsonl\[(.*)\]$", destination):
+        return [JsonlWriter(open_file(m.group(1)))]
     else:
         return [TextIOWriter(open_file(destination))]
 
@@ -178,15 +285,19 @@ class OutputModeConfig:
 
 @dataclass
 class OutputConfig:
-    non_interactive: OutputModeConfig = OutputModeConfig(
-        info="console[stderr]",
-        out="console[stdout]",
-        err="console[stderr]",
+    non_interactive: OutputModeConfig = field(
+        default_factory=lambda: OutputModeConfig(
+            info="console[stderr]",
+            out="console[stdout]",
+            err="console[stderr]",
+        )
     )
-    interactive: OutputModeConfig = OutputModeConfig(
-        info="console[stdout]",
-        out="console[stdout]",
-        err="console[stderr]",
+    interactive: OutputModeConfig = field(
+        default_factory=lambda: OutputModeConfig(
+            info="console[stdout]",
+            out="console[stdout]",
+            err="console[stderr]",
+        )
     )
 
 
@@ -204,18 +315,45 @@ class MessageRouter(MessageSender):
         self.verbosity = get_verbosity()
         self.writers = make_writers(conf)
 
-    def send(self, message: Message):
+    def _select_writer(self, message: Message) -> Optional[MessageWriter]:
         if message.verbosity > self.verbosity:
-            return
+            return None
         if message.body is None:
-            return
+            return None
 
         for writer in self.writers[message.intent]:
             if message.body.is_bytes() and not writer.writes_bytes():
                 continue
             else:
-                writer.write(message)
-                break
+                return writer
+        return None
+
+    def send(self, message: Message):
+        writer = self._select_writer(message)
+        if writer is not None:
+            writer.write(message)
+
+    def console(self, intent: Intent) -> Optional[Any]:
+        for writer in self.writers[intent]:
+            if isinstance(writer, ConsoleWriter):
+                return writer.console
+        return None
+
+    def send_batch(self, messages: List[Message]):
+        "Sends messages in order, runs of messages for the same writer are written together."
+        run: List[Message] = []
+        run_writer = None
+        for message in messages:
+            writer = self._select_writer(message)
+            if writer is None:
+                continue
+            if writer is not run_writer and run:
+                run_writer.write_batch(run)
+                run = []
+            run_writer = writer
+            run.append(message)
+        if run:
+            run_writer.write_batch(run)
 
 
 class MessageQueue(MessageSender):
@@ -226,30 +364,74 @@ class MessageQueue(MessageSender):
     def send(self, message: Message):
         self.q.put(message)
 
+    def console(self, intent: Intent) -> Optional[Any]:
+        # rich Consoles are thread-safe, so the worker's console can be shared
+        return self.t.console(intent)
+
     def finish(self):
         self.q.put(None)
         self.t.join()
 
 
 class MessageRouterWorker(MessageRouter, Thread):
-    def __init__(self, q: queue.SimpleQueue, conf: OutputConfig):
+    """
+    Routes messages from a queue in a background thread.
+
+    With batch_size > 1, the worker drains up to batch_size queued messages
+    (waiting at most flush_interval seconds for more to arrive) and writes them
+    with one buffered write and flush per writer, instead of one per message.
+    """
+
+    def __init__(
+        self,
+        q: queue.SimpleQueue,
+        conf: OutputConfig,
+        batch_size: int = 1,
+        flush_interval: float = 0.0,
+    ):
         super().__init__(conf)
         Thread.__init__(self)
         self.q = q
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+
+    def _next_batch(self) -> List[Optional[Message]]:
+        batch = [self.q.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(self.q.get_nowait())
+            except queue.Empty:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.q.get(timeout=timeout))
+                except queue.Empty:
+                    break
+        return batch
 
     def run(self):
         while True:
-            message = self.q.get()
-            if message is None:
+            batch = self._next_batch()
+            if batch[-1] is None:
+                self.send_batch(batch[:-1])
                 return
+            elif self.batch_size == 1:
+                self.send(batch[0])
             else:
-                self.send(message)
+                self.send_batch(batch)
 
 
-def init_sender(threadsafe: bool, conf: OutputConfig) -> MessageSender:
+def init_sender(
+    threadsafe: bool,
+    conf: OutputConfig,
+    batch_size: int = 1,
+    flush_interval: float = 0.0,
+) -> MessageSender:
     if threadsafe:
         q = queue.SimpleQueue()
-        worker = MessageRouterWorker(q, conf)
+        worker = MessageRouterWorker(q, conf, batch_size=batch_size, flush_interval=flush_interval)
         worker.start()
         sender = MessageQueue(q, worker)
         return sender
@@ -35,3 +35,36 @@ def option_interactive(f):
         return f(**kwargs)
 
     return wrapped
+
+
+def option_profile(f):
+    @click.option(
+        "--profile",
+        "profile_path",
+        type=click.Path(dir_okay=False),
+        help="Profile the command with cProfile, writing pstats to this file.",
+    )
+    @click.option(
+        "--trace-memory",
+        "trace_memory_path",
+        type=click.Path(dir_okay=False),
+        help="Trace memory allocations, writing the top allocation sites to this file.",
+    )
+    @functools.wraps(f)
+    def wrapped(**kwargs):
+        profile_path = kwargs.pop("profile_path")
+        trace_memory_path = kwargs.pop("trace_memory_path")
+        if not (profile_path or trace_memory_path):
+            return f(**kwargs)
+        from .profiling import CommandProfiler
+
+        profiler = CommandProfiler(profile_path, trace_memory_path)
+        profiler.start()
+        try:
+            return f(**kwargs)
+        finally:
+            # Stopped when the context closes, so that subcommands of a group are profiled too.
+            # Registered after f runs, so that it runs before the close callbacks of f.
+            click.get_current_context().call_on_close(profiler.stop)
+
+    return wrapped
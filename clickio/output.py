@@ -1,40 +1,101 @@
 import signal
 import sys
-from typing import Callable, List
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
 
+from .core import get_verbosity
 from .msgevent import Intent, Message, MessageBody, OutputConfig, init_sender
 
-try:
-    import colorama
+_sender = None
 
-    colorama.just_fix_windows_console()
-except ImportError:
-    pass
 
+def _fix_windows_console():
+    if sys.platform != "win32":
+        return
+    try:
+        import colorama
 
-_sender = None
+        colorama.just_fix_windows_console()
+    except ImportError:
+        pass
 
 
-def setup_messaging(threadsafe: bool = False, conf=OutputConfig()):
+def setup_messaging(
+    threadsafe: bool = False,
+    conf=OutputConfig(),
+    batch_size: int = 1,
+    flush_interval: float = 0.0,
+):
+    """
+    Initializes message routing, must be called before any echo function.
+
+    With threadsafe=True, messages are written from a background thread. Setting
+    batch_size > 1 then lets that thread coalesce up to batch_size messages per
+    write, holding output back for at most flush_interval seconds.
+    """
     global _sender
     if _sender is not None:
         raise Exception("init_messaging must only be called once")
-    _sender = init_sender(threadsafe, conf)
+    _fix_windows_console()
+    _sender = init_sender(threadsafe, conf, batch_size=batch_size, flush_interval=flush_interval)
+
+
+_shutdown_hooks: List[Callable[[], None]] = []
+
 
+def add_shutdown_hook(func: Callable[[], None]):
+    "Registers a function called on SIGINT or SIGTERM, before messaging is torn down."
+    _shutdown_hooks.append(func)
+
+
+def remove_shutdown_hook(func: Callable[[], None]):
+    if func in _shutdown_hooks:
+        _shutdown_hooks.remove(func)
+
+
+def _run_shutdown_hooks():
+    for func in reversed(_shutdown_hooks):
+        try:
+            func()
+        except Exception as e:
+            print(f"Shutdown hook {func} failed: {e}", file=sys.stderr)
+
+
+def install_signal_handlers(exit_on_sigterm: bool = True):
+    """
+    Runs the shutdown hooks on SIGINT and SIGTERM, then tears down messaging and
+    exits. With exit_on_sigterm=False, SIGTERM only runs the hooks, which are
+    then responsible for stopping the program gracefully.
+    """
 
-def install_signal_handlers():
     def _handle_sigint(signum, frame):
+        _run_shutdown_hooks()
         teardown_messaging()
         raise KeyboardInterrupt()
 
     def _handle_sigterm(signum, frame):
-        teardown_messaging()
-        sys.exit(0)
+        _run_shutdown_hooks()
+        if exit_on_sigterm:
+            teardown_messaging()
+            sys.exit(0)
 
     signal.signal(signal.SIGINT, _handle_sigint)
     signal.signal(signal.SIGTERM, _handle_sigterm)
 
 
+@contextmanager
+def signal_handlers(exit_on_sigterm: bool = True) -> Iterator[None]:
+    "Installs the signal handlers for the duration of the block, then restores the previous ones."
+    previous = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+    install_signal_handlers(exit_on_sigterm)
+    try:
+        yield
+    finally:
+        for sig, handler in previous.items():
+            # None means the handler was not installed from Python
+            signal.signal(sig, handler if handler is not None else signal.SIG_DFL)
+
+
 def teardown_messaging():
     global _sender
     if _sender is not None:
@@ -42,6 +103,15 @@ def teardown_messaging():
     _sender = None
 
 
+def get_console(intent: Intent = Intent.INFO):
+    """
+    Returns the rich Console that messages of intent are printed on, or None if
+    they are not printed on a console (or messaging is not set up). Live displays
+    should render on it, so that messages printed meanwhile appear above them.
+    """
+    return _sender.console(intent) if _sender is not None else None
+
+
 def send_message(message: Message):
     global _sender
     if _sender is None:
@@ -52,6 +122,8 @@ def send_message(message: Message):
 
 Hook = Callable[[Message], Message]
 
+Printable = bytes | str | Callable[[], bytes | str]
+
 
 def _apply_hooks(hooks: List[Hook], message: str) -> str:
     for func in hooks:
@@ -67,7 +139,15 @@ def install_info_hook(func: Hook):
     _info_hooks.append(func)
 
 
-def echo_info(message: bytes | str, verbosity=0, nl=True):
+def _resolve(message: Printable, args: tuple) -> bytes | str:
+    if callable(message):
+        message = message()
+    if args:
+        message = message % args
+    return message
+
+
+def echo_info(message: Printable, verbosity=0, nl=True, args: tuple = ()):
     """
     Prints a non-error message intended for humans.
 
@@ -77,27 +157,36 @@ def echo_info(message: bytes | str, verbosity=0, nl=True):
 
     In non-interactive mode, echo_info prints to stderr, so that the message
     does not interfere with machine-parseable outputs (e.g. JSON).
+
+    Messages above the current verbosity are dropped before anything is built,
+    so message can be a callable, or a %-format string with args, to defer the
+    cost of formatting to when the message is actually printed.
     """
+    if verbosity > get_verbosity():
+        return
     message = Message(
-        intent=Intent.INFO, body=MessageBody(message), newline=nl, verbosity=verbosity
+        intent=Intent.INFO,
+        body=MessageBody(_resolve(message, args)),
+        newline=nl,
+        verbosity=verbosity,
     )
     message = _apply_hooks(_info_hooks, message)
     send_message(message)
 
 
-def echo_info_v(message: bytes | str, nl=True):
+def echo_info_v(message: Printable, nl=True, args: tuple = ()):
     "echo_info with verbosity=1"
-    echo_info(message, 1, nl)
+    echo_info(message, 1, nl, args)
 
 
-def echo_info_vv(message: bytes | str, nl=True):
+def echo_info_vv(message: Printable, nl=True, args: tuple = ()):
     "echo_info with verbosity=2"
-    echo_info(message, 2, nl)
+    echo_info(message, 2, nl, args)
 
 
-def echo_info_vvv(message: bytes | str, nl=True):
+def echo_info_vvv(message: Printable, nl=True, args: tuple = ()):
     "echo_info with verbosity=3"
-    echo_info(message, 3, nl)
+    echo_info(message, 3, nl, args)
 
 
 _out_hooks: List[Hook] = []
@@ -108,13 +197,15 @@ def install_out_hook(func: Hook):
     _out_hooks.append(func)
 
 
-def echo_out(message="", nl=True):
+def echo_out(message: Printable = "", nl=True):
     """
     Prints a message to stdout.
 
     Supports click.style, and style markup if rich is installed.
     """
-    message = Message(intent=Intent.OUT, body=MessageBody(message), newline=nl, verbosity=0)
+    message = Message(
+        intent=Intent.OUT, body=MessageBody(_resolve(message, ())), newline=nl, verbosity=0
+    )
     message = _apply_hooks(_out_hooks, message)
     send_message(message)
 
@@ -127,12 +218,14 @@ def install_err_hook(func: Hook):
     _err_hooks.append(func)
 
 
-def echo_err(message="", nl=True):
+def echo_err(message: Printable = "", nl=True):
     """
     Prints a message to stderr.
 
     Supports click.style, and style markup if rich is installed.
     """
-    message = Message(intent=Intent.ERR, body=MessageBody(message), newline=nl, verbosity=0)
+    message = Message(
+        intent=Intent.ERR, body=MessageBody(_resolve(message, ())), newline=nl, verbosity=0
+    )
     message = _apply_hooks(_err_hooks, message)
     send_message(message)
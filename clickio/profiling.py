@@ -0,0 +1,106 @@
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+from typing import List, Optional
+
+from .output import echo_info
+
+DEFAULT_SUMMARY_SIZE = 5
+DEFAULT_REPORT_SIZE = 50
+TRACEMALLOC_FRAMES = 10
+
+
+class CommandProfiler:
+    """
+    Profiles a command run with cProfile and/or tracemalloc.
+
+    With profile_path, cProfile stats are written there in the pstats format
+    (e.g. for snakeviz or python -m pstats). With trace_memory_path, a report of
+    the top allocation sites is written there. A short summary of both is
+    printed with echo_info when the profiler is stopped. The memory report lists
+    the allocations still alive at that point, and the peak traced size.
+
+    cProfile only profiles the thread that started it; time spent waiting on
+    worker threads shows up in the calls that wait for them.
+    """
+
+    def __init__(
+        self,
+        profile_path: Optional[str] = None,
+        trace_memory_path: Optional[str] = None,
+        summary_size: int = DEFAULT_SUMMARY_SIZE,
+    ):
+        self.profile_path = profile_path
+        self.trace_memory_path = trace_memory_path
+        self.summary_size = summary_size
+        self._profiler: Optional[cProfile.Profile] = None
+
+    def start(self):
+        if self.trace_memory_path:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        if self.profile_path:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+        # Snapshot memory before the profile stats are built, they are not part of the run
+        if self.trace_memory_path and tracemalloc.is_tracing():
+            self._report_memory()
+            tracemalloc.stop()
+        if self._profiler is not None:
+            self._profiler.dump_stats(self.profile_path)
+            self._report_profile()
+            self._profiler = None
+
+    def _report_profile(self):
+        stats = pstats.Stats(self._profiler)
+        lines = [
+            f"Profile written to {self.profile_path}, hot spots by cumulative time:",
+            f"  {'cum (s)':>8} {'own (s)':>8} {'calls':>7}  function",
+        ]
+        entries = sorted(stats.stats.items(), key=lambda e: e[1][3], reverse=True)
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in self._top(entries):
+            location = f"{os.path.basename(filename)}:{line}"
+            lines.append(f"  {cumtime:8.3f} {tottime:8.3f} {ncalls:>7}  {func} {location}")
+        echo_info("\n".join(lines))
+
+    def _top(self, entries: List) -> List:
+        # Skip the profiler's own frames and the click machinery wrapping the command
+        skip = ("cProfile", "click/", "clickio/profiling.py", "{built-in method builtins.exec}")
+        top = []
+        for entry in entries:
+            (filename, _, func), _ = entry
+            if not any(s in filename or s == func for s in skip):
+                top.append(entry)
+            if len(top) == self.summary_size:
+                break
+        return top
+
+    def _report_memory(self):
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        statistics = snapshot.statistics("lineno")
+
+        report = io.StringIO()
+        report.write(f"Current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+        report.write("Top allocation sites:\n")
+        for stat in statistics[:DEFAULT_REPORT_SIZE]:
+            report.write(f"{stat}\n")
+        report.write("\nTracebacks of the top allocation sites:\n")
+        for stat in snapshot.statistics("traceback")[: self.summary_size]:
+            report.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            report.write("\n".join(stat.traceback.format()) + "\n")
+        with open(self.trace_memory_path, "w") as f:
+            f.write(report.getvalue())
+
+        lines = [
+            f"Memory report written to {self.trace_memory_path},"
+            f" peak {peak / 1024:.1f} KiB, top allocations:"
+        ]
+        for stat in statistics[: self.summary_size]:
+            lines.append(f"  {stat}")
+        echo_info("\n".join(lines))
@@ -0,0 +1,198 @@
+import sys
+import time
+from threading import Event, Lock, Thread, local
+from typing import Dict, Iterable, List, Optional
+
+from .core import is_interactive
+from .msgevent import Intent
+from .output import echo_info, get_console
+
+
+class Counter:
+    """
+    A counter that can be incremented from many threads without locking.
+
+    Each thread increments its own cell; reading the value sums the cells. Only
+    the first increment from a new thread takes a lock.
+    """
+
+    def __init__(self):
+        self._cells: List[List[int]] = []
+        self._local = local()
+        self._lock = Lock()
+
+    def _new_cell(self) -> List[int]:
+        cell = [0]
+        with self._lock:
+            self._cells.append(cell)
+        self._local.cell = cell
+        return cell
+
+    def add(self, n: int = 1):
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._new_cell()
+        cell[0] += n
+
+    @property
+    def value(self) -> int:
+        return sum(cell[0] for cell in list(self._cells))
+
+
+class Stage:
+    def __init__(self, name: str, total: Optional[int] = None):
+        self.name = name
+        self.total = total
+        self.counter = Counter()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self, total: Optional[int] = None):
+        if total is not None:
+            self.total = total
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+    def advance(self, n: int = 1):
+        "Records n processed items; cheap enough to call once per item."
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        self.counter.add(n)
+
+    def finish(self):
+        self.start()
+        self.finished_at = time.monotonic()
+
+    @property
+    def done(self) -> int:
+        return self.counter.value
+
+    @property
+    def status(self) -> str:
+        if self.finished_at is not None:
+            return "done"
+        elif self.started_at is not None:
+            return "running"
+        else:
+            return "pending"
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        rate = self.rate
+        if self.total is None or self.status != "running" or rate == 0:
+            return None
+        return max(0, self.total - self.done) / rate
+
+    def __str__(self):
+        count = f"{self.done}/{self.total}" if self.total is not None else str(self.done)
+        line = f"{self.name:<6} {self.status:<7} {count:>13} {self.rate:>9.1f}/s"
+        eta = self.eta
+        if eta is not None:
+            line += f"  ETA {eta:.0f}s"
+        return line
+
+
+DEFAULT_STAGES = ("list", "fetch", "diff", "write")
+
+
+class Progress:
+    """
+    Reports the progress of a multi-stage job from a background thread.
+
+    Workers only call Stage.advance, rendering happens at a fixed refresh rate.
+    In interactive mode, a live display of all stages is redrawn in place; in
+    non-interactive mode, a summary line is printed with echo_info every
+    summary_interval seconds.
+
+        with Progress() as progress:
+            fetch = progress.stage("fetch")
+            fetch.start(total=len(items))
+            for item in items:
+                ...
+                fetch.advance()
+    """
+
+    def __init__(
+        self,
+        stages: Iterable[str] = DEFAULT_STAGES,
+        refresh_per_second: float = 4,
+        summary_interval: float = 10.0,
+        interactive: Optional[bool] = None,
+    ):
+        self.stages: Dict[str, Stage] = {name: Stage(name) for name in stages}
+        self.refresh_interval = 1 / refresh_per_second
+        self.summary_interval = summary_interval
+        if interactive is None:
+            interactive = is_interactive(sys.stdout)
+        self.interactive = interactive
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+        self._live = None
+
+    def stage(self, name: str) -> Stage:
+        if name not in self.stages:
+            self.stages[name] = Stage(name)
+        return self.stages[name]
+
+    def render(self) -> str:
+        return "\n".join(str(stage) for stage in self.stages.values())
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{stage.name} {stage.done}" + (f"/{stage.total}" if stage.total is not None else "")
+            for stage in self.stages.values()
+            if stage.status != "pending"
+        )
+
+    def _run(self):
+        interval = self.refresh_interval if self.interactive else self.summary_interval
+        while not self._stop_event.wait(interval):
+            self._refresh()
+
+    def _refresh(self):
+        if self._live is not None:
+            from rich.text import Text
+
+            self._live.update(Text(self.render()), refresh=True)
+        else:
+            echo_info(self.summary())
+
+    def start(self):
+        if self.interactive:
+            from rich.live import Live
+
+            # On the console of echo_info, so that messages are printed above the display
+            self._live = Live(auto_refresh=False, console=get_console(Intent.INFO))
+            self._live.start()
+        self._thread = Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._live is not None:
+            self._refresh()
+            self._live.stop()
+            self._live = None
+        else:
+            echo_info(self.summary())
+
+    def __enter__(self) -> "Progress":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,6 +1,5 @@
-from dataclasses import asdict, dataclass
-
-from rich.text import Text
+import functools
+from dataclasses import asdict, astuple, dataclass
 
 from clickio import output
 from clickio.msgevent import Message, MessageBody
@@ -18,7 +17,9 @@ class Style:
     reverse: bool = False
 
 
-def with_style(message: Message, style: Style) -> Message:
+@functools.lru_cache(maxsize=None)
+def _style_string(style: tuple) -> str:
+    style = Style(*style)
     adjectives = [
         {"strikethrough": "strike"}.get(k, k) for k, v in asdict(style).items() if v is True
     ]
@@ -26,15 +27,35 @@ def with_style(message: Message, style: Style) -> Message:
         adjectives.append(style.fg)
     if style.bg:
         adjectives.extend(["on", style.bg])
-    adjectives = " ".join(adjectives)
+    return " ".join(adjectives)
+
+
+def style_string(style: Style) -> str:
+    "Returns the rich style definition of a Style, compiled once per distinct Style."
+    return _style_string(astuple(style))
+
 
-    message.body = MessageBody(Text(str(message.body.data), style=adjectives))
+def with_style(message: Message, style: Style) -> Message:
+    from rich.text import Text
+
+    message.body = MessageBody(Text(str(message.body.data), style=style_string(style)))
     return message
 
 
 def style_hook(style: Style):
-    def hook(message: str):
-        return with_style(message, style)
+    compiled = None
+
+    def hook(message: Message) -> Message:
+        nonlocal compiled
+        from rich.text import Text
+
+        if compiled is None:
+            # Parse the style once, instead of once per message
+            from rich.style import Style as RichStyle
+
+            compiled = RichStyle.parse(style_string(style))
+        message.body = MessageBody(Text(str(message.body.data), style=compiled))
+        return message
 
     return hook
 
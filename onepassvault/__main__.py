@@ -1,14 +1,22 @@
+import json
 import os
+import signal
 import sys
 import traceback
+from dataclasses import asdict
 
 import click
 
-from clickio.option import option_interactive, option_verbosity
-from clickio.output import echo_err, setup_messaging
+from clickio.option import option_interactive, option_profile, option_verbosity
+from clickio.output import (
+    echo_err,
+    echo_info,
+    echo_info_v,
+    echo_out,
+    setup_messaging,
+    teardown_messaging,
+)
 from clickio.style import Style, set_err_style
-from onepassvault.credentials import start
-from onepassvault.vault import assert_vault_is_live
 
 OPV_TRACEBACKS = bool(int(os.getenv("OPV_TRACEBACKS", "0")))
 
@@ -16,21 +24,366 @@ OPV_TRACEBACKS = bool(int(os.getenv("OPV_TRACEBACKS", "0")))
 set_err_style(Style(fg="red", bold=True))
 
 
-@click.command(context_settings={"help_option_names": ["-h", "--help"]})
+def fail(e: Exception):
+    if OPV_TRACEBACKS:
+        traceback.print_exc()
+    echo_err(str(e))
+    sys.exit(1)
+
+
+def connect():
+    # Imported here so that --help and argument errors do not pay for hvac and pydantic
+    from onepassvault.credentials import start
+    from onepassvault.vault import assert_vault_is_live
+
+    op, vault = start()
+    assert op.account is not None
+    health = assert_vault_is_live(vault)
+    echo_info_v(str(health))
+    return op, vault
+
+
+@click.group(invoke_without_command=True, context_settings={"help_option_names": ["-h", "--help"]})
 @click.version_option("0.1.0")
 @option_verbosity
 @option_interactive
-def cli():
-    setup_messaging()
+@option_profile
+@click.pass_context
+def cli(ctx: click.Context):
+    # The daemon writes messages from its job and health check threads
+    threadsafe = ctx.invoked_subcommand == "daemon"
+    setup_messaging(threadsafe=threadsafe)
+    if threadsafe:
+        ctx.call_on_close(teardown_messaging)
+    if ctx.invoked_subcommand is None:
+        try:
+            connect()
+        except Exception as e:
+            fail(e)
+
+
+@cli.command()
+@click.option("--vault", "op_vault", help="1Password vault to push (default: all vaults).")
+@click.option("--mount-point", default="secret", show_default=True, help="KV v2 mount point.")
+@click.option("--prefix", default="", help="KV path prefix to push secrets under.")
+@click.option("--shard", help="Only push shard i of n (e.g. 1/4) of the items.")
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False),
+    help="Write the summary and pushed item ids to this file, for merge-checkpoints.",
+)
+@click.option(
+    "--fetch-workers", default=1, show_default=True, help="Concurrent op calls to fetch items."
+)
+@click.option(
+    "--parse-workers",
+    default=0,
+    show_default=True,
+    help="Processes parsing fetched items (0 parses in the main process).",
+)
+@click.option(
+    "--dedupe-documents",
+    is_flag=True,
+    help="Store identical document contents once, under <prefix>/_blobs/.",
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    help="Write run metrics to this file, in the Prometheus text format.",
+)
+@click.option(
+    "--deadline",
+    type=float,
+    help="Stop after this many seconds, killing running op calls, and report what was pushed.",
+)
+def push(
+    op_vault,
+    mount_point,
+    prefix,
+    shard,
+    checkpoint,
+    fetch_workers,
+    parse_workers,
+    dedupe_documents,
+    metrics_file,
+    deadline,
+):
+    """
+    Push 1Password items to Vault KV secrets.
+
+    On SIGTERM or when the deadline passes, running op calls are killed, and
+    the push stops with exit status 3 after reporting the items it pushed.
+    """
+    from onepassvault.metrics import REGISTRY
+
+    op = None
     try:
-        op, vault = start()
-        assert op.account is not None
-        assert_vault_is_live(vault)
+        from clickio.output import add_shutdown_hook, remove_shutdown_hook, signal_handlers
+        from clickio.progress import Progress
+        from onepassvault.documents import ContentIndex
+        from onepassvault.metrics import sync_run
+        from onepassvault.sync import Shard
+        from onepassvault.sync import push as push_items
+
+        shard = Shard.parse(shard) if shard else None
+        op, vault = connect()
+        op.fetch_workers = max(1, fetch_workers)
+        op.parse_workers = parse_workers
+        # SIGTERM cancels the push instead of exiting, until the push is over
+        with signal_handlers(exit_on_sigterm=False), op.with_deadline(deadline) as run_deadline:
+            add_shutdown_hook(run_deadline.cancel)
+            try:
+                with sync_run(op_vault or "all"), Progress() as progress:
+                    summary = push_items(
+                        op,
+                        vault,
+                        op_vault,
+                        mount_point=mount_point,
+                        prefix=prefix,
+                        progress=progress,
+                        shard=shard,
+                        checkpoint=checkpoint,
+                        content_index=ContentIndex(prefix) if dedupe_documents else None,
+                    )
+            finally:
+                remove_shutdown_hook(run_deadline.cancel)
+        echo_info(f"Shard {shard}: {summary}" if shard else str(summary))
     except Exception as e:
-        if OPV_TRACEBACKS:
-            traceback.print_exc()
-        echo_err(str(e))
-        sys.exit(1)
+        fail(e)
+    finally:
+        if op is not None:
+            op.close()
+        if metrics_file:
+            REGISTRY.write_textfile(metrics_file)
+    if summary.unfinished:
+        sys.exit(3)
+
+
+@cli.command()
+@click.option("--vault", "op_vault", help="1Password vault to sync (default: all vaults).")
+@click.option("--mount-point", default="secret", show_default=True, help="KV v2 mount point.")
+@click.option("--prefix", default="", help="KV path prefix to sync secrets under.")
+def sync(op_vault, mount_point, prefix):
+    """
+    Sync 1Password items and Vault KV secrets in both directions.
+
+    Changes are copied to the side that did not change since the last sync.
+    Items changed on both sides are listed as conflicts and left as is, and
+    the exit status is 2.
+    """
+    try:
+        from onepassvault.bisync import bisync
+
+        op, vault = connect()
+        summary = bisync(op, vault, op_vault, mount_point=mount_point, prefix=prefix)
+        for conflict in summary.conflicts:
+            echo_out(f"conflict\t{mount_point}/{conflict}")
+        echo_info(str(summary))
+    except Exception as e:
+        fail(e)
+    if summary.conflicts:
+        sys.exit(2)
+
+
+@cli.command()
+@click.option("--vault", "op_vault", help="1Password vault that was pushed (default: all vaults).")
+@click.option("--mount-point", default="secret", show_default=True, help="KV v2 mount point.")
+@click.option("--prefix", default="", help="KV path prefix the vault was pushed under.")
+@click.option(
+    "--dry-run/--no-dry-run",
+    default=True,
+    show_default=True,
+    help="Only report orphaned secrets, do not remove them.",
+)
+@click.option(
+    "--destroy",
+    is_flag=True,
+    help="Permanently remove orphans and all their versions, instead of deleting the latest.",
+)
+@click.option("--workers", default=16, show_default=True, help="Concurrent Vault requests.")
+def prune(op_vault, mount_point, prefix, dry_run, destroy, workers):
+    "Remove KV secrets pushed from 1Password items that were deleted or renamed."
+    try:
+        from onepassvault.prune import prune as prune_orphans
+
+        op, vault = connect()
+        report = prune_orphans(
+            op,
+            vault,
+            op_vault,
+            mount_point=mount_point,
+            prefix=prefix,
+            dry_run=dry_run,
+            destroy=destroy,
+            max_workers=workers,
+        )
+        for path, reason in report.orphans:
+            echo_out(f"{reason}\t{mount_point}/{path}")
+        echo_info(str(report))
+    except Exception as e:
+        fail(e)
+
+
+@cli.command("merge-checkpoints")
+@click.argument("checkpoints", nargs=-1, required=True, type=click.Path(exists=True))
+def merge_checkpoints(checkpoints):
+    "Merge the checkpoints of all the shards of a push into one summary."
+    try:
+        from onepassvault.sync import merge_checkpoints as merge
+
+        summary, item_ids = merge(list(checkpoints))
+        echo_out(json.dumps({"summary": asdict(summary), "items": len(item_ids)}))
+    except Exception as e:
+        fail(e)
+
+
+@cli.command("pull-document")
+@click.argument("path")
+@click.option("--mount-point", default="secret", show_default=True, help="KV v2 mount point.")
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("wb"),
+    default="-",
+    help="File to write the document to (default: stdout).",
+)
+def pull_document(path, mount_point, output):
+    "Reassemble a document pushed to Vault KV, verifying its hash."
+    try:
+        from onepassvault.documents import read_document
+
+        _, vault = connect()
+        filename = read_document(vault, path, output, mount_point=mount_point)
+        echo_info_v(f"Pulled {filename} from {mount_point}/{path}")
+    except Exception as e:
+        fail(e)
+
+
+@cli.command()
+@click.option("--title", help="Item title (case-insensitive).")
+@click.option("--url", help="URL or host name of the item's websites.")
+@click.option("--tag", help="Item tag.")
+@click.option("--field", "field_label", help="Label of a field of the item.")
+@click.option("--vault", "op_vault", help="1Password vault id or name.")
+@click.option(
+    "--refresh/--no-refresh",
+    default=None,
+    help="Update the index from 1Password (only changed vaults are listed)."
+    " By default, only if it was not updated in the last --max-age seconds.",
+)
+@click.option(
+    "--max-age",
+    default=3600.0,
+    show_default=True,
+    help="Seconds after which the index is updated before lookups.",
+)
+def find(title, url, tag, field_label, op_vault, refresh, max_age):
+    "Look up items in the local encrypted item index."
+    try:
+        from onepassvault.credentials import OPV_OP_EXECUTABLE
+        from onepassvault.index import (
+            OPV_INDEX_PATH,
+            ItemIndex,
+            ItemIndexError,
+            forget_cached_index_key,
+            get_cached_index_key,
+        )
+        from onepassvault.opw import OnePassword
+
+        op = None
+
+        def signed_in() -> OnePassword:
+            nonlocal op
+            if op is None:
+                op = OnePassword(op_executable=OPV_OP_EXECUTABLE)
+                op.signin()
+            return op
+
+        try:
+            index = ItemIndex.load(OPV_INDEX_PATH, key=get_cached_index_key(signed_in))
+        except ItemIndexError:
+            # The cached key is out of date, e.g. the key item was recreated
+            forget_cached_index_key()
+            index = ItemIndex.load(OPV_INDEX_PATH, key=get_cached_index_key(signed_in))
+        if refresh or (refresh is None and index.is_stale(max_age)):
+            updated = index.refresh(signed_in())
+            index.save()
+            echo_info_v(f"Indexed {updated} changed items, {len(index.entries)} total")
+        entries = index.find(title=title, url=url, tag=tag, field_label=field_label, vault=op_vault)
+        for entry in entries:
+            echo_out(f"{entry.id}\t{entry.vault_name}\t{entry.title}")
+    except Exception as e:
+        fail(e)
+
+
+@cli.command()
+@click.option(
+    "--jobs",
+    "jobs_file",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON file of sync jobs to run.",
+)
+@click.option(
+    "--jitter", default=0.1, show_default=True, help="Random fraction added to job intervals."
+)
+@click.option(
+    "--health-interval",
+    default=60.0,
+    show_default=True,
+    help="Seconds to reuse a Vault health check for.",
+)
+@click.option("--stats-file", type=click.Path(dir_okay=False), help="Write run stats as JSON.")
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    help="Write metrics to this file after every run, in the Prometheus text format.",
+)
+@click.option("--metrics-port", type=int, help="Serve metrics at http://127.0.0.1:PORT/metrics.")
+@click.option(
+    "--snapshot-max-age",
+    type=float,
+    help="Keep a snapshot of each job's KV secrets between runs, fully re-listed after"
+    " this many seconds, instead of reading the metadata of every secret on every run.",
+)
+def daemon(
+    jobs_file, jitter, health_interval, stats_file, metrics_file, metrics_port, snapshot_max_age
+):
+    "Run sync jobs continuously, keeping 1Password and Vault clients signed in."
+    try:
+        from onepassvault.daemon import SyncDaemon
+        from onepassvault.metrics import serve_metrics
+        from onepassvault.sync import load_jobs
+        from onepassvault.vaultauth import manage_token
+
+        jobs = load_jobs(jobs_file)
+        op, vault = connect()
+        token_manager = manage_token(vault)
+        sync_daemon = SyncDaemon(
+            op,
+            vault,
+            jobs,
+            jitter=jitter,
+            health_interval=health_interval,
+            stats_file=stats_file,
+            metrics_file=metrics_file,
+            snapshot_max_age=snapshot_max_age,
+        )
+        if metrics_port:
+            serve_metrics(metrics_port)
+    except Exception as e:
+        fail(e)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sync_daemon.stop(wait=False))
+    echo_info(f"Running {len(jobs)} sync jobs, press Ctrl+C to stop")
+    try:
+        sync_daemon.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sync_daemon.stop()
+        token_manager.stop()
+        sync_daemon.write_stats()
 
 
 if __name__ == "__main__":
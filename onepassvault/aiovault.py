@@ -0,0 +1,145 @@
+import ssl
+from typing import Any, Dict, List, Optional
+
+from onepassvault.vault import DEFAULT_TIMEOUT, VaultClientConfig, VaultError, load_config
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+DEFAULT_MOUNT_POINT = "secret"
+DEFAULT_MAX_CONNECTIONS = 100
+
+
+class AsyncKV:
+    """
+    Asyncio client for the Vault KV v2 secrets engine.
+
+    All requests share the connection pool of the underlying httpx.AsyncClient,
+    so many KV operations can be in flight at once without a thread per request.
+
+    Reads of missing paths return None (and listing a missing directory returns
+    an empty list) instead of raising, other error responses raise VaultError.
+    """
+
+    def __init__(self, http: "httpx.AsyncClient", mount_point: str = DEFAULT_MOUNT_POINT):
+        self.http = http
+        self.mount_point = mount_point.strip("/")
+
+    def _url(self, kind: str, path: str) -> str:
+        return f"/v1/{self.mount_point}/{kind}/{path.strip('/')}"
+
+    async def _request(self, method: str, url: str, **kwargs) -> Optional[Dict[str, Any]]:
+        response = await self.http.request(method, url, **kwargs)
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 400:
+            try:
+                errors = response.json().get("errors", [])
+            except ValueError:
+                errors = [response.text]
+            raise VaultError(
+                f"{method} {url} failed with status {response.status_code}: {'; '.join(errors)}"
+            )
+        if response.status_code == 204 or not response.content:
+            return {}
+        return response.json()
+
+    async def list(self, path: str = "") -> List[str]:
+        "Lists keys under a directory; sub-directories end with a slash."
+        data = await self._request("LIST", self._url("metadata", path).rstrip("/") + "/")
+        if data is None:
+            return []
+        return data["data"]["keys"]
+
+    async def read(self, path: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        "Returns the secret's data and metadata, as in the data member of the Vault response."
+        params = {"version": version} if version is not None else None
+        data = await self._request("GET", self._url("data", path), params=params)
+        return None if data is None else data["data"]
+
+    async def read_metadata(self, path: str) -> Optional[Dict[str, Any]]:
+        data = await self._request("GET", self._url("metadata", path))
+        return None if data is None else data["data"]
+
+    async def write(
+        self, path: str, secret: Dict[str, Any], cas: Optional[int] = None
+    ) -> Dict[str, Any]:
+        "Writes a new version of the secret, returns the new version's metadata."
+        body = {"data": secret, "options": {}}
+        if cas is not None:
+            body["options"]["cas"] = cas
+        url = self._url("data", path)
+        data = await self._request("POST", url, json=body)
+        if data is None:
+            raise VaultError(
+                f"POST {url} failed with status 404, is {self.mount_point} a KV v2 mount?"
+            )
+        return data["data"]
+
+    async def update_metadata(self, path: str, custom_metadata: Dict[str, str]):
+        "Merges keys into the secret's custom_metadata, keeping its other metadata."
+        await self._request(
+            "PATCH",
+            self._url("metadata", path),
+            json={"custom_metadata": custom_metadata},
+            headers={"Content-Type": "application/merge-patch+json"},
+        )
+
+    async def delete(self, path: str):
+        "Soft-deletes the latest version of the secret."
+        await self._request("DELETE", self._url("data", path))
+
+    async def destroy(self, path: str):
+        "Permanently deletes the secret's metadata and all of its versions."
+        await self._request("DELETE", self._url("metadata", path))
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def __aenter__(self) -> "AsyncKV":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+def _ssl_context(config: VaultClientConfig) -> Optional[ssl.SSLContext]:
+    if not (config.server_cert_path or config.client_cert_path):
+        return None
+    ctx = ssl.create_default_context(
+        cafile=str(config.server_cert_path) if config.server_cert_path else None
+    )
+    if config.client_cert_path and config.client_cert_key_path:
+        ctx.load_cert_chain(str(config.client_cert_path), str(config.client_cert_key_path))
+    return ctx
+
+
+def open_async_vault(
+    config: Optional[VaultClientConfig] = None,
+    mount_point: str = DEFAULT_MOUNT_POINT,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+) -> AsyncKV:
+    "Async counterpart of open_vault, configured from the same VaultClientConfig."
+    if httpx is None:
+        raise VaultError("The async Vault client requires httpx: pip install 'onepassvault[async]'")
+    config = config or load_config()
+
+    headers = {"X-Vault-Request": "true"}
+    if config.token:
+        headers["X-Vault-Token"] = config.token
+    if config.namespace:
+        headers["X-Vault-Namespace"] = config.namespace
+
+    http = httpx.AsyncClient(
+        base_url=config.url,
+        headers=headers,
+        verify=_ssl_context(config) or True,
+        timeout=float(config.timeout or DEFAULT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections
+        ),
+    )
+    return AsyncKV(http, mount_point=mount_point)
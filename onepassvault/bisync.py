@@ -0,0 +1,215 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import hvac
+from hvac.exceptions import InvalidPath
+
+from clickio.output import echo_info_v, echo_info_vv
+from onepassvault.opw import OnePassword, OpItem, OpItemFieldType, UnitOfWork
+from onepassvault.opw.client import VaultOrStr
+from onepassvault.opw.schema import conceal
+from onepassvault.sync import (
+    DEFAULT_MOUNT_POINT,
+    Fingerprint,
+    content_hash,
+    item_path,
+    item_secret,
+    item_vault_id,
+    write_fingerprint,
+    write_secret,
+)
+
+NEW_FIELD_TYPE = OpItemFieldType.PASSWORD
+
+
+@dataclass
+class Conflict:
+    path: str
+    item_id: str
+    reason: str
+
+    def __str__(self):
+        return f"{self.path} ({self.item_id}): {self.reason}"
+
+
+@dataclass
+class BisyncSummary:
+    listed: int = 0
+    unchanged: int = 0
+    pushed: int = 0
+    pulled: int = 0
+    converged: int = 0
+    skipped: int = 0
+    conflicts: List[Conflict] = field(default_factory=list)
+
+    def __str__(self):
+        return (
+            f"{self.listed} items listed, {self.unchanged} unchanged, {self.pushed} pushed"
+            f" to Vault, {self.pulled} pulled to 1Password, {self.converged} converged,"
+            f" {self.skipped} skipped, {len(self.conflicts)} conflicts"
+        )
+
+
+def _read_state(
+    client: hvac.Client, path: str, mount_point: str
+) -> Optional[Tuple[int, Optional[Fingerprint]]]:
+    "Returns the current KV version and base fingerprint of a secret, None if it does not exist."
+    try:
+        metadata = client.secrets.kv.v2.read_secret_metadata(path, mount_point=mount_point)
+    except InvalidPath:
+        return None
+    data = metadata["data"]
+    return data["current_version"], Fingerprint.from_metadata(data.get("custom_metadata"))
+
+
+def _read_secret(client: hvac.Client, path: str, mount_point: str) -> Optional[Dict[str, str]]:
+    try:
+        response = client.secrets.kv.v2.read_secret_version(
+            path, mount_point=mount_point, raise_on_deleted_version=True
+        )
+    except InvalidPath:
+        return None
+    return response["data"]["data"]
+
+
+def apply_secret(item: OpItem, secret: Dict[str, str]):
+    """
+    Updates the fields of an item so that item_secret(item) == secret. The values
+    of concealed fields are set as SecretBuffers.
+    """
+    current = item_secret(item)
+    for label in current.keys() - secret.keys():
+        item.remove_field(label)
+    for label, value in secret.items():
+        if label in current:
+            if current[label] != value:
+                item.set_field_value(label, conceal(item.get_field(label).type, value))
+        else:
+            item.add_field(label, NEW_FIELD_TYPE, conceal(NEW_FIELD_TYPE, value))
+
+
+def _base(item: OpItem, secret: Dict[str, str], kv_version: Optional[int]) -> Fingerprint:
+    return Fingerprint(
+        item_id=item.id,
+        item_version=item.version,
+        content_hash=content_hash(secret),
+        kv_version=kv_version,
+        vault_id=item_vault_id(item),
+    )
+
+
+def bisync(
+    op: OnePassword,
+    client: hvac.Client,
+    vault: Optional[VaultOrStr] = None,
+    mount_point: str = DEFAULT_MOUNT_POINT,
+    prefix: str = "",
+) -> BisyncSummary:
+    """
+    Synchronizes 1Password items and Vault KV secrets in both directions.
+
+    The fingerprint stored with each secret is the base of a three-way merge:
+    the item version, KV version and content hash at the last sync. A side has
+    changed if its version moved since the base and its content differs from
+    the base content. Changes are written to the other side only; when both
+    sides changed to different contents, the item is reported as a conflict and
+    neither side is written.
+
+    Items unchanged on both sides cost a single metadata read, they are neither
+    fetched from 1Password nor read from Vault. Items changed in Vault are
+    written to 1Password at the end, up to op.fetch_workers at a time; an item
+    that fails to be written is reported as a conflict. Documents are not synced (use
+    push), and secrets without an item are left alone (use prune).
+    """
+    summary = BisyncSummary()
+    items = op.get_items(vault)
+    summary.listed = len(items)
+
+    states: Dict[str, Optional[Tuple[int, Optional[Fingerprint]]]] = {}
+    stale: List[OpItem] = []
+    for item in items:
+        if item.category == "DOCUMENT":
+            summary.skipped += 1
+            continue
+        path = item_path(item, prefix)
+        state = _read_state(client, path, mount_point)
+        if state is not None:
+            kv_version, base = state
+            if (
+                base is not None
+                and base.item_id == item.id
+                and base.item_version == item.version
+                and base.kv_version == kv_version
+            ):
+                summary.unchanged += 1
+                continue
+        states[item.id] = state
+        stale.append(item)
+
+    pulls: Dict[str, Tuple[str, Dict[str, str], int]] = {}
+    with op.unit_of_work() as writes:
+        for item in op.get_items_details(stale):
+            _merge_item(writes, client, item, states[item.id], prefix, mount_point, summary, pulls)
+
+    for result in writes.results:
+        path, kv_secret, kv_version = pulls[result.item_id]
+        if not result.ok:
+            summary.conflicts.append(
+                Conflict(path, result.item_id, f"1Password update failed: {result.error}")
+            )
+            continue
+        updated = result.item
+        write_fingerprint(client, path, _base(updated, kv_secret, kv_version), mount_point)
+        summary.pulled += 1
+        echo_info_v(f"{updated.title}: changed in Vault, pulled (item v{updated.version})")
+    return summary
+
+
+def _merge_item(
+    writes: UnitOfWork,
+    client: hvac.Client,
+    item: OpItem,
+    state: Optional[Tuple[int, Optional[Fingerprint]]],
+    prefix: str,
+    mount_point: str,
+    summary: BisyncSummary,
+    pulls: Dict[str, Tuple[str, Dict[str, str], int]],
+):
+    """
+    Merges one fetched item with its secret. Updates of the item are buffered in
+    writes, and recorded in pulls to write their fingerprint after.
+    """
+    path = item_path(item, prefix)
+    op_secret = item_secret(item)
+    op_hash = content_hash(op_secret)
+
+    if state is None:
+        write_secret(client, path, op_secret, _base(item, op_secret, None), mount_point)
+        summary.pushed += 1
+        echo_info_v(f"{item.title}: new, pushed to {mount_point}/{path}")
+        return
+
+    kv_version, base = state
+    kv_secret = _read_secret(client, path, mount_point)
+    if kv_secret is None:
+        summary.conflicts.append(Conflict(path, item.id, "secret deleted in Vault"))
+        return
+    kv_hash = content_hash(kv_secret)
+
+    if op_hash == kv_hash:
+        # Same content on both sides, record it as the new base
+        write_fingerprint(client, path, _base(item, op_secret, kv_version), mount_point)
+        summary.converged += 1
+        echo_info_vv(f"{item.title}: same content on both sides")
+    elif base is None or base.item_id != item.id:
+        summary.conflicts.append(Conflict(path, item.id, "secret was not written from this item"))
+    elif kv_hash == base.content_hash:
+        new_base = write_secret(client, path, op_secret, _base(item, op_secret, None), mount_point)
+        summary.pushed += 1
+        echo_info_v(f"{item.title}: changed in 1Password, pushed (KV v{new_base.kv_version})")
+    elif op_hash == base.content_hash:
+        apply_secret(item, kv_secret)
+        writes.update_item(item)
+        pulls[item.id] = (path, kv_secret, kv_version)
+    else:
+        summary.conflicts.append(Conflict(path, item.id, "changed in both 1Password and Vault"))
@@ -1,39 +1,27 @@
 import os
-from typing import Tuple
-
-import hvac
+from typing import TYPE_CHECKING, Tuple
 
 from clickio.input import prompt, prompt_yn
 from clickio.output import echo_info, echo_info_v
-from onepassvault.opw import OnePassword, OpItem, OpItemFieldType
+from onepassvault.kv import VaultConfig
+from onepassvault.opw import OnePassword, OpItem
 from onepassvault.opw.client import OpItemNotFound
-from onepassvault.vault import (
-    VAULT_CONFIG_FIELDS,
-    VaultClientConfig,
-    load_config,
-    open_vault,
-)
+from onepassvault.vault import VaultClientConfig, load_config, open_vault
+
+if TYPE_CHECKING:
+    import hvac
 
 VAULT_CONFIG_OP_VAULT_ID = os.getenv("VAULT_CONFIG_OP_VAULT_ID")
 VAULT_CONFIG_OP_ITEM_ID = os.getenv("VAULT_CONFIG_OP_ITEM_ID")
-
-
-VAULT_CONFIG_FIELD_TYPES = {"token": OpItemFieldType.PASSWORD}
+OPV_OP_EXECUTABLE = os.getenv("OPV_OP_EXECUTABLE", "op")
 
 
 def vault_config_to_op_item(config: VaultClientConfig, name: str) -> OpItem:
-    item = OpItem({"title": name, "category": "API_CREDENTIAL", "fields": []})
-    for k, v in config.model_dump().items():
-        if v is not None:
-            item.add_field(
-                name=k, type=VAULT_CONFIG_FIELD_TYPES.get(k, OpItemFieldType.TEXT), value=str(v)
-            )
-    return item
+    return VaultConfig.to_item(config.model_dump(), name)
 
 
 def op_item_to_vault_config(item: OpItem) -> VaultClientConfig:
-    config_data = {f: item.get_field_value(f) for f in VAULT_CONFIG_FIELDS}
-    return VaultClientConfig.model_validate(config_data)
+    return VaultClientConfig.model_validate(VaultConfig.to_secret(item))
 
 
 def get_vault_config(op: OnePassword) -> VaultClientConfig:
@@ -65,8 +53,8 @@ def get_vault_config(op: OnePassword) -> VaultClientConfig:
     return vault_config
 
 
-def start() -> Tuple[OnePassword, hvac.Client]:
-    op = OnePassword()
+def start() -> Tuple[OnePassword, "hvac.Client"]:
+    op = OnePassword(op_executable=OPV_OP_EXECUTABLE)
     op.signin()
     echo_info_v(f"Signed in to 1Password account {op.account['email']}")
     vault_config = get_vault_config(op)
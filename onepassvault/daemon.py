@@ -0,0 +1,173 @@
+import json
+import random
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from threading import Event, Lock
+from typing import Dict, List, Optional
+
+import hvac
+
+from clickio.output import echo_err, echo_info, echo_info_v
+from onepassvault.metrics import REGISTRY
+from onepassvault.opw import OnePassword
+from onepassvault.snapshot import KVSnapshot
+from onepassvault.sync import SyncJob, run_job
+from onepassvault.vault import assert_vault_is_live
+
+DEFAULT_JITTER = 0.1
+DEFAULT_HEALTH_INTERVAL = 60.0
+
+
+@dataclass
+class JobStats:
+    runs: int = 0
+    failures: int = 0
+    coalesced: int = 0
+    last_started_at: Optional[float] = None
+    last_duration: Optional[float] = None
+    last_result: Optional[str] = None
+    last_error: Optional[str] = None
+
+
+class _JobState:
+    def __init__(self, job: SyncJob, snapshot: Optional[KVSnapshot] = None):
+        self.job = job
+        self.snapshot = snapshot
+        self.stats = JobStats()
+        self.next_run = time.monotonic()
+        self.future: Optional[Future] = None
+        self.pending = False
+
+
+class SyncDaemon:
+    """
+    Runs sync jobs on intervals, reusing one signed-in 1Password client and one
+    Vault client for every run.
+
+    Each job is rescheduled interval * (1 +/- jitter) seconds after it was last
+    triggered, so jobs with the same interval do not all hit 1Password and Vault
+    at once. A job never runs concurrently with itself: triggers that arrive
+    while it is running are coalesced into a single follow-up run.
+
+    With snapshot_max_age, each job keeps a snapshot of its KV prefix between
+    runs (see onepassvault.snapshot.KVSnapshot), so that a run only reads the
+    metadata of the secrets written by the previous one. Secrets changed by
+    other Vault clients are noticed after at most snapshot_max_age seconds.
+    """
+
+    def __init__(
+        self,
+        op: OnePassword,
+        client: hvac.Client,
+        jobs: List[SyncJob],
+        jitter: float = DEFAULT_JITTER,
+        health_interval: float = DEFAULT_HEALTH_INTERVAL,
+        stats_file: Optional[str] = None,
+        metrics_file: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        snapshot_max_age: Optional[float] = None,
+    ):
+        if not jobs:
+            raise ValueError("No sync jobs to run")
+        if len({job.name for job in jobs}) != len(jobs):
+            raise ValueError("Sync job names must be unique")
+        self.op = op
+        self.client = client
+        self.jitter = jitter
+        self.health_interval = health_interval
+        self.stats_file = stats_file
+        self.metrics_file = metrics_file
+        self.started_at = time.time()
+        self._states: Dict[str, _JobState] = {
+            job.name: _JobState(
+                job,
+                KVSnapshot(client, job.mount_point, job.prefix, max_age=snapshot_max_age)
+                if snapshot_max_age is not None
+                else None,
+            )
+            for job in jobs
+        }
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or max(1, len(jobs)))
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._wakeup = Event()
+
+    def _schedule_next(self, state: _JobState):
+        delay = state.job.interval * (1 + random.uniform(-self.jitter, self.jitter))
+        state.next_run = time.monotonic() + delay
+
+    def trigger(self, name: str):
+        "Runs a job now, or once more after its current run if it is already running."
+        with self._lock:
+            if self._stop_event.is_set():
+                return
+            state = self._states[name]
+            self._schedule_next(state)
+            if state.future is not None:
+                if state.pending:
+                    state.stats.coalesced += 1
+                state.pending = True
+                return
+            state.future = self._executor.submit(self._run, state)
+
+    def _run(self, state: _JobState):
+        stats = state.stats
+        stats.last_started_at = time.time()
+        start = time.monotonic()
+        try:
+            assert_vault_is_live(self.client, max_age=self.health_interval)
+            summary = run_job(self.op, self.client, state.job, snapshot=state.snapshot)
+            stats.last_result = str(summary)
+            stats.last_error = None
+            echo_info(f"[{state.job.name}] {summary}")
+        except Exception as e:
+            stats.failures += 1
+            stats.last_error = str(e)
+            echo_err(f"[{state.job.name}] sync failed: {e}")
+            echo_info_v(traceback.format_exc())
+        finally:
+            stats.runs += 1
+            stats.last_duration = time.monotonic() - start
+            with self._lock:
+                state.future = None
+                rerun = state.pending
+                state.pending = False
+            self.write_stats()
+            if self.metrics_file is not None:
+                REGISTRY.write_textfile(self.metrics_file)
+            if rerun:
+                self.trigger(state.job.name)
+            self._wakeup.set()
+
+    def stats(self) -> dict:
+        return {
+            "started_at": self.started_at,
+            "uptime": time.time() - self.started_at,
+            "jobs": {name: asdict(state.stats) for name, state in self._states.items()},
+        }
+
+    def write_stats(self):
+        if self.stats_file is None:
+            return
+        with self._lock:
+            stats = self.stats()
+        with open(self.stats_file, "w") as f:
+            json.dump(stats, f, indent=2)
+
+    def run_forever(self):
+        "Runs jobs as they come due until stop() is called."
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            for name, state in self._states.items():
+                if state.next_run <= now:
+                    self.trigger(name)
+            next_due = min(state.next_run for state in self._states.values())
+            self._wakeup.clear()
+            self._wakeup.wait(max(0.0, next_due - time.monotonic()))
+
+    def stop(self, wait: bool = True):
+        self._stop_event.set()
+        self._wakeup.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,279 @@
+import base64
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple
+
+import hvac
+from hvac.exceptions import InvalidPath
+
+from onepassvault.opw import OnePassword, OpDocument, OpItem
+from onepassvault.vault import VaultError
+
+DEFAULT_MOUNT_POINT = "secret"
+DEFAULT_CHUNK_THRESHOLD = 512 * 1024
+DEFAULT_CHUNK_SIZE = 256 * 1024
+DEFAULT_MAX_WORKERS = 8
+
+
+class DocumentIntegrityError(VaultError):
+    pass
+
+
+@dataclass
+class Manifest:
+    "Describes a document stored as fixed-size chunks under <path>/chunks/<sha256>."
+
+    filename: str
+    size: int
+    sha256: str
+    chunk_size: int
+    chunks: List[str]
+
+    @classmethod
+    def from_secret(cls, data: Dict) -> Optional["Manifest"]:
+        if "manifest" not in data:
+            return None
+        return cls(**data["manifest"])
+
+
+def chunk_path(path: str, digest: str) -> str:
+    # Chunks are named by content, so a chunk is never rewritten with other data
+    return f"{path}/chunks/{digest}"
+
+
+def _read(client: hvac.Client, path: str, mount_point: str) -> Optional[Dict]:
+    try:
+        response = client.secrets.kv.v2.read_secret_version(
+            path, mount_point=mount_point, raise_on_deleted_version=True
+        )
+    except InvalidPath:
+        return None
+    return response["data"]["data"]
+
+
+def _stored_chunks(client: hvac.Client, path: str, mount_point: str) -> Set[str]:
+    "Returns the hashes of the chunks stored for the document at path."
+    # Listing the chunk names is cheaper than reading the previous version of the
+    # document, which may be up to the chunk threshold stored inline
+    try:
+        response = client.secrets.kv.v2.list_secrets(f"{path}/chunks", mount_point=mount_point)
+    except InvalidPath:
+        return set()
+    return {key for key in response["data"]["keys"] if not key.endswith("/")}
+
+
+def write_document(
+    client: hvac.Client,
+    path: str,
+    document: OpDocument,
+    mount_point: str = DEFAULT_MOUNT_POINT,
+    threshold: int = DEFAULT_CHUNK_THRESHOLD,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> int:
+    """
+    Writes a document's contents to Vault KV, returns the number of chunks uploaded.
+
+    Documents up to threshold bytes are stored inline in a single secret. Larger
+    ones are split into chunks stored at paths named by their hash, uploaded
+    concurrently, and the manifest listing their hashes is written last, so that
+    readers never see a manifest pointing to missing chunks, nor chunks of another
+    version of the document. Chunks already stored under path are not uploaded
+    again; those the new manifest does not use are deleted once it is written.
+    Only the chunk names are listed, the previous version of the document is not
+    read. A reader still following the previous manifest then fails with
+    DocumentIntegrityError, and can read the document again.
+    """
+    contents = document.contents
+    digest = hashlib.sha256(contents).hexdigest()
+    previous_chunks = _stored_chunks(client, path, mount_point)
+
+    if len(contents) <= threshold:
+        secret = {
+            "filename": document.filename,
+            "sha256": digest,
+            "contents": base64.b64encode(contents).decode("ascii"),
+        }
+        client.secrets.kv.v2.create_or_update_secret(path, secret, mount_point=mount_point)
+        _destroy_chunks(client, path, previous_chunks, mount_point)
+        return 0
+
+    chunks = [contents[i : i + chunk_size] for i in range(0, len(contents), chunk_size)]
+    manifest = Manifest(
+        filename=document.filename,
+        size=len(contents),
+        sha256=digest,
+        chunk_size=chunk_size,
+        chunks=[hashlib.sha256(chunk).hexdigest() for chunk in chunks],
+    )
+    # One upload per distinct chunk that is not stored yet
+    to_upload = {
+        digest: chunk
+        for digest, chunk in zip(manifest.chunks, chunks)
+        if digest not in previous_chunks
+    }
+
+    def upload(digest: str):
+        secret = {"data": base64.b64encode(to_upload[digest]).decode("ascii")}
+        client.secrets.kv.v2.create_or_update_secret(
+            chunk_path(path, digest), secret, mount_point=mount_point
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(upload, to_upload))
+
+    client.secrets.kv.v2.create_or_update_secret(
+        path, {"manifest": asdict(manifest)}, mount_point=mount_point
+    )
+    _destroy_chunks(client, path, previous_chunks - set(manifest.chunks), mount_point)
+    return len(to_upload)
+
+
+def _destroy_chunks(client: hvac.Client, path: str, digests: Set[str], mount_point: str):
+    for digest in digests:
+        client.secrets.kv.v2.delete_metadata_and_all_versions(
+            chunk_path(path, digest), mount_point=mount_point
+        )
+
+
+def read_document(
+    client: hvac.Client,
+    path: str,
+    out: BinaryIO,
+    mount_point: str = DEFAULT_MOUNT_POINT,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> str:
+    """
+    Streams a document written by write_document to out, returns its filename.
+
+    Chunks are fetched up to max_workers at a time and written in order as they
+    arrive. Each chunk and the whole document are checked against the hashes in
+    the manifest, raising DocumentIntegrityError on mismatch.
+    """
+    secret = _read(client, path, mount_point)
+    if secret is None:
+        raise VaultError(f"No document at {mount_point}/{path}")
+    if "blob" in secret:
+        # Deduplicated document, see ContentIndex
+        read_document(client, secret["blob"], out, mount_point=mount_point, max_workers=max_workers)
+        return secret["filename"]
+    manifest = Manifest.from_secret(secret)
+    if manifest is None:
+        contents = base64.b64decode(secret["contents"])
+        if hashlib.sha256(contents).hexdigest() != secret["sha256"]:
+            raise DocumentIntegrityError(f"Document at {mount_point}/{path} is corrupted")
+        out.write(contents)
+        return secret["filename"]
+
+    def fetch(index: int) -> bytes:
+        chunk_secret = _read(client, chunk_path(path, manifest.chunks[index]), mount_point)
+        if chunk_secret is None:
+            raise DocumentIntegrityError(f"Chunk {index} of {mount_point}/{path} is missing")
+        chunk = base64.b64decode(chunk_secret["data"])
+        if hashlib.sha256(chunk).hexdigest() != manifest.chunks[index]:
+            raise DocumentIntegrityError(f"Chunk {index} of {mount_point}/{path} is corrupted")
+        return chunk
+
+    total = hashlib.sha256()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Keep a bounded window of chunk reads in flight, so memory does not grow with size
+        pending = deque()
+        indices = iter(range(len(manifest.chunks)))
+        for index in indices:
+            pending.append(pool.submit(fetch, index))
+            if len(pending) >= max_workers:
+                break
+        while pending:
+            chunk = pending.popleft().result()
+            total.update(chunk)
+            out.write(chunk)
+            index = next(indices, None)
+            if index is not None:
+                pending.append(pool.submit(fetch, index))
+
+    if total.hexdigest() != manifest.sha256:
+        raise DocumentIntegrityError(f"Document at {mount_point}/{path} is corrupted")
+    return manifest.filename
+
+
+BLOB_FOLDER = "_blobs"
+
+
+@dataclass
+class ContentIndexStats:
+    fetched: int = 0
+    blobs_written: int = 0
+    blobs_reused: int = 0
+    bytes_written: int = 0
+
+
+class ContentIndex:
+    """
+    Deduplicates document payloads by content hash during a sync run.
+
+    Document contents are stored once in Vault, as a blob at
+    <prefix>/_blobs/<sha256>, and each document path holds a small reference to
+    its blob, which read_document follows. Keeping blobs under the prefix of the
+    documents puts them in the scope of the same policies. Blobs already in
+    Vault (from a previous run or another item) are not uploaded again. Each
+    document is still fetched from 1Password, since identical contents can only
+    be told apart once fetched.
+    """
+
+    def __init__(self, prefix: str = ""):
+        prefix = prefix.strip("/")
+        self.blob_prefix = f"{prefix}/{BLOB_FOLDER}" if prefix else BLOB_FOLDER
+        self.stats = ContentIndexStats()
+        self._blobs: Set[Tuple[str, str]] = set()
+
+    def blob_path(self, digest: str) -> str:
+        return f"{self.blob_prefix}/{digest}"
+
+    def get_document(self, op: OnePassword, item: OpItem) -> OpDocument:
+        "Gets a document's contents from 1Password."
+        contents = op.get_document_contents(item.id, item.vault.id if item.vault else None)
+        self.stats.fetched += 1
+        return OpDocument.from_item(item, contents)
+
+    def store(
+        self,
+        client: hvac.Client,
+        path: str,
+        document: OpDocument,
+        mount_point: str = DEFAULT_MOUNT_POINT,
+    ) -> bool:
+        """
+        Writes a reference to the document's blob at path, uploading the blob only
+        if its content is not in Vault yet. Returns True if the blob was uploaded.
+
+        If path held a chunked document written by write_document, its chunks are
+        deleted once the reference is written.
+        """
+        previous_chunks = _stored_chunks(client, path, mount_point)
+        digest = hashlib.sha256(document.contents).hexdigest()
+        blob = self.blob_path(digest)
+        uploaded = False
+        if (mount_point, digest) not in self._blobs:
+            if not _exists(client, blob, mount_point):
+                write_document(client, blob, document, mount_point=mount_point)
+                self.stats.blobs_written += 1
+                self.stats.bytes_written += len(document.contents)
+                uploaded = True
+            self._blobs.add((mount_point, digest))
+        if not uploaded:
+            self.stats.blobs_reused += 1
+
+        reference = {"filename": document.filename, "sha256": digest, "blob": blob}
+        client.secrets.kv.v2.create_or_update_secret(path, reference, mount_point=mount_point)
+        _destroy_chunks(client, path, previous_chunks, mount_point)
+        return uploaded
+
+
+def _exists(client: hvac.Client, path: str, mount_point: str) -> bool:
+    try:
+        client.secrets.kv.v2.read_secret_metadata(path, mount_point=mount_point)
+        return True
+    except InvalidPath:
+        return False
@@ -0,0 +1,335 @@
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+from onepassvault.opw import (
+    OnePassword,
+    OpItem,
+    OpItemFieldType,
+    OpItemNotFound,
+    OpVault,
+    SecretBuffer,
+)
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = None
+
+OPV_INDEX_PATH = os.getenv(
+    "OPV_INDEX_PATH", os.path.join(os.path.expanduser("~"), ".cache", "onepassvault", "index")
+)
+OPV_INDEX_KEY_ITEM = os.getenv("OPV_INDEX_KEY_ITEM", "onepassvault index key")
+# Session file caching the index key, in the per-user runtime directory (a tmpfs cleared
+# on logout). Without one, the key is not cached unless a path is set explicitly, as a
+# persistent plaintext copy of the key would defeat the encryption of the index.
+OPV_INDEX_KEY_CACHE = os.getenv("OPV_INDEX_KEY_CACHE") or (
+    os.path.join(os.environ["XDG_RUNTIME_DIR"], "onepassvault-index.key")
+    if os.getenv("XDG_RUNTIME_DIR")
+    else None
+)
+OPV_INDEX_KEY_TTL = float(os.getenv("OPV_INDEX_KEY_TTL", "28800"))
+
+INDEX_FORMAT_VERSION = 1
+
+
+class ItemIndexError(RuntimeError):
+    pass
+
+
+@dataclass
+class IndexEntry:
+    "Metadata of a 1Password item; never holds secret values."
+
+    id: str
+    title: str
+    vault_id: str
+    vault_name: str
+    category: str
+    version: Optional[int] = None
+    tags: List[str] = field(default_factory=list)
+    urls: List[str] = field(default_factory=list)
+    field_labels: List[str] = field(default_factory=list)
+
+    @classmethod
+    def of_item(cls, item: OpItem) -> "IndexEntry":
+        vault = item.vault
+        return cls(
+            id=item.id,
+            title=item.title or "",
+            vault_id=vault.id if vault else "",
+            vault_name=vault.name if vault else "",
+            category=item.category,
+            version=item.version,
+            tags=list(item.tags),
+            urls=list(item.urls),
+            field_labels=sorted(label for label in item.fields_by_label if label),
+        )
+
+
+def _host(url: str) -> str:
+    if "://" not in url:
+        url = "https://" + url
+    return (urlparse(url).hostname or "").lower()
+
+
+def _norm(s: str) -> str:
+    return s.casefold()
+
+
+def generate_key() -> bytes:
+    if Fernet is None:
+        raise ItemIndexError("Encrypting the item index requires the cryptography package")
+    return Fernet.generate_key()
+
+
+def get_or_create_index_key(op: OnePassword, item_name: str = OPV_INDEX_KEY_ITEM) -> bytes:
+    "Gets the index encryption key from a 1Password item, creating the item if needed."
+    try:
+        item = op.get_item(item_name)
+    except OpItemNotFound:
+        item = OpItem({"title": item_name, "category": "API_CREDENTIAL", "fields": []})
+        with SecretBuffer(generate_key()) as key:
+            item.add_field("key", OpItemFieldType.PASSWORD, key)
+            item = op.create_item(item)
+    key = item.get_field_value("key")
+    if isinstance(key, SecretBuffer):
+        key = key.reveal()
+    if not key:
+        raise ItemIndexError(
+            f'1Password item "{item_name}" has no "key" field holding the index key'
+        )
+    return key.encode("ascii")
+
+
+def _write_private(path: str, data: bytes):
+    "Atomically replaces path with data, readable only by the user."
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def get_cached_index_key(
+    get_op: Callable[[], OnePassword],
+    item_name: str = OPV_INDEX_KEY_ITEM,
+    cache_path: Optional[str] = OPV_INDEX_KEY_CACHE,
+    ttl: float = OPV_INDEX_KEY_TTL,
+) -> bytes:
+    """
+    Like get_or_create_index_key, but keeps the key in a session file for ttl
+    seconds, so that lookups do not need op calls. get_op is only called when
+    the key is not cached, or the cached key expired (its file is then removed).
+    Without a cache_path, the key is always read from 1Password.
+    """
+    if cache_path is None:
+        return get_or_create_index_key(get_op(), item_name)
+    try:
+        with open(cache_path, "rb") as f:
+            cached = json.load(f)
+        if cached["expires_at"] <= time.time():
+            forget_cached_index_key(cache_path)
+        elif cached["item"] == item_name:
+            return cached["key"].encode("ascii")
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    key = get_or_create_index_key(get_op(), item_name)
+    cached = {"item": item_name, "key": key.decode("ascii"), "expires_at": time.time() + ttl}
+    _write_private(cache_path, json.dumps(cached).encode("utf-8"))
+    return key
+
+
+def forget_cached_index_key(cache_path: Optional[str] = OPV_INDEX_KEY_CACHE):
+    if cache_path is None:
+        return
+    try:
+        os.remove(cache_path)
+    except FileNotFoundError:
+        pass
+
+
+class ItemIndex:
+    """
+    A local index of 1Password item metadata, for lookups without op calls.
+
+    Only metadata is indexed: id, title, vault, category, version, tags, URLs
+    and field labels. With a key, the index file is encrypted with Fernet
+    (requires the cryptography package); see get_or_create_index_key.
+
+    refresh() only lists the items of vaults whose content_version changed
+    since the last refresh, and only fetches the details (for field labels) of
+    items whose version changed. is_stale() tells whether the last refresh is
+    older than a maximum age.
+
+        index = ItemIndex.load(OPV_INDEX_PATH, key=get_or_create_index_key(op))
+        if index.is_stale(3600):
+            index.refresh(op)
+            index.save()
+        [entry] = index.find(url="github.com", tag="ci")
+    """
+
+    def __init__(self, path: Optional[str] = None, key: Optional[bytes] = None):
+        if key is not None and Fernet is None:
+            raise ItemIndexError("Encrypting the item index requires the cryptography package")
+        self.path = path
+        self._fernet = Fernet(key) if key is not None else None
+        self.vault_versions: Dict[str, Optional[int]] = {}
+        # Unix time of the last refresh
+        self.refreshed_at: Optional[float] = None
+        self.entries: Dict[str, IndexEntry] = {}
+        self._by_title: Dict[str, Set[str]] = {}
+        self._by_host: Dict[str, Set[str]] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._by_label: Dict[str, Set[str]] = {}
+
+    @classmethod
+    def load(cls, path: str, key: Optional[bytes] = None) -> "ItemIndex":
+        "Loads an index from path, or returns an empty one if it does not exist."
+        index = cls(path, key)
+        if not os.path.exists(path):
+            return index
+        with open(path, "rb") as f:
+            data = f.read()
+        if index._fernet is not None:
+            try:
+                data = index._fernet.decrypt(data)
+            except InvalidToken:
+                raise ItemIndexError(f"Cannot decrypt item index {path}, wrong key?")
+        data = json.loads(data)
+        if data.get("format") != INDEX_FORMAT_VERSION:
+            return index
+        index.vault_versions = data["vaults"]
+        index.refreshed_at = data.get("refreshed_at")
+        for entry in data["items"]:
+            index._add(IndexEntry(**entry))
+        return index
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        data = json.dumps(
+            {
+                "format": INDEX_FORMAT_VERSION,
+                "vaults": self.vault_versions,
+                "refreshed_at": self.refreshed_at,
+                "items": [asdict(entry) for entry in self.entries.values()],
+            }
+        ).encode("utf-8")
+        if self._fernet is not None:
+            data = self._fernet.encrypt(data)
+        _write_private(path, data)
+
+    def is_stale(self, max_age: float) -> bool:
+        "True if the index was never refreshed, or not in the last max_age seconds."
+        return self.refreshed_at is None or time.time() - self.refreshed_at > max_age
+
+    def _keys(self, entry: IndexEntry):
+        yield self._by_title, [_norm(entry.title)]
+        yield self._by_host, [_host(url) for url in entry.urls]
+        yield self._by_tag, [_norm(tag) for tag in entry.tags]
+        yield self._by_label, [_norm(label) for label in entry.field_labels]
+
+    def _add(self, entry: IndexEntry):
+        self._remove(entry.id)
+        self.entries[entry.id] = entry
+        for mapping, keys in self._keys(entry):
+            for key in keys:
+                mapping.setdefault(key, set()).add(entry.id)
+
+    def _remove(self, item_id: str):
+        entry = self.entries.pop(item_id, None)
+        if entry is None:
+            return
+        for mapping, keys in self._keys(entry):
+            for key in keys:
+                ids = mapping.get(key)
+                if ids is not None:
+                    ids.discard(item_id)
+                    if not ids:
+                        del mapping[key]
+
+    def _refresh_vault(self, op: OnePassword, vault: OpVault) -> int:
+        items = op.get_items(vault)
+        listed = {item.id for item in items}
+        for item_id in [i for i, e in self.entries.items() if e.vault_id == vault.id]:
+            if item_id not in listed:
+                self._remove(item_id)
+        changed = [
+            item
+            for item in items
+            if item.id not in self.entries or self.entries[item.id].version != item.version
+        ]
+        if changed:
+            for item in op.get_items_details(changed):
+                self._add(IndexEntry.of_item(item))
+        return len(changed)
+
+    def refresh(self, op: OnePassword) -> int:
+        "Brings the index up to date with 1Password, returns the number of items (re)indexed."
+        refreshed_at = time.time()
+        vaults = op.get_vaults()
+        updated = 0
+        for vault in vaults:
+            if vault.content_version is None or (
+                self.vault_versions.get(vault.id) != vault.content_version
+            ):
+                updated += self._refresh_vault(op, vault)
+                self.vault_versions[vault.id] = vault.content_version
+
+        current = {vault.id for vault in vaults}
+        for vault_id in [v for v in self.vault_versions if v not in current]:
+            del self.vault_versions[vault_id]
+        for item_id in [i for i, e in self.entries.items() if e.vault_id not in current]:
+            self._remove(item_id)
+        self.refreshed_at = refreshed_at
+        return updated
+
+    def find(
+        self,
+        title: Optional[str] = None,
+        url: Optional[str] = None,
+        tag: Optional[str] = None,
+        field_label: Optional[str] = None,
+        vault: Optional[str] = None,
+    ) -> List[IndexEntry]:
+        """
+        Returns the items matching all the given criteria, sorted by title.
+
+        Titles, tags and field labels match case-insensitively; URLs match by host.
+        vault is a vault id or name.
+        """
+        criteria = [
+            (self._by_title, title and _norm(title)),
+            (self._by_host, url and _host(url)),
+            (self._by_tag, tag and _norm(tag)),
+            (self._by_label, field_label and _norm(field_label)),
+        ]
+        ids: Optional[Set[str]] = None
+        for mapping, key in criteria:
+            if key:
+                matches = mapping.get(key, set())
+                ids = set(matches) if ids is None else ids & matches
+        if ids is None:
+            ids = set(self.entries)
+        entries = [self.entries[i] for i in ids]
+        if vault:
+            entries = [e for e in entries if vault in (e.vault_id, e.vault_name)]
+        return sorted(entries, key=lambda e: (e.title, e.id))
+
+    def resolve(self, item_id_or_name: str, vault: Optional[str] = None) -> str:
+        "Returns the id of the item with this id or title, unlike op it fails if ambiguous."
+        entry = self.entries.get(item_id_or_name)
+        if entry is not None and (not vault or vault in (entry.vault_id, entry.vault_name)):
+            return entry.id
+        matches = self.find(title=item_id_or_name, vault=vault)
+        if not matches:
+            raise OpItemNotFound(1, f'"{item_id_or_name}" isn\'t an item in the index.')
+        if len(matches) > 1:
+            ids = ", ".join(e.id for e in matches)
+            raise ItemIndexError(f'"{item_id_or_name}" matches more than one item: {ids}')
+        return matches[0].id
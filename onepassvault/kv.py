@@ -1,5 +1,9 @@
 from dataclasses import dataclass
 from enum import IntEnum
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from onepassvault.opw import OpItem, OpItemField, OpItemFieldType, SecretBuffer
+from onepassvault.opw.schema import conceal
 
 
 class Confidentiality(IntEnum):
@@ -18,21 +22,168 @@ class Mutability(IntEnum):
 
 
 class Field:
-    def __init__(self, visibility=Visibility.PLAIN, getter=None, setter=None):
+    """
+    Maps a 1Password item field to a KV secret key.
+
+    The key defaults to the attribute name of the field on its model, and the
+    label of the item field to the key. getter converts the item field value
+    (a string) to the secret value, setter converts it back (str by default).
+    HIDDEN fields are stored as concealed item fields, with SecretBuffer values.
+    """
+
+    def __init__(
+        self,
+        visibility: Visibility = Visibility.PLAIN,
+        getter: Optional[Callable[[Any], Any]] = None,
+        setter: Optional[Callable[[Any], str]] = None,
+        key: Optional[str] = None,
+        label: Optional[str] = None,
+    ):
         self.visibility = visibility
         self.getter = getter
         self.setter = setter
+        self.key = key
+        self.label = label
+
+    def __set_name__(self, owner, name: str):
+        self.key = self.key or name
+        self.label = self.label or self.key
+
+    def field_type(self, confidentiality: Confidentiality) -> OpItemFieldType:
+        if self.visibility == Visibility.HIDDEN or confidentiality >= Confidentiality.SECRET:
+            return OpItemFieldType.PASSWORD
+        return OpItemFieldType.TEXT
 
 
 @dataclass
 class DocumentModelConfig:
-    confidentiality: Confidentiality
-    mutability: Mutability
+    confidentiality: Confidentiality = Confidentiality.SECRET
+    mutability: Mutability = Mutability.MUTABLE
+    category: str = "API_CREDENTIAL"
+
+
+class FieldSpec(NamedTuple):
+    "A Field resolved against its model: item field label, secret key, item field type."
+
+    label: str
+    key: str
+    type: OpItemFieldType
+    getter: Callable[[Any], Any]
+    setter: Callable[[Any], str]
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _new_field(spec: FieldSpec, value: Any) -> OpItemField:
+    return OpItemField.model_construct(
+        id=spec.label,
+        label=spec.label,
+        type=spec.type,
+        value=conceal(spec.type, spec.setter(value)),
+        purpose=None,
+        reference=None,
+    )
 
 
 class DocumentModel:
-    pass
+    """
+    Declarative mapping between the fields of 1Password items and the keys of
+    KV secrets. Subclasses declare Fields as class attributes:
+
+        class Database(DocumentModel):
+            config = DocumentModelConfig(confidentiality=Confidentiality.PUBLIC)
+            host = Field()
+            port = Field(getter=int)
+            password = Field(visibility=Visibility.HIDDEN)
+
+        secrets = Database.to_secrets(items)
+
+    The fields of each model are resolved into a tuple of FieldSpecs once, when
+    the class is defined, so converting an item does not look up Field attributes.
+    """
+
+    config = DocumentModelConfig()
+    _fields: List[Field] = []
+    _specs: Tuple[FieldSpec, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = {}
+        for klass in reversed(cls.__mro__):
+            fields.update({k: v for k, v in vars(klass).items() if isinstance(v, Field)})
+        cls._fields = list(fields.values())
+        cls._specs = tuple(
+            FieldSpec(
+                label=f.label,
+                key=f.key,
+                type=f.field_type(cls.config.confidentiality),
+                getter=f.getter or _identity,
+                setter=f.setter or str,
+            )
+            for f in cls._fields
+        )
+
+    @classmethod
+    def keys(cls) -> List[str]:
+        return [spec.key for spec in cls._specs]
+
+    @classmethod
+    def to_secret(cls, item: OpItem) -> Dict[str, Any]:
+        "Returns the secret values of the model's fields that are set on the item."
+        fields = item.fields_by_label
+        secret = {}
+        for spec in cls._specs:
+            field = fields.get(spec.label)
+            if field is not None and field.value is not None:
+                value = field.value
+                if isinstance(value, SecretBuffer):
+                    value = value.reveal()
+                secret[spec.key] = spec.getter(value)
+        return secret
+
+    @classmethod
+    def to_secrets(cls, items: Iterable[OpItem]) -> List[Dict[str, Any]]:
+        return [cls.to_secret(item) for item in items]
+
+    @classmethod
+    def to_item(cls, values: Dict[str, Any], title: str) -> OpItem:
+        "Builds a new item from secret values; None values are left out."
+        item = OpItem({"title": title, "category": cls.config.category, "fields": []})
+        for spec in cls._specs:
+            value = values.get(spec.key)
+            if value is not None:
+                item.set_field(_new_field(spec, value))
+        return item
+
+    @classmethod
+    def update_item(cls, item: OpItem, values: Dict[str, Any]) -> OpItem:
+        "Sets the item fields of the non-None values; raises TypeError for immutable models."
+        if cls.config.mutability != Mutability.MUTABLE:
+            raise TypeError(f"{cls.__name__} items cannot be updated")
+        fields = item.fields_by_label
+        for spec in cls._specs:
+            value = values.get(spec.key)
+            if value is None:
+                continue
+            field = fields.get(spec.label)
+            if field is None:
+                item.set_field(_new_field(spec, value))
+            else:
+                field.value = conceal(spec.type, spec.setter(value))
+        return item
 
 
 class VaultConfig(DocumentModel):
-    pass
+    "Vault client configuration stored in a 1Password item, see VaultClientConfig."
+
+    config = DocumentModelConfig(confidentiality=Confidentiality.PUBLIC)
+
+    url = Field()
+    token = Field(visibility=Visibility.HIDDEN)
+    namespace = Field()
+    client_cert_path = Field()
+    client_cert_key_path = Field()
+    server_cert_path = Field()
+    timeout = Field()
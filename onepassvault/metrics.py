@@ -0,0 +1,326 @@
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Dict, Iterable, List, Tuple
+from urllib.parse import urlparse
+
+from onepassvault.opw import OnePassword, OpCall
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: counts per bucket (last one is +Inf), sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def time(self, **labels) -> "_Timer":
+        "Context manager observing the duration of its block."
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        value = self._values.get(self._key(labels))
+        return sum(value[0]) if value else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(c), t[0])) for key, (c, t) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    """
+    Metrics exported in the Prometheus text format.
+
+    The process-wide REGISTRY is fed by op calls (through a OnePassword call
+    hook), by Vault clients returned by open_vault, and by sync runs. Write it
+    to a file for the node_exporter textfile collector with write_textfile, or
+    serve it over HTTP with serve_metrics.
+
+    Byte counters have a direction label, from the point of view of opvault:
+    "sent" (piped to op, or in Vault requests) or "received".
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} is already registered")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def write_textfile(self, path: str):
+        "Writes all metrics to path atomically, as the textfile collector requires."
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+ITEMS = REGISTRY.counter(
+    "opvault_items_total", "Items processed by sync runs, by outcome.", ["outcome"]
+)
+SYNC_RUNS = REGISTRY.counter(
+    "opvault_sync_runs_total", "Sync runs, by job and result.", ["job", "result"]
+)
+SYNC_DURATION = REGISTRY.histogram(
+    "opvault_sync_duration_seconds", "Duration of sync runs.", ["job"]
+)
+SYNC_LAST_SUCCESS = REGISTRY.gauge(
+    "opvault_sync_last_success_timestamp_seconds",
+    "Unix time of the last successful run of each job.",
+    ["job"],
+)
+OP_CALL_SECONDS = REGISTRY.histogram(
+    "opvault_op_call_seconds", "Latency of op CLI calls, by subcommand.", ["subcommand"]
+)
+OP_CALL_ERRORS = REGISTRY.counter(
+    "opvault_op_call_errors_total", "Failed op CLI calls, by subcommand.", ["subcommand"]
+)
+OP_BYTES = REGISTRY.counter(
+    "opvault_op_bytes_total",
+    "Bytes piped to (direction sent) and read from (direction received) op CLI calls.",
+    ["direction"],
+)
+VAULT_REQUEST_SECONDS = REGISTRY.histogram(
+    "opvault_vault_request_seconds",
+    "Latency of Vault HTTP requests, by method and endpoint.",
+    ["method", "endpoint"],
+)
+VAULT_REQUEST_ERRORS = REGISTRY.counter(
+    "opvault_vault_request_errors_total",
+    "Vault HTTP requests that failed or returned an error status.",
+    ["method", "endpoint"],
+)
+VAULT_RETRIES = REGISTRY.counter(
+    "opvault_vault_retries_total", "Vault HTTP requests retried by the transport."
+)
+VAULT_BYTES = REGISTRY.counter(
+    "opvault_vault_bytes_total",
+    "Bytes sent to (direction sent) and received from (direction received) Vault.",
+    ["direction"],
+)
+
+
+@contextmanager
+def sync_run(job: str):
+    "Records the result and duration of the sync run in the block."
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        SYNC_RUNS.inc(job=job, result="failure")
+        raise
+    else:
+        SYNC_RUNS.inc(job=job, result="success")
+        SYNC_LAST_SUCCESS.set(time.time(), job=job)
+    finally:
+        SYNC_DURATION.observe(time.perf_counter() - start, job=job)
+
+
+def record_op_call(call: OpCall):
+    OP_CALL_SECONDS.observe(call.seconds, subcommand=call.subcommand)
+    if call.failed:
+        OP_CALL_ERRORS.inc(subcommand=call.subcommand)
+    OP_BYTES.inc(call.bytes_sent, direction="sent")
+    OP_BYTES.inc(call.bytes_received, direction="received")
+
+
+OnePassword.add_call_hook(record_op_call)
+
+# KV v2 endpoints, whose remaining path is a secret path
+_KV_ENDPOINTS = {"data", "metadata", "delete", "undelete", "destroy", "subkeys"}
+# Path segments kept for the API paths that are not secrets engines (e.g. /v1/sys/health)
+_SYSTEM_PATHS = {"sys": 3, "auth": 4}
+
+
+def vault_endpoint(url: str) -> str:
+    """
+    Returns the endpoint of a Vault request URL, without secret paths: the mount
+    and endpoint of KV v2 requests, and only the mount for other secrets engines,
+    whose paths may be secret names (e.g. KV v1).
+
+    e.g. /v1/secret/data/team/db -> /v1/secret/data, /v1/kv1/team/db -> /v1/kv1
+    """
+    parts = urlparse(url).path.strip("/").split("/")
+    if len(parts) > 1 and parts[1] in _SYSTEM_PATHS:
+        keep = _SYSTEM_PATHS[parts[1]]
+    elif len(parts) > 2 and parts[2] in _KV_ENDPOINTS:
+        keep = 3
+    else:
+        keep = 2
+    return "/" + "/".join(parts[:keep])
+
+
+def serve_metrics(port: int, addr: str = "127.0.0.1", registry: Registry = REGISTRY):
+    "Serves metrics at http://addr:port/metrics from a background thread, returns the server."
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
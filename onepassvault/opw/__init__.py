@@ -1,8 +1,23 @@
-from .client import OnePassword, OpItemNotFound, OpNotSignedIn, OpProcessError, OpVaultNotFound
+from .client import (
+    OnePassword,
+    OpCall,
+    OpCancelled,
+    OpDeadlineExceeded,
+    OpInterrupted,
+    OpItemNotFound,
+    OpNotSignedIn,
+    OpProcessError,
+    OpTimeout,
+    OpVaultNotFound,
+)
+from .deadline import Deadline
 from .schema import OpDocument, OpItem, OpItemField, OpItemFieldType, OpVault
+from .secret import SecretBuffer
+from .writes import UnitOfWork, WriteResult
 
 __all__ = [
     "OnePassword",
+    "OpCall",
     "OpItem",
     "OpItemFieldType",
     "OpItemField",
@@ -12,4 +27,12 @@ __all__ = [
     "OpNotSignedIn",
     "OpItemNotFound",
     "OpVaultNotFound",
+    "OpTimeout",
+    "OpInterrupted",
+    "OpCancelled",
+    "OpDeadlineExceeded",
+    "Deadline",
+    "SecretBuffer",
+    "UnitOfWork",
+    "WriteResult",
 ]
@@ -3,10 +3,19 @@ import json
 import os
 import re
 import shutil
-from subprocess import PIPE, Popen
-from typing import List, Optional, Set, Tuple, Union
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.context import BaseContext
+from subprocess import PIPE, Popen, TimeoutExpired
+from threading import Lock
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
 
-from .schema import OpDocument, OpItem, OpVault
+from .deadline import Deadline, kill
+from .schema import FieldTuple, OpDocument, OpItem, OpVault, parse_item
+from .secret import BytesLike, wipe
+from .writes import UnitOfWork
 
 
 def resolve_exe_path(executable: str) -> str:
@@ -40,6 +49,22 @@ class OpItemNotFound(OpProcessError):
     pass
 
 
+class OpTimeout(OpProcessError):
+    pass
+
+
+class OpInterrupted(OpProcessError):
+    "The run the call is part of was cancelled or ran out of time, see OnePassword.with_deadline."
+
+
+class OpCancelled(OpInterrupted):
+    pass
+
+
+class OpDeadlineExceeded(OpInterrupted, OpTimeout):
+    pass
+
+
 ERROR_MATCH = {
     "not signed in": OpNotSignedIn,
     "isn't a vault": OpVaultNotFound,
@@ -60,27 +85,134 @@ def op_exception(return_code: int, stderr: bytes) -> OpProcessError:
     return OpProcessError(return_code, message)
 
 
+def iter_json_objects(data: bytes) -> Iterator[Any]:
+    "Yields each JSON value in a stream of concatenated values, as output by op when piping."
+    decoder = json.JSONDecoder()
+    text = data.decode("utf-8")
+    pos = 0
+    end = len(text)
+    while True:
+        while pos < end and text[pos].isspace():
+            pos += 1
+        if pos == end:
+            return
+        obj, pos = decoder.raw_decode(text, pos)
+        yield obj
+
+
+def parse_items(data: bytes) -> List[Tuple[dict, List[FieldTuple]]]:
+    """
+    Parses and validates a stream of items output by op.
+
+    Returns compact field tuples, which are cheap to send back from a worker process.
+    """
+    return [parse_item(item) for item in iter_json_objects(data)]
+
+
+def _parse_pool_context() -> BaseContext:
+    methods = get_all_start_methods()
+    return get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+DETAILS_CHUNK_SIZE = 100
+
 VaultOrStr = Union[OpVault, str]
 
+# op subcommands whose second word is part of the command (e.g. "item get")
+_OP_COMMAND_GROUPS = {"item", "document", "vault", "user", "group", "account", "connect"}
+
+
+def op_subcommand(args: List[str]) -> str:
+    if len(args) > 1 and args[0] in _OP_COMMAND_GROUPS:
+        return f"{args[0]} {args[1]}"
+    return args[0] if args else ""
+
+
+class OpCall(NamedTuple):
+    "An op call, as passed to the hooks added with OnePassword.add_call_hook."
+
+    subcommand: str
+    seconds: float
+    # Bytes piped to op, and read from its output
+    bytes_sent: int
+    bytes_received: int
+    failed: bool
+
+
+CallHook = Callable[[OpCall], None]
+
 
 class OnePassword:
-    "OnePassword is a Python wrapper around the 1Password CLI tool."
+    """
+    OnePassword is a Python wrapper around the 1Password CLI tool.
+
+    fetch_workers bounds the number of concurrent op calls made by bulk fetches, and
+    parse_workers, if set, is the size of a process pool used to parse their output.
+    """
+
+    # Called after every op call of any client, see add_call_hook
+    call_hooks: List[CallHook] = []
+
+    @classmethod
+    def add_call_hook(cls, hook: CallHook):
+        "Calls hook with an OpCall after each op call, e.g. to record metrics."
+        if hook not in cls.call_hooks:
+            cls.call_hooks.append(hook)
 
     def __init__(
         self,
         account_url: Optional[str] = None,
         op_executable: str = "op",
         subprocess_timeout: int = 30,
+        fetch_workers: int = 1,
+        parse_workers: int = 0,
     ):
         self.op_exe = resolve_exe_path(op_executable)
+        self.fetch_workers = max(1, fetch_workers)
+        self.parse_workers = parse_workers
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = Lock()
         self.timeout = float(subprocess_timeout)
         self.account_url = account_url
         self.account = None
         self.default_vault = None
         self._valid_template_names = None
         self._templates = {}
-
-    def call(self, args, in_bytes: Optional[bytes] = None, json_format=True):
+        self.deadline: Optional[Deadline] = None
+
+    @contextmanager
+    def with_deadline(self, seconds: Optional[float] = None) -> Iterator[Deadline]:
+        """
+        Bounds all the op calls made by this client, from any thread, until the
+        end of the block: each call times out when the deadline passes, and no
+        call starts after it passed or after deadline.cancel(). Those calls
+        raise OpInterrupted, the op processes they started are killed and reaped.
+
+        Bulk operations such as get_items_details(partial=True) and sync.push
+        stop at the deadline and return what they completed.
+        """
+        if self.deadline is not None:
+            raise RuntimeError("A deadline is already set on this client")
+        self.deadline = Deadline(seconds)
+        try:
+            yield self.deadline
+        finally:
+            self.deadline = None
+
+    def _check_deadline(self, deadline: Deadline, subcommand: str):
+        if deadline.cancelled:
+            raise OpCancelled(None, f"Run cancelled, not running op {subcommand}")
+        if deadline.expired:
+            raise OpDeadlineExceeded(None, f"Deadline passed, not running op {subcommand}")
+
+    def call(self, args, in_bytes: Optional[BytesLike] = None, json_format=True):
+        """
+        Runs op with args. in_bytes, written to its stdin, can be a mutable
+        buffer (such as the output of OpItem.to_json), it is not copied.
+
+        op is killed if it runs longer than subprocess_timeout, or than the time
+        left before the deadline, if one is set (raising OpTimeout).
+        """
         if in_bytes is not None:
             stdin = PIPE
         else:
@@ -92,12 +224,43 @@ class OnePassword:
         if self.account_url:
             cmd += ["--account", self.account_url]
 
-        p = Popen(cmd, stdout=PIPE, stderr=PIPE, stdin=stdin)
-        out_data, err_data = p.communicate(in_bytes, timeout=self.timeout)
+        subcommand = op_subcommand(args)
+        deadline = self.deadline
+        timeout = self.timeout
+        if deadline is not None:
+            self._check_deadline(deadline, subcommand)
+            timeout = deadline.timeout(timeout)
+        start = time.perf_counter()
+        out_data = b""
+        failed = True
+        try:
+            p = Popen(cmd, stdout=PIPE, stderr=PIPE, stdin=stdin)
+            with deadline.track(p) if deadline is not None else nullcontext():
+                try:
+                    out_data, err_data = p.communicate(in_bytes, timeout=timeout)
+                except TimeoutExpired:
+                    kill(p)
+                    p.communicate()
+                    if deadline is not None and deadline.done:
+                        self._check_deadline(deadline, subcommand)
+                    raise OpTimeout(p.returncode, f"op {subcommand} timed out after {timeout:g}s")
+            if deadline is not None and deadline.cancelled and p.returncode != 0:
+                raise OpCancelled(p.returncode, f"Run cancelled, op {subcommand} was killed")
+            if p.returncode != 0:
+                raise op_exception(p.returncode, err_data)
+            failed = False
+        finally:
+            call = OpCall(
+                subcommand=subcommand,
+                seconds=time.perf_counter() - start,
+                bytes_sent=len(in_bytes) if in_bytes is not None else 0,
+                bytes_received=len(out_data),
+                failed=failed,
+            )
+            for hook in self.call_hooks:
+                hook(call)
 
-        if p.returncode != 0:
-            raise op_exception(p.returncode, err_data)
-        elif json_format:
+        if json_format:
             if out_data:
                 return json.loads(out_data)
             else:
@@ -139,12 +302,106 @@ class OnePassword:
         items = self.call(self._with_vault(["item", "list"], vault))
         return [OpItem(item) for item in items]
 
+    def get_items_details(
+        self,
+        items: List[OpItem],
+        chunk_size: int = DETAILS_CHUNK_SIZE,
+        partial: bool = False,
+        skip_missing: bool = False,
+    ) -> List[OpItem]:
+        """
+        Gets the full details (including fields) of listed items.
+
+        Items are fetched chunk_size at a time with piped op calls, up to
+        fetch_workers calls at once. With parse_workers, the JSON output of each
+        call is parsed and validated in a process pool.
+
+        With partial, the chunks not fetched because the run was interrupted
+        (see with_deadline) are left out, instead of raising OpInterrupted.
+
+        A chunk with an item that no longer exists (deleted since it was listed)
+        fails with OpItemNotFound. With skip_missing, its items are fetched again
+        one at a time instead, and the missing ones are left out.
+        """
+        chunks = self.iter_items_details(items, chunk_size, partial, skip_missing)
+        return [item for chunk in chunks for item in chunk]
+
+    def iter_items_details(
+        self,
+        items: List[OpItem],
+        chunk_size: int = DETAILS_CHUNK_SIZE,
+        partial: bool = False,
+        skip_missing: bool = False,
+    ) -> Iterator[List[OpItem]]:
+        "Like get_items_details, but yields each chunk in order as soon as it is fetched."
+        if not items:
+            return
+
+        def get_items(chunk: List[OpItem]) -> List[OpItem]:
+            try:
+                return self._get_items_chunk(chunk)
+            except OpItemNotFound:
+                if not skip_missing:
+                    raise
+                if len(chunk) == 1:
+                    return []
+                return [item for one in chunk for item in get_items([one])]
+
+        def get_chunk(chunk: List[OpItem]) -> List[OpItem]:
+            try:
+                return get_items(chunk)
+            except OpInterrupted:
+                if not partial:
+                    raise
+                return []
+
+        chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+        if len(chunks) == 1 or self.fetch_workers == 1:
+            yield from map(get_chunk, chunks)
+            return
+        pool = ThreadPoolExecutor(max_workers=self.fetch_workers)
+        try:
+            yield from pool.map(get_chunk, chunks)
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def _get_items_chunk(self, items: List[OpItem]) -> List[OpItem]:
+        in_bytes = json.dumps([{"id": item.id, "vault": item._data.get("vault")} for item in items])
+        out_data = self.call(
+            ["item", "get", "-", "--format", "json"],
+            in_bytes=in_bytes.encode("utf-8"),
+            json_format=False,
+        )
+        if self.parse_workers:
+            parsed = self._get_parse_pool().submit(parse_items, out_data).result()
+        else:
+            parsed = parse_items(out_data)
+        return [OpItem.from_parsed(data, fields) for data, fields in parsed]
+
+    def _get_parse_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._parse_pool is None:
+                # Forking a process with running threads (fetch workers, messaging) can
+                # deadlock the child, start workers from a clean process instead
+                self._parse_pool = ProcessPoolExecutor(
+                    max_workers=self.parse_workers, mp_context=_parse_pool_context()
+                )
+            return self._parse_pool
+
+    def close(self):
+        "Shuts down the parsing process pool, if one was started."
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+
     def create_item(self, item: OpItem, vault: Optional[VaultOrStr] = None) -> OpItem:
         if item.id:
             raise ValueError("Cannot create item with an id, use update_item")
-        created = self.call(
-            self._with_vault(["item", "create", "-"], vault), in_bytes=item.to_json()
-        )
+        payload = item.to_json()
+        try:
+            created = self.call(self._with_vault(["item", "create", "-"], vault), in_bytes=payload)
+        finally:
+            wipe(payload)
         return OpItem(created)
 
     def create_item_from_template(
@@ -154,13 +411,46 @@ class OnePassword:
         tmpl["title"] = title
         return self.create_item(OpItem(tmpl), vault=vault)
 
+    @contextmanager
+    def unit_of_work(self, max_workers: Optional[int] = None) -> Iterator[UnitOfWork]:
+        """
+        Returns a UnitOfWork buffering the update_item and update_document calls
+        made on it until the end of the block, then writes each updated item
+        once, up to max_workers (default fetch_workers) items at a time. Calls
+        made on the client itself are not buffered, so units of work of
+        concurrent jobs sharing a client are independent.
+
+        While buffered, updates return the buffered item, whose version is not
+        bumped. The outcome of each item is in the unit of work's results after
+        the block; if the block raises, buffered updates are discarded.
+
+            with op.unit_of_work() as writes:
+                for item in items:
+                    writes.update_item(item)
+            failed = [r for r in writes.results if not r.ok]
+        """
+        unit_of_work = UnitOfWork(self, max_workers or self.fetch_workers)
+        try:
+            yield unit_of_work
+        except BaseException:
+            unit_of_work.discard()
+            raise
+        unit_of_work.flush()
+
     def update_item(self, item: OpItem) -> OpItem:
+        return self._edit_item(item)
+
+    def _edit_item(self, item: OpItem) -> OpItem:
         item_id = item.id
         vault_id = item.vault.id
         assert item_id and vault_id
-        updated = self.call(
-            self._with_vault(["item", "edit", item_id], vault=vault_id), in_bytes=item.to_json()
-        )
+        payload = item.to_json()
+        try:
+            updated = self.call(
+                self._with_vault(["item", "edit", item_id], vault=vault_id), in_bytes=payload
+            )
+        finally:
+            wipe(payload)
         return OpItem(updated)
 
     def delete_item(self, item: OpItem):
@@ -173,11 +463,15 @@ class OnePassword:
         self, item_id_or_name: str, vault: Optional[VaultOrStr] = None
     ) -> Tuple[OpDocument, bytes]:
         item = self.get_item(item_id_or_name)
-        contents = self.call(
+        return OpDocument.from_item(item, self.get_document_contents(item_id_or_name, vault))
+
+    def get_document_contents(
+        self, item_id_or_name: str, vault: Optional[VaultOrStr] = None
+    ) -> bytes:
+        return self.call(
             self._with_vault(["document", "get", "--force", item_id_or_name], vault),
             json_format=False,
         )
-        return OpDocument.from_item(item, contents)
 
     def create_document(
         self,
@@ -201,18 +495,30 @@ class OnePassword:
         filename: Optional[str] = None,
         title: Optional[str] = None,
     ) -> OpDocument:
+        self._edit_document_contents(document, contents, filename, title)
+        updated_item = self._edit_item(document)
+        return OpDocument.from_item(updated_item, contents)
+
+    def _edit_document_contents(
+        self,
+        document: OpItem,
+        contents: bytes,
+        filename: Optional[str] = None,
+        title: Optional[str] = None,
+    ):
         cmd = ["document", "edit", document.id, "-"]
         if filename:
             cmd += ["--file-name", filename]
         if title:
             cmd += ["--title", title]
         self.call(cmd, in_bytes=contents)
-        updated_item = self.update_item(document)
-        return OpDocument.from_item(updated_item, contents)
 
     def delete_document(self, document: OpDocument):
         self.delete_item(document)
 
+    def get_vaults(self) -> List[OpVault]:
+        return [OpVault.model_validate(data) for data in self.call(["vault", "list"])]
+
     def get_vault(self, vault: VaultOrStr) -> OpVault:
         data = self.call(["vault", "get", self._get_vault_id_or_name(vault)])
         return OpVault.model_validate(data)
@@ -0,0 +1,71 @@
+import time
+from contextlib import contextmanager
+from subprocess import Popen
+from threading import Event, Lock
+from typing import Iterator, Optional, Set
+
+
+class Deadline:
+    """
+    A time budget and cancellation flag shared by the op calls of a run, see
+    OnePassword.deadline.
+
+    Each call is given the remaining budget as its timeout. cancel() kills the
+    op processes still running, and makes calls fail instead of starting.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self._cancelled = Event()
+        self._processes: Set[Popen] = set()
+        self._lock = Lock()
+
+    def remaining(self) -> Optional[float]:
+        "Seconds left, None if there is no time limit."
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, default: float) -> float:
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self.cancelled or self.expired
+
+    def cancel(self):
+        "Kills the running op processes. Safe to call from a signal handler."
+        self._cancelled.set()
+        # Not using the lock, so that a signal cannot deadlock a thread holding it
+        for process in list(self._processes):
+            kill(process)
+
+    @contextmanager
+    def track(self, process: Popen) -> Iterator[Popen]:
+        "Registers a running process, to be killed on cancel."
+        with self._lock:
+            self._processes.add(process)
+        if self.cancelled:
+            kill(process)
+        try:
+            yield process
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+
+
+def kill(process: Popen):
+    if process.poll() is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
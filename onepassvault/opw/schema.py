@@ -1,10 +1,11 @@
-import copy
 import json
 from enum import Enum
-from typing import Any, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 from pydantic import BaseModel
 
+from .secret import SecretBuffer, write_json_string
+
 
 class OpVault(BaseModel):
     id: str
@@ -50,12 +51,64 @@ class OpItemField(BaseModel):
         return cls(id=name, label=name, type=type, value=value, purpose=purpose)
 
 
+def conceal(type: OpItemFieldType, value: Any) -> Any:
+    "Wraps the str value of a concealed field in a SecretBuffer, other values are returned as is."
+    if type == OpItemFieldType.PASSWORD and isinstance(value, str):
+        return SecretBuffer(value)
+    return value
+
+
+_MISSING = object()
+
+OP_ITEM_FIELD_ATTRS = ("id", "type", "value", "purpose", "label", "reference")
+
+FieldTuple = Tuple[Any, ...]
+
+
+def field_to_tuple(field: OpItemField) -> FieldTuple:
+    return tuple(getattr(field, attr) for attr in OP_ITEM_FIELD_ATTRS)
+
+
+def field_from_tuple(values: FieldTuple) -> OpItemField:
+    "Builds a field from a tuple of already validated values, skipping validation."
+    return OpItemField.model_construct(**dict(zip(OP_ITEM_FIELD_ATTRS, values)))
+
+
+def parse_item(data: dict) -> Tuple[dict, List[FieldTuple]]:
+    "Validates the fields of raw item data, returns them as compact tuples."
+    fields = data.pop("fields", [])
+    return data, [field_to_tuple(OpItemField.model_validate(f)) for f in fields]
+
+
+class ItemChanges(NamedTuple):
+    "The changes made to an OpItem since it was fetched or built, see OpItem.changes."
+
+    data: Dict[str, Any]
+    removed_data: List[str]
+    fields: List[OpItemField]
+    removed_fields: List[str]
+
+
 class OpItem:
     def __init__(self, data: dict):
         self._data = data
-        fields = data.pop("fields", [])
-        self.fields_by_id = {f["id"]: OpItemField.model_validate(f) for f in fields}
-        self.fields_by_label = {f["label"]: OpItemField.model_validate(f) for f in fields}
+        fields = [OpItemField.model_validate(f) for f in data.pop("fields", [])]
+        self._set_fields(fields)
+        self._base = (dict(data), [field_to_tuple(f) for f in fields])
+
+    def _set_fields(self, fields: List[OpItemField]):
+        # Both maps share the same field objects, so edits by label or id are both kept
+        self.fields_by_id = {f.id: f for f in fields}
+        self.fields_by_label = {f.label: f for f in fields}
+
+    @classmethod
+    def from_parsed(cls, data: dict, fields: List[FieldTuple]) -> "OpItem":
+        "Builds an item from the output of parse_item."
+        item = cls.__new__(cls)
+        item._data = data
+        item._set_fields([field_from_tuple(f) for f in fields])
+        item._base = (dict(data), fields)
+        return item
 
     @property
     def id(self) -> Optional[str]:
@@ -69,6 +122,18 @@ class OpItem:
     def title(self) -> Optional[str]:
         return self._data.get("title")
 
+    @property
+    def version(self) -> Optional[int]:
+        return self._data.get("version")
+
+    @property
+    def tags(self) -> List[str]:
+        return self._data.get("tags") or []
+
+    @property
+    def urls(self) -> List[str]:
+        return [url["href"] for url in self._data.get("urls") or [] if url.get("href")]
+
     @property
     def vault(self) -> Optional[OpVault]:
         if "vault" in self._data:
@@ -120,22 +185,67 @@ class OpItem:
         fieldmap = self.fields_by_label if by_label else self.fields_by_id
         return key in fieldmap
 
-    def to_json(self) -> bytes:
-        data = copy.deepcopy(self._data)
-        data["fields"] = [f.model_dump() for f in self.fields_by_id.values()]
-        return json.dumps(data).encode("utf-8")
+    def changes(self) -> ItemChanges:
+        """
+        Returns the attributes and fields that were set or removed since the item
+        was fetched or built. Attributes are compared shallowly, so a list edited
+        in place is not seen as changed.
+        """
+        base_data, base_fields = self._base
+        base_fields_by_id = {f[0]: f for f in base_fields}
+        return ItemChanges(
+            data={k: v for k, v in self._data.items() if base_data.get(k, _MISSING) != v},
+            removed_data=[k for k in base_data if k not in self._data],
+            fields=[
+                f
+                for f in self.fields_by_id.values()
+                if base_fields_by_id.get(f.id) != field_to_tuple(f)
+            ],
+            removed_fields=[i for i in base_fields_by_id if i not in self.fields_by_id],
+        )
+
+    def to_json(self) -> bytearray:
+        """
+        Serializes the item for op. Field values are written straight into the
+        output buffer, SecretBuffer values without being decoded; the caller
+        should wipe the buffer once it has been sent.
+        """
+        out = bytearray(json.dumps(self._data)[:-1].encode("utf-8"))
+        out += b', "fields": [' if self._data else b'"fields": ['
+        for i, field in enumerate(self.fields_by_id.values()):
+            if i:
+                out += b", "
+            out += json.dumps(field.model_dump(exclude={"value"}))[:-1].encode("utf-8")
+            out += b', "value": '
+            if isinstance(field.value, SecretBuffer):
+                field.value.write_json(out)
+            elif isinstance(field.value, str):
+                write_json_string(out, field.value.encode("utf-8"))
+            else:
+                out += json.dumps(field.value).encode("utf-8")
+            out += b"}"
+        out += b"]}"
+        return out
 
 
 class OpDocument(OpItem):
     def __init__(self, data: dict, contents: bytes):
         super().__init__(data)
         if self.category != "DOCUMENT":
-            raise TypeError(f"This item is of type {self.type}, not DOCUMENT")
+            raise TypeError(f"This item is of type {self.category}, not DOCUMENT")
         self.contents = contents
 
     @classmethod
     def from_item(cls, item: OpItem, contents: bytes) -> "OpDocument":
-        return cls(data=item._data, contents=contents)
+        if item.category != "DOCUMENT":
+            raise TypeError(f"This item is of type {item.category}, not DOCUMENT")
+        # item._data no longer has its fields, share the parsed ones instead
+        document = cls.__new__(cls)
+        document._data = item._data
+        document._set_fields(list(item.fields_by_id.values()))
+        document._base = item._base
+        document.contents = contents
+        return document
 
     @property
     def filename(self):
@@ -0,0 +1,101 @@
+import hmac
+import re
+from typing import Union
+
+# Bytes that must be escaped in a JSON string, UTF-8 sequences are written as is
+RE_JSON_ESCAPE = re.compile(rb'["\\\x00-\x1f]')
+JSON_ESCAPES = {ord('"'): b'\\"', ord("\\"): b"\\\\"}
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def wipe(buffer: Union[bytearray, memoryview]):
+    "Overwrites a mutable buffer with zeros, in place."
+    view = memoryview(buffer).cast("B")
+    view[:] = bytes(len(view))
+
+
+def write_json_string(out: bytearray, value: BytesLike):
+    "Appends UTF-8 encoded value to out as a JSON string, without decoding it."
+    view = memoryview(value)
+    out += b'"'
+    start = 0
+    for m in RE_JSON_ESCAPE.finditer(value):
+        out += view[start : m.start()]
+        char = value[m.start()]
+        out += JSON_ESCAPES.get(char) or b"\\u%04x" % char
+        start = m.end()
+    out += view[start:]
+    out += b'"'
+
+
+class SecretBuffer:
+    """
+    A secret value held in a mutable buffer, so that it can be wiped.
+
+    The value is only decoded to a str on reveal(); it is serialized to JSON
+    straight from its buffer, and is wiped when the SecretBuffer is, or when it
+    is garbage collected. It is masked in str() and repr().
+
+        with SecretBuffer(password) as secret:
+            item.set_field_value("password", secret)
+            op.update_item(item)
+    """
+
+    __slots__ = ("_buffer",)
+
+    def __init__(self, value: Union[str, BytesLike] = b""):
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        self._buffer = bytearray(value)
+
+    @classmethod
+    def adopt(cls, buffer: bytearray) -> "SecretBuffer":
+        "Wraps buffer without copying it; wiping the SecretBuffer wipes buffer."
+        secret = cls.__new__(cls)
+        secret._buffer = buffer
+        return secret
+
+    def view(self) -> memoryview:
+        return memoryview(self._buffer)
+
+    def reveal(self) -> str:
+        return self._buffer.decode("utf-8")
+
+    def write_json(self, out: bytearray):
+        write_json_string(out, self._buffer)
+
+    def wipe(self):
+        wipe(self._buffer)
+        del self._buffer[:]
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SecretBuffer):
+            other = other._buffer
+        elif isinstance(other, str):
+            other = other.encode("utf-8")
+        elif not isinstance(other, (bytes, bytearray)):
+            return NotImplemented
+        return hmac.compare_digest(self._buffer, other)
+
+    __hash__ = None
+
+    def __str__(self) -> str:
+        return "**********"
+
+    def __repr__(self) -> str:
+        return f"SecretBuffer('{self}')"
+
+    def __enter__(self) -> "SecretBuffer":
+        return self
+
+    def __exit__(self, *exc):
+        self.wipe()
+
+    def __del__(self):
+        # __init__ may have failed before the buffer was set
+        if getattr(self, "_buffer", None) is not None:
+            self.wipe()
@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from .schema import OpDocument, OpItem
+
+if TYPE_CHECKING:
+    from .client import OnePassword, VaultOrStr
+
+
+@dataclass
+class WriteResult:
+    "The outcome of the buffered writes of one item."
+
+    item_id: str
+    # Number of update_item/update_document calls merged into this write
+    updates: int
+    item: Optional[OpItem] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _PendingWrite:
+    def __init__(self, item: OpItem):
+        self.item = item
+        self.updates = 0
+        self.contents: Optional[bytes] = None
+        self.filename: Optional[str] = None
+        self.title: Optional[str] = None
+
+
+def merge_item(into: OpItem, item: OpItem):
+    """
+    Applies the changes made to item since it was fetched (see OpItem.changes)
+    to into, another copy of the same item. Attributes and fields that item
+    did not change keep the values of into.
+    """
+    changes = item.changes()
+    into._data.update(changes.data)
+    for key in changes.removed_data:
+        into._data.pop(key, None)
+    for field_id in changes.removed_fields:
+        if into.has_field(field_id, by_label=False):
+            into.remove_field(field_id, by_label=False)
+    for field in changes.fields:
+        if into.has_field(field.id, by_label=False):
+            into.remove_field(field.id, by_label=False)
+        into.set_field(field)
+
+
+class UnitOfWork:
+    """
+    Buffers item updates, see OnePassword.unit_of_work.
+
+    Updates of the same item are merged into a single op item edit (preceded
+    by a document edit for documents whose contents changed), and items are
+    written concurrently on flush.
+
+    The first update of an item buffers that OpItem. Later updates of other
+    copies of it only apply the changes made to those copies since they were
+    fetched, with merge_item, so that a stale copy does not revert the fields
+    changed through the buffered one. get_item returns the buffered copy of an
+    item, so edits made in between see each other.
+    """
+
+    def __init__(self, op: "OnePassword", max_workers: int = 1):
+        self.op = op
+        self.max_workers = max(1, max_workers)
+        self.results: List[WriteResult] = []
+        self._pending: Dict[str, _PendingWrite] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def get_item(self, item_id: str, vault: Optional["VaultOrStr"] = None) -> OpItem:
+        "Returns the buffered copy of an item if it has pending updates, else fetches it."
+        with self._lock:
+            pending = self._pending.get(item_id)
+        if pending is not None:
+            return pending.item
+        return self.op.get_item(item_id, vault)
+
+    def _add(self, item: OpItem) -> _PendingWrite:
+        if not item.id:
+            raise ValueError("Cannot update an item without an id, use create_item")
+        with self._lock:
+            pending = self._pending.get(item.id)
+            if pending is None:
+                pending = self._pending[item.id] = _PendingWrite(item)
+            elif pending.item is not item:
+                merge_item(pending.item, item)
+            pending.updates += 1
+            return pending
+
+    def update_item(self, item: OpItem) -> OpItem:
+        "Buffers an item update, returns the buffered item (its version is not bumped)."
+        return self._add(item).item
+
+    def update_document(
+        self,
+        document: OpDocument,
+        contents: bytes,
+        filename: Optional[str] = None,
+        title: Optional[str] = None,
+    ) -> OpDocument:
+        pending = self._add(document)
+        with self._lock:
+            pending.contents = contents
+            pending.filename = filename or pending.filename
+            pending.title = title or pending.title
+        return OpDocument.from_item(pending.item, contents)
+
+    def _write(self, item_id: str, pending: _PendingWrite) -> WriteResult:
+        result = WriteResult(item_id=item_id, updates=pending.updates)
+        try:
+            if pending.contents is not None:
+                self.op._edit_document_contents(
+                    pending.item, pending.contents, pending.filename, pending.title
+                )
+            result.item = self.op._edit_item(pending.item)
+            if pending.contents is not None:
+                result.item = OpDocument.from_item(result.item, pending.contents)
+        except Exception as e:
+            result.error = e
+        return result
+
+    def flush(self) -> List[WriteResult]:
+        "Writes the buffered updates, returns the outcome of each item."
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if len(pending) <= 1 or self.max_workers == 1:
+            results = [self._write(item_id, p) for item_id, p in pending.items()]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(lambda kv: self._write(*kv), pending.items()))
+        self.results.extend(results)
+        return results
+
+    def discard(self):
+        with self._lock:
+            self._pending.clear()
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+import hvac
+from hvac.exceptions import InvalidPath
+
+from clickio.output import echo_info_v
+from onepassvault.opw import OnePassword
+from onepassvault.opw.client import VaultOrStr
+from onepassvault.sync import (
+    DEFAULT_MOUNT_POINT,
+    Fingerprint,
+    item_path,
+    item_vault_id,
+    read_fingerprint,
+)
+
+DEFAULT_MAX_WORKERS = 16
+
+ORPHAN_DELETED = "deleted"
+ORPHAN_RENAMED = "renamed"
+
+
+def _list(client: hvac.Client, folder: str, mount_point: str) -> List[str]:
+    try:
+        response = client.secrets.kv.v2.list_secrets(folder, mount_point=mount_point)
+    except InvalidPath:
+        return []
+    return response["data"]["keys"]
+
+
+def list_secrets_recursive(
+    client: hvac.Client,
+    prefix: str = "",
+    mount_point: str = DEFAULT_MOUNT_POINT,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[str]:
+    "Lists the paths of all the secrets under prefix, listing folders concurrently."
+    paths = []
+    folders = [prefix.strip("/") + "/" if prefix.strip("/") else ""]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Breadth-first, each level of folders is listed in parallel
+        while folders:
+            next_folders = []
+            for folder, keys in zip(
+                folders, pool.map(lambda f: _list(client, f, mount_point), folders)
+            ):
+                for key in keys:
+                    if key.endswith("/"):
+                        next_folders.append(folder + key)
+                    else:
+                        paths.append(folder + key)
+            folders = next_folders
+    return sorted(paths)
+
+
+@dataclass
+class PruneReport:
+    scanned: int = 0
+    managed: int = 0
+    orphans: List[Tuple[str, str]] = field(default_factory=list)
+    removed: int = 0
+    dry_run: bool = True
+
+    def __str__(self):
+        removed = "dry run, none removed" if self.dry_run else f"{self.removed} removed"
+        return (
+            f"{self.scanned} secrets scanned, {self.managed} written by sync,"
+            f" {len(self.orphans)} orphaned ({removed})"
+        )
+
+
+def find_orphans(
+    paths: List[str],
+    fingerprints: Dict[str, Optional[Fingerprint]],
+    expected: Dict[str, str],
+    vault_ids: Set[str],
+) -> List[Tuple[str, str]]:
+    """
+    Returns the (path, reason) of the secrets written by sync whose item no longer
+    exists (deleted), or is now pushed to another path (renamed).
+
+    expected maps the id of each current item to its path, and vault_ids are the
+    vaults it was listed from. Only secrets pushed from one of those vaults are
+    candidates; secrets of other vaults (e.g. pushed by another job to a nested
+    prefix), or whose fingerprint has no vault id, are left alone. A secret is
+    only considered renamed once the item was pushed to its new path, so that
+    pruning before pushing does not remove the only copy.
+    """
+    orphans = []
+    for path in paths:
+        fp = fingerprints.get(path)
+        if fp is None or fp.vault_id not in vault_ids:
+            continue
+        current_path = expected.get(fp.item_id)
+        if current_path is None:
+            orphans.append((path, ORPHAN_DELETED))
+        elif current_path != path:
+            current_fp = fingerprints.get(current_path)
+            if current_fp is not None and current_fp.item_id == fp.item_id:
+                orphans.append((path, ORPHAN_RENAMED))
+    return orphans
+
+
+def prune(
+    op: OnePassword,
+    client: hvac.Client,
+    vault: Optional[VaultOrStr] = None,
+    mount_point: str = DEFAULT_MOUNT_POINT,
+    prefix: str = "",
+    dry_run: bool = True,
+    destroy: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> PruneReport:
+    """
+    Removes the KV secrets under prefix that were pushed from 1Password items
+    that have since been deleted or renamed.
+
+    Only secrets with a sync fingerprint recording one of the listed vaults are
+    considered, so secrets not written by a push of this vault are never removed.
+    Use the same vault and prefix as the push.
+
+    By default nothing is removed (dry_run). Otherwise, the latest version of
+    orphans is deleted (recoverable with vault kv undelete), or with destroy, the
+    orphans and all their versions are permanently removed. The chunks of
+    orphaned documents are always destroyed.
+    """
+    items = op.get_items(vault)
+    if not items:
+        raise ValueError("No 1Password items listed, refusing to prune everything")
+    expected = {item.id: item_path(item, prefix) for item in items}
+    vault_ids = {item_vault_id(item) for item in items} - {None}
+
+    paths = list_secrets_recursive(client, prefix, mount_point, max_workers)
+    report = PruneReport(scanned=len(paths), dry_run=dry_run)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        fingerprints = dict(
+            zip(paths, pool.map(lambda p: read_fingerprint(client, p, mount_point), paths))
+        )
+        report.managed = sum(1 for fp in fingerprints.values() if fp is not None)
+        report.orphans = find_orphans(paths, fingerprints, expected, vault_ids)
+        if dry_run:
+            return report
+
+        orphaned = {path for path, _ in report.orphans}
+        chunks = {
+            path
+            for path in paths
+            if "/chunks/" in path and path.rsplit("/chunks/", 1)[0] in orphaned
+        }
+
+        def remove(path: str):
+            if destroy or path in chunks:
+                client.secrets.kv.v2.delete_metadata_and_all_versions(path, mount_point=mount_point)
+            else:
+                client.secrets.kv.v2.delete_latest_version_of_secret(path, mount_point=mount_point)
+            echo_info_v(f"Removed {mount_point}/{path}")
+
+        list(pool.map(remove, sorted(chunks) + sorted(orphaned)))
+    report.removed = len(orphaned)
+    return report
@@ -0,0 +1,232 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Set
+
+import hvac
+from hvac.exceptions import InvalidPath
+
+from clickio.output import echo_info_vv
+from onepassvault.prune import DEFAULT_MAX_WORKERS, list_secrets_recursive
+from onepassvault.sync import DEFAULT_MOUNT_POINT, Fingerprint
+
+
+@dataclass(frozen=True)
+class SecretMeta:
+    "The metadata of a KV secret, without its data."
+
+    path: str
+    current_version: int
+    updated_time: Optional[str]
+    custom_metadata: Optional[Dict[str, str]] = None
+
+    @classmethod
+    def from_response(cls, path: str, data: dict) -> "SecretMeta":
+        return cls(
+            path=path,
+            current_version=data["current_version"],
+            updated_time=data.get("updated_time"),
+            custom_metadata=data.get("custom_metadata"),
+        )
+
+    @property
+    def fingerprint(self) -> Optional[Fingerprint]:
+        return Fingerprint.from_metadata(self.custom_metadata)
+
+
+class _Node:
+    "A KV folder: its subfolders, secrets, and when it was last listed."
+
+    __slots__ = ("folders", "secrets", "listed_at")
+
+    def __init__(self):
+        self.folders: Dict[str, _Node] = {}
+        self.secrets: Dict[str, SecretMeta] = {}
+        self.listed_at: float = 0.0
+
+    def walk(self) -> Iterator[SecretMeta]:
+        yield from self.secrets.values()
+        for node in self.folders.values():
+            yield from node.walk()
+
+
+def _split(path: str) -> List[str]:
+    return [part for part in path.strip("/").split("/") if part]
+
+
+@dataclass
+class RefreshStats:
+    relisted: List[str] = field(default_factory=list)
+    metadata_reads: int = 0
+
+    def __str__(self):
+        return f"{len(self.relisted)} subtrees listed, {self.metadata_reads} metadata reads"
+
+
+class KVSnapshot:
+    """
+    In-memory trie of the secrets under a prefix of a KV mount, with their
+    metadata (versions, updated time, sync fingerprint) but not their data.
+
+    The first refresh lists the whole prefix, listing folders and reading
+    metadata concurrently. After that, KV has no way to tell which folders
+    changed, so refresh only re-lists the subtrees that were invalidated, and
+    re-reads the metadata of invalidated secrets. Writers keep the snapshot
+    current by invalidating what they write; with max_age, subtrees that were
+    not listed for that many seconds are re-listed as well, to pick up changes
+    made by other Vault clients.
+
+        snapshot = KVSnapshot(client, prefix="team", max_age=3600)
+        snapshot.refresh()
+        for meta in snapshot.secrets("team/db"):
+            ...
+    """
+
+    def __init__(
+        self,
+        client: hvac.Client,
+        mount_point: str = DEFAULT_MOUNT_POINT,
+        prefix: str = "",
+        max_age: Optional[float] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        self.client = client
+        self.mount_point = mount_point
+        self.prefix = "/".join(_split(prefix))
+        self.max_age = max_age
+        self.max_workers = max_workers
+        self._root = _Node()
+        self._lock = Lock()
+        self._stale_folders: Set[str] = {self.prefix}
+        self._stale_paths: Set[str] = set()
+
+    def _node(self, folder: str, create: bool = False) -> Optional[_Node]:
+        node = self._root
+        for part in _split(folder):
+            child = node.folders.get(part)
+            if child is None:
+                if not create:
+                    return None
+                child = node.folders[part] = _Node()
+            node = child
+        return node
+
+    def covers(self, path: str) -> bool:
+        "True if path is under the prefix of the snapshot."
+        return not self.prefix or path == self.prefix or path.startswith(self.prefix + "/")
+
+    def get(self, path: str) -> Optional[SecretMeta]:
+        parts = _split(path)
+        if not parts:
+            return None
+        with self._lock:
+            node = self._node("/".join(parts[:-1]))
+            return node.secrets.get(parts[-1]) if node is not None else None
+
+    def fingerprint(self, path: str) -> Optional[Fingerprint]:
+        meta = self.get(path)
+        return meta.fingerprint if meta is not None else None
+
+    def secrets(self, prefix: str = "") -> List[SecretMeta]:
+        "Returns the metadata of the secrets in the folder prefix and its subfolders."
+        with self._lock:
+            node = self._node(prefix)
+            return sorted(node.walk(), key=lambda m: m.path) if node is not None else []
+
+    def paths(self, prefix: str = "") -> List[str]:
+        return [meta.path for meta in self.secrets(prefix)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 for _ in self._root.walk())
+
+    def invalidate(self, path: str):
+        "Marks a secret as written or deleted, its metadata is re-read on the next refresh."
+        with self._lock:
+            self._stale_paths.add("/".join(_split(path)))
+
+    def invalidate_prefix(self, prefix: str):
+        "Marks a folder as changed, it is listed again on the next refresh."
+        with self._lock:
+            self._stale_folders.add("/".join(_split(prefix)))
+
+    def _expired_folders(self, node: _Node, folder: str, now: float) -> Iterator[str]:
+        if now - node.listed_at > self.max_age:
+            yield folder
+            return
+        for name, child in node.folders.items():
+            yield from self._expired_folders(child, f"{folder}/{name}" if folder else name, now)
+
+    def _read(self, path: str) -> Optional[SecretMeta]:
+        try:
+            response = self.client.secrets.kv.v2.read_secret_metadata(
+                path, mount_point=self.mount_point
+            )
+        except InvalidPath:
+            return None
+        return SecretMeta.from_response(path, response["data"])
+
+    def refresh(self) -> RefreshStats:
+        "Lists the stale subtrees and reads the metadata of stale secrets."
+        stats = RefreshStats()
+        now = time.monotonic()
+        with self._lock:
+            folders = {f for f in self._stale_folders if self.covers(f)}
+            if self.max_age is not None:
+                scope = self._node(self.prefix, create=True)
+                folders.update(self._expired_folders(scope, self.prefix, now))
+            # Only list the topmost stale folders, their subfolders are listed with them
+            folders = {
+                f
+                for f in folders
+                if not any(f != o and (not o or f.startswith(o + "/")) for o in folders)
+            }
+            paths = {
+                p
+                for p in self._stale_paths
+                if self.covers(p) and not any(not f or p.startswith(f + "/") for f in folders)
+            }
+            self._stale_folders.clear()
+            self._stale_paths.clear()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            listed = {
+                folder: list_secrets_recursive(
+                    self.client, folder, self.mount_point, self.max_workers
+                )
+                for folder in sorted(folders)
+            }
+            to_read = sorted(paths.union(*listed.values()))
+            metadata = dict(zip(to_read, pool.map(self._read, to_read)))
+        stats.relisted = sorted(folders)
+        stats.metadata_reads = len(to_read)
+
+        with self._lock:
+            for folder, folder_paths in listed.items():
+                node = self._node(folder, create=True)
+                node.folders.clear()
+                node.secrets.clear()
+                node.listed_at = now
+                for path in folder_paths:
+                    self._set(path, metadata[path], now)
+            for path in paths:
+                self._set(path, metadata[path], now)
+        echo_info_vv(f"KV snapshot of {self.mount_point}/{self.prefix}: {stats}")
+        return stats
+
+    def _set(self, path: str, meta: Optional[SecretMeta], listed_at: float):
+        parts = _split(path)
+        if meta is None:
+            node = self._node("/".join(parts[:-1]))
+            if node is not None:
+                node.secrets.pop(parts[-1], None)
+            return
+        node = self._root
+        for part in parts[:-1]:
+            child = node.folders.get(part)
+            if child is None:
+                child = node.folders[part] = _Node()
+                child.listed_at = listed_at
+            node = child
+        node.secrets[parts[-1]] = meta
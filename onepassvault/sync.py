@@ -0,0 +1,492 @@
+import hashlib
+import json
+from contextlib import closing
+from dataclasses import asdict, dataclass, replace
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+import hvac
+from hvac.exceptions import InvalidPath
+
+from clickio.output import echo_info_v, echo_info_vv
+from clickio.progress import Progress
+from onepassvault.documents import ContentIndex, write_document
+from onepassvault.metrics import ITEMS, sync_run
+from onepassvault.opw import OnePassword, OpDocument, OpItem, SecretBuffer
+from onepassvault.opw.client import OpInterrupted, VaultOrStr
+
+if TYPE_CHECKING:
+    from onepassvault.snapshot import KVSnapshot
+
+DEFAULT_MOUNT_POINT = "secret"
+
+META_ITEM_ID = "op_item_id"
+META_ITEM_VERSION = "op_item_version"
+META_CONTENT_HASH = "op_content_hash"
+META_KV_VERSION = "op_kv_version"
+META_VAULT_ID = "op_vault_id"
+
+
+def item_secret(item: OpItem) -> Dict[str, str]:
+    "Returns the KV secret data for an item: field values keyed by field label."
+    return {
+        label: field.value.reveal() if isinstance(field.value, SecretBuffer) else str(field.value)
+        for label, field in item.fields_by_label.items()
+        if label and field.value is not None
+    }
+
+
+def content_hash(secret: Dict[str, str]) -> str:
+    data = json.dumps(secret, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def item_vault_id(item: OpItem) -> Optional[str]:
+    return item.vault.id if item.vault else None
+
+
+def item_path(item: OpItem, prefix: str = "") -> str:
+    if prefix:
+        return f"{prefix.strip('/')}/{item.title}"
+    return item.title
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """
+    Identifies the 1Password item (and its vault) and content a KV secret was
+    written from, and the KV version that was written (used as the base of
+    bidirectional syncs).
+    """
+
+    item_id: str
+    item_version: Optional[int]
+    content_hash: str
+    kv_version: Optional[int] = None
+    vault_id: Optional[str] = None
+
+    @classmethod
+    def of_item(cls, item: OpItem, secret: Optional[Dict[str, str]] = None) -> "Fingerprint":
+        if secret is None:
+            secret = item_secret(item)
+        return cls(
+            item_id=item.id,
+            item_version=item.version,
+            content_hash=content_hash(secret),
+            vault_id=item_vault_id(item),
+        )
+
+    @classmethod
+    def from_metadata(cls, custom_metadata: Optional[Dict[str, str]]) -> Optional["Fingerprint"]:
+        custom_metadata = custom_metadata or {}
+        if META_ITEM_ID not in custom_metadata or META_CONTENT_HASH not in custom_metadata:
+            return None
+        version = custom_metadata.get(META_ITEM_VERSION)
+        kv_version = custom_metadata.get(META_KV_VERSION)
+        return cls(
+            item_id=custom_metadata[META_ITEM_ID],
+            item_version=int(version) if version else None,
+            content_hash=custom_metadata[META_CONTENT_HASH],
+            kv_version=int(kv_version) if kv_version else None,
+            vault_id=custom_metadata.get(META_VAULT_ID) or None,
+        )
+
+    def to_metadata(self) -> Dict[str, str]:
+        # Vault only accepts string values in custom_metadata
+        return {
+            META_ITEM_ID: self.item_id,
+            META_ITEM_VERSION: "" if self.item_version is None else str(self.item_version),
+            META_CONTENT_HASH: self.content_hash,
+            META_KV_VERSION: "" if self.kv_version is None else str(self.kv_version),
+            META_VAULT_ID: self.vault_id or "",
+        }
+
+    def is_current(self, item: OpItem) -> bool:
+        """
+        True if the listed item has not changed since this fingerprint was taken.
+        Fingerprints without the item's vault id are refreshed, so prune can tell
+        which vault a secret came from.
+        """
+        return (
+            self.item_id == item.id
+            and self.item_version is not None
+            and self.item_version == item.version
+            and self.vault_id == item_vault_id(item)
+        )
+
+
+def read_fingerprint(
+    client: hvac.Client, path: str, mount_point: str = DEFAULT_MOUNT_POINT
+) -> Optional[Fingerprint]:
+    "Reads the fingerprint of a KV secret from its metadata, without reading the secret data."
+    try:
+        metadata = client.secrets.kv.v2.read_secret_metadata(path, mount_point=mount_point)
+    except InvalidPath:
+        return None
+    return Fingerprint.from_metadata(metadata["data"].get("custom_metadata"))
+
+
+def write_fingerprint(
+    client: hvac.Client, path: str, fp: Fingerprint, mount_point: str = DEFAULT_MOUNT_POINT
+):
+    """
+    Merges the fingerprint keys into the custom_metadata of a KV secret, with a
+    JSON merge patch. Unlike kv.v2.update_metadata, this keeps the other keys of
+    custom_metadata and the secret's settings (e.g. delete_version_after).
+    """
+    client.adapter.request(
+        "PATCH",
+        f"/v1/{mount_point.strip('/')}/metadata/{path.strip('/')}",
+        json={"custom_metadata": fp.to_metadata()},
+        headers={"Content-Type": "application/merge-patch+json"},
+    )
+
+
+def write_secret(
+    client: hvac.Client,
+    path: str,
+    secret: Dict[str, str],
+    fp: Fingerprint,
+    mount_point: str = DEFAULT_MOUNT_POINT,
+) -> Fingerprint:
+    "Writes a secret and its fingerprint, returns the fingerprint with the new KV version."
+    response = client.secrets.kv.v2.create_or_update_secret(path, secret, mount_point=mount_point)
+    fp = replace(fp, kv_version=response["data"]["version"])
+    write_fingerprint(client, path, fp, mount_point=mount_point)
+    return fp
+
+
+@dataclass(frozen=True)
+class Shard:
+    """
+    One of count partitions of the items of a sync, numbered from 1.
+
+    Items are assigned by a stable hash of their id, so every node running
+    the same sync with a different shard index processes a disjoint subset.
+    """
+
+    index: int
+    count: int
+
+    def __post_init__(self):
+        if not 1 <= self.index <= self.count:
+            raise ValueError(f"Invalid shard {self}, index must be between 1 and {self.count}")
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        "Parses a shard spec of the form i/n."
+        try:
+            index, count = spec.split("/")
+            return cls(int(index), int(count))
+        except ValueError as e:
+            raise ValueError(f"Invalid shard {spec!r}, expected i/n (e.g. 1/4): {e}")
+
+    def contains(self, item_id: str) -> bool:
+        digest = hashlib.sha256(item_id.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self.count == self.index - 1
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+
+@dataclass
+class SyncJob:
+    "A 1Password vault pushed to a KV prefix, run every interval seconds in daemon mode."
+
+    name: str
+    op_vault: str
+    mount_point: str = DEFAULT_MOUNT_POINT
+    prefix: str = ""
+    interval: float = 300.0
+
+
+def load_jobs(path: str) -> List[SyncJob]:
+    """
+    Loads sync jobs from a JSON file of the form:
+
+        {"jobs": [{"name": "team", "op_vault": "Team", "prefix": "team", "interval": 60}]}
+    """
+    with open(path) as f:
+        data = json.load(f)
+    return [SyncJob(**job) for job in data["jobs"]]
+
+
+@dataclass
+class PushSummary:
+    listed: int = 0
+    fetched: int = 0
+    written: int = 0
+    skipped: int = 0
+    # Items not processed because the run was interrupted
+    unfinished: int = 0
+    # Items deleted from 1Password between listing and fetching
+    missing: int = 0
+
+    def __str__(self):
+        summary = (
+            f"{self.listed} items listed, {self.fetched} fetched,"
+            f" {self.written} written, {self.skipped} unchanged"
+        )
+        if self.missing:
+            summary += f", {self.missing} missing (deleted since listed)"
+        if self.unfinished:
+            summary += f", {self.unfinished} unfinished (interrupted)"
+        return summary
+
+    def __add__(self, other: "PushSummary") -> "PushSummary":
+        return PushSummary(**{k: getattr(self, k) + getattr(other, k) for k in asdict(self).keys()})
+
+
+def write_checkpoint(path: str, shard: Optional[Shard], summary: PushSummary, item_ids: List[str]):
+    "Records the result of a (sharded) push, to be merged with the other shards' checkpoints."
+    data = {
+        "shard": str(shard) if shard else None,
+        "summary": asdict(summary),
+        "item_ids": sorted(item_ids),
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def merge_checkpoints(paths: List[str]) -> Tuple[PushSummary, List[str]]:
+    """
+    Merges the checkpoints of all the shards of a push into a single summary.
+
+    Raises ValueError if shards are missing, repeated, processed the same item, or
+    were interrupted before processing all their items.
+    """
+    summary = PushSummary()
+    item_ids: Set[str] = set()
+    shards: Set[Shard] = set()
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        shard = Shard.parse(data["shard"]) if data["shard"] else Shard(1, 1)
+        if shard in shards:
+            raise ValueError(f"Shard {shard} appears in more than one checkpoint")
+        shards.add(shard)
+        overlap = item_ids.intersection(data["item_ids"])
+        if overlap:
+            raise ValueError(f"Items processed by more than one shard: {', '.join(overlap)}")
+        item_ids.update(data["item_ids"])
+        shard_summary = PushSummary(**data["summary"])
+        if shard_summary.unfinished:
+            raise ValueError(
+                f"Shard {shard} was interrupted with {shard_summary.unfinished} unfinished items,"
+                " push it again"
+            )
+        summary += shard_summary
+
+    counts = {shard.count for shard in shards}
+    if len(counts) > 1:
+        raise ValueError(f"Checkpoints are from different shard counts: {sorted(counts)}")
+    if counts:
+        count = counts.pop()
+        missing = {Shard(i, count) for i in range(1, count + 1)} - shards
+        if missing:
+            missing = ", ".join(sorted(str(shard) for shard in missing))
+            raise ValueError(f"Missing checkpoints for shards {missing}")
+    return summary, sorted(item_ids)
+
+
+def _interrupted(op: OnePassword) -> bool:
+    return op.deadline is not None and op.deadline.done
+
+
+def _push_item(
+    op: OnePassword,
+    client: hvac.Client,
+    item: OpItem,
+    path: str,
+    old_fp: Optional[Fingerprint],
+    mount_point: str,
+    content_index: Optional[ContentIndex] = None,
+) -> bool:
+    "Writes a fetched item to Vault unless its content is unchanged, returns True if written."
+    if item.category == "DOCUMENT":
+        if content_index is not None:
+            document = content_index.get_document(op, item)
+        else:
+            document = OpDocument.from_item(item, op.get_document_contents(item.id, item.vault.id))
+        digest = hashlib.sha256(document.contents).hexdigest()
+        new_fp = Fingerprint(
+            item_id=item.id,
+            item_version=item.version,
+            content_hash=digest,
+            vault_id=item_vault_id(item),
+        )
+    else:
+        secret = item_secret(item)
+        new_fp = Fingerprint.of_item(item, secret)
+
+    if old_fp is not None and old_fp.content_hash == new_fp.content_hash:
+        # Item version changed without touching its content, only refresh metadata
+        new_fp = replace(new_fp, kv_version=old_fp.kv_version)
+        write_fingerprint(client, path, new_fp, mount_point=mount_point)
+        return False
+
+    if item.category == "DOCUMENT":
+        if content_index is not None:
+            content_index.store(client, path, document, mount_point=mount_point)
+        else:
+            write_document(client, path, document, mount_point=mount_point)
+        write_fingerprint(client, path, new_fp, mount_point=mount_point)
+    else:
+        write_secret(client, path, secret, new_fp, mount_point=mount_point)
+    return True
+
+
+def _is_under(path: str, prefix: str) -> bool:
+    prefix = prefix.strip("/")
+    return not prefix or path.startswith(prefix + "/")
+
+
+def push(
+    op: OnePassword,
+    client: hvac.Client,
+    vault: Optional[VaultOrStr] = None,
+    mount_point: str = DEFAULT_MOUNT_POINT,
+    prefix: str = "",
+    progress: Optional[Progress] = None,
+    shard: Optional[Shard] = None,
+    checkpoint: Optional[str] = None,
+    content_index: Optional[ContentIndex] = None,
+    snapshot: Optional["KVSnapshot"] = None,
+) -> PushSummary:
+    """
+    Pushes the items of a 1Password vault to Vault KV secrets under prefix.
+
+    With a shard, only the items in that shard are processed, and checkpoint
+    is the path where the shard's summary and item ids are written.
+
+    Only secret metadata is read from Vault. Items whose version matches the
+    fingerprint stored with their secret are not fetched from 1Password, and
+    items whose content hash matches are not written, so unchanged items do not
+    create new KV versions.
+
+    Documents are stored with onepassvault.documents.write_document, chunked if large.
+    With a content_index, identical document contents are stored only once,
+    under the prefix, see onepassvault.documents.ContentIndex.
+
+    If op has a deadline (OnePassword.with_deadline), the push stops when it
+    passes or is cancelled, and returns what it completed, with the remaining
+    items counted as unfinished.
+
+    With a snapshot of the mount (onepassvault.snapshot.KVSnapshot), it is
+    refreshed and fingerprints are read from it instead of from Vault, and the
+    paths written are invalidated for its next refresh.
+    """
+    progress = progress or Progress(interactive=False)
+    summary = PushSummary()
+    if snapshot is not None:
+        if snapshot.mount_point != mount_point or not snapshot.covers(prefix.strip("/")):
+            raise ValueError(f"Snapshot does not cover {mount_point}/{prefix}")
+        snapshot.refresh()
+    if content_index is not None and not _is_under(content_index.blob_prefix, prefix):
+        raise ValueError(f"Document blobs are not stored under {mount_point}/{prefix}")
+
+    def get_fingerprint(path: str) -> Optional[Fingerprint]:
+        if snapshot is not None:
+            return snapshot.fingerprint(path)
+        return read_fingerprint(client, path, mount_point=mount_point)
+
+    listing = progress.stage("list")
+    listing.start()
+    items = op.get_items(vault)
+    if shard is not None:
+        items = [item for item in items if shard.contains(item.id)]
+    listing.advance(len(items))
+    listing.finish()
+    summary.listed = len(items)
+
+    diff = progress.stage("diff")
+    diff.start(total=len(items))
+    stale: List[OpItem] = []
+    fingerprints: Dict[str, Optional[Fingerprint]] = {}
+    # Items skipped or written, an interrupted push does not record the others
+    done: List[str] = []
+    for item in items:
+        if _interrupted(op):
+            break
+        fp = get_fingerprint(item_path(item, prefix))
+        if fp is not None and fp.is_current(item):
+            summary.skipped += 1
+            done.append(item.id)
+            echo_info_vv(f"{item.title}: unchanged (version {item.version})")
+        else:
+            stale.append(item)
+            fingerprints[item.id] = fp
+        diff.advance()
+    diff.finish()
+
+    # Each chunk of items is written as soon as it is fetched
+    fetch = progress.stage("fetch")
+    fetch.start(total=len(stale))
+    write = progress.stage("write")
+    write.start(total=len(stale))
+    chunks = op.iter_items_details(stale, partial=op.deadline is not None, skip_missing=True)
+    fetched: Set[str] = set()
+    with closing(chunks):
+        for item in (item for chunk in chunks for item in chunk):
+            fetch.advance()
+            if _interrupted(op):
+                break
+            fetched.add(item.id)
+            summary.fetched += 1
+            path = item_path(item, prefix)
+            try:
+                written = _push_item(
+                    op, client, item, path, fingerprints.get(item.id), mount_point, content_index
+                )
+            except OpInterrupted as e:
+                echo_info_v(f"{item.title}: {e}")
+                break
+            if written:
+                summary.written += 1
+                echo_info_v(f"{item.title}: written to {mount_point}/{path}")
+            else:
+                summary.skipped += 1
+                echo_info_vv(f"{item.title}: unchanged content (version {item.version})")
+            done.append(item.id)
+            if snapshot is not None:
+                snapshot.invalidate(path)
+                if item.category == "DOCUMENT":
+                    snapshot.invalidate_prefix(path)
+                    if content_index is not None:
+                        snapshot.invalidate_prefix(content_index.blob_prefix)
+            write.advance()
+        else:
+            if not _interrupted(op):
+                for item in stale:
+                    if item.id not in fetched:
+                        summary.missing += 1
+                        echo_info_v(f"{item.title}: deleted from 1Password since it was listed")
+    fetch.finish()
+    write.finish()
+    summary.unfinished = summary.listed - summary.skipped - summary.written - summary.missing
+
+    for outcome, count in asdict(summary).items():
+        ITEMS.inc(count, outcome=outcome)
+    if content_index is not None:
+        echo_info_v(f"Documents: {content_index.stats}")
+    if checkpoint:
+        write_checkpoint(checkpoint, shard, summary, done)
+    return summary
+
+
+def run_job(
+    op: OnePassword,
+    client: hvac.Client,
+    job: SyncJob,
+    progress: Optional[Progress] = None,
+    snapshot: Optional["KVSnapshot"] = None,
+) -> PushSummary:
+    with sync_run(job.name):
+        return push(
+            op,
+            client,
+            vault=job.op_vault,
+            mount_point=job.mount_point,
+            prefix=job.prefix,
+            progress=progress,
+            snapshot=snapshot,
+        )
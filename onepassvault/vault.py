@@ -1,12 +1,28 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional, Tuple
+from weakref import WeakKeyDictionary
 
 import hvac
+import requests
+from hvac.adapters import JSONAdapter
+from hvac.exceptions import Forbidden, InvalidPath, InvalidRequest
 from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from clickio.input import prompt
 from onepassvault.func import opt_int, opt_path, opt_str
+from onepassvault.metrics import (
+    VAULT_BYTES,
+    VAULT_REQUEST_ERRORS,
+    VAULT_REQUEST_SECONDS,
+    VAULT_RETRIES,
+    vault_endpoint,
+)
 
 
 class VaultError(RuntimeError):
@@ -86,6 +102,55 @@ def load_config() -> VaultClientConfig:
     return conf
 
 
+# Retries connection errors, and the gateway errors of proxies in front of Vault (Vault
+# itself answers 503 when sealed and 429 on standby, which retrying does not fix).
+# Requests that may not be idempotent (POST) are only retried if they were not sent.
+VAULT_RETRY = Retry(
+    total=3,
+    backoff_factor=0.2,
+    status_forcelist=(502, 504),
+    allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"LIST"},
+    raise_on_status=False,
+)
+
+
+class MetricsAdapter(JSONAdapter):
+    """
+    hvac adapter recording the latency, errors, retries and bytes of Vault
+    requests, and retrying failed requests with VAULT_RETRY.
+    """
+
+    def __init__(self, *args, retry: Retry = VAULT_RETRY, **kwargs):
+        super().__init__(*args, **kwargs)
+        transport = HTTPAdapter(max_retries=retry)
+        self.session.mount("http://", transport)
+        self.session.mount("https://", transport)
+
+    def request(self, method, url, headers=None, raise_exception=True, **kwargs):
+        labels = {"method": method.upper(), "endpoint": vault_endpoint(url)}
+        kwargs["hooks"] = {"response": self._record_response}
+        start = time.perf_counter()
+        try:
+            response = super().request(
+                method, url, headers=headers, raise_exception=raise_exception, **kwargs
+            )
+        except Exception:
+            VAULT_REQUEST_ERRORS.inc(**labels)
+            raise
+        finally:
+            VAULT_REQUEST_SECONDS.observe(time.perf_counter() - start, **labels)
+        return response
+
+    @staticmethod
+    def _record_response(response: requests.Response, *args, **kwargs):
+        body = response.request.body
+        VAULT_BYTES.inc(len(body) if body else 0, direction="sent")
+        VAULT_BYTES.inc(len(response.content), direction="received")
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None and retries.history:
+            VAULT_RETRIES.inc(len(retries.history))
+
+
 def open_vault(config: Optional[VaultClientConfig] = None) -> hvac.Client:
     config = config or load_config()
     cert = None
@@ -99,14 +164,98 @@ def open_vault(config: Optional[VaultClientConfig] = None) -> hvac.Client:
         cert=cert,
         verify=config.server_cert_path,
         timeout=config.timeout,
+        adapter=MetricsAdapter,
     )
     return client
 
 
-def assert_vault_is_live(client: hvac.Client):
-    if not client.is_authenticated():
+@dataclass
+class VaultHealth:
+    url: str
+    initialized: bool
+    sealed: bool
+    standby: bool
+    authenticated: bool
+    version: Optional[str]
+    health_latency: float
+    auth_latency: float
+    checked_at: float
+
+    @property
+    def is_live(self) -> bool:
+        return self.authenticated and self.initialized and not self.sealed
+
+    def __str__(self):
+        state = "live" if self.is_live else "not live"
+        return (
+            f"Vault {self.version or ''} at {self.url} is {state}"
+            f" (health {self.health_latency * 1000:.0f}ms, auth {self.auth_latency * 1000:.0f}ms)"
+        )
+
+
+def _timed(func: Callable[[], Any]) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def _read_health(client: hvac.Client) -> dict:
+    # Non-200 statuses (sealed, standby, uninitialized) are returned as a raw response
+    response = client.sys.read_health_status(method="GET")
+    if isinstance(response, dict):
+        return response
+    return response.json()
+
+
+def _is_authenticated(client: hvac.Client) -> bool:
+    try:
+        client.auth.token.lookup_self()
+        return True
+    except (Forbidden, InvalidPath, InvalidRequest):
+        return False
+
+
+_health_cache: "WeakKeyDictionary[hvac.Client, VaultHealth]" = WeakKeyDictionary()
+
+
+def check_vault_health(client: hvac.Client, max_age: float = 0) -> VaultHealth:
+    """
+    Fetches sys/health and looks up the client token concurrently.
+
+    If max_age is set, a health result younger than max_age seconds is reused
+    instead of querying Vault again, for long-running processes.
+    """
+    cached = _health_cache.get(client)
+    if cached is not None and time.monotonic() - cached.checked_at < max_age:
+        return cached
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        health_future = pool.submit(_timed, lambda: _read_health(client))
+        auth_future = pool.submit(_timed, lambda: _is_authenticated(client))
+        health, health_latency = health_future.result()
+        authenticated, auth_latency = auth_future.result()
+
+    result = VaultHealth(
+        url=client.url,
+        initialized=health.get("initialized", False),
+        sealed=health.get("sealed", True),
+        standby=health.get("standby", False),
+        authenticated=authenticated,
+        version=health.get("version"),
+        health_latency=health_latency,
+        auth_latency=auth_latency,
+        checked_at=time.monotonic(),
+    )
+    _health_cache[client] = result
+    return result
+
+
+def assert_vault_is_live(client: hvac.Client, max_age: float = 0) -> VaultHealth:
+    health = check_vault_health(client, max_age=max_age)
+    if not health.authenticated:
         raise VaultError("Vault client is not authenticated")
-    if not client.sys.is_initialized():
+    if not health.initialized:
         raise VaultError(f"Vault at {client.url} is not initialized")
-    if client.sys.is_sealed():
+    if health.sealed:
         raise VaultError(f"Vault at {client.url} is sealed")
+    return health
@@ -0,0 +1,152 @@
+import os
+import time
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from typing import Optional
+
+import hvac
+from hvac.exceptions import VaultError as HvacError
+
+from clickio.output import echo_info, echo_info_v
+from onepassvault.vault import VaultError
+
+APPROLE_ENV_VARS = {
+    "role_id": "VAULT_ROLE_ID",
+    "secret_id": "VAULT_SECRET_ID",
+    "mount_point": "VAULT_APPROLE_MOUNT",
+}
+
+DEFAULT_APPROLE_MOUNT = "approle"
+
+
+@dataclass
+class AppRoleCredentials:
+    role_id: str
+    secret_id: str
+    mount_point: str = DEFAULT_APPROLE_MOUNT
+
+    @classmethod
+    def from_env(cls) -> Optional["AppRoleCredentials"]:
+        role_id = os.getenv(APPROLE_ENV_VARS["role_id"])
+        secret_id = os.getenv(APPROLE_ENV_VARS["secret_id"])
+        if not (role_id and secret_id):
+            return None
+        mount_point = os.getenv(APPROLE_ENV_VARS["mount_point"]) or DEFAULT_APPROLE_MOUNT
+        return cls(role_id=role_id, secret_id=secret_id, mount_point=mount_point)
+
+    def login(self, client: hvac.Client):
+        "Logs in with AppRole, the client uses the new token for subsequent requests."
+        client.auth.approle.login(self.role_id, self.secret_id, mount_point=self.mount_point)
+
+
+class TokenManager(Thread):
+    """
+    Keeps the token of a Vault client alive for the duration of a long run.
+
+    The token TTL is looked up, and the token is renewed in the background once
+    renew_at of its TTL has elapsed, asking for its creation TTL again. When the
+    token cannot be renewed (it is not renewable or was revoked), or is renewed
+    for less than that because it reached its max TTL, and AppRole credentials
+    were given, the manager logs in again with the cached credentials.
+
+    Tokens without a TTL (e.g. root tokens) are left alone.
+    """
+
+    def __init__(
+        self,
+        client: hvac.Client,
+        approle: Optional[AppRoleCredentials] = None,
+        renew_at: float = 2 / 3,
+        min_interval: float = 5.0,
+    ):
+        super().__init__(name="vault-token-manager", daemon=True)
+        self.client = client
+        self.approle = approle
+        self.renew_at = renew_at
+        self.min_interval = min_interval
+        self.ttl: Optional[int] = None
+        # The TTL requested on renewal
+        self.increment: Optional[int] = None
+        self.renewable = False
+        self.expires_at: Optional[float] = None
+        self._lock = Lock()
+        self._stop_event = Event()
+
+    def lookup(self):
+        data = self.client.auth.token.lookup_self()["data"]
+        self._set_ttl(data["ttl"], data.get("renewable", False))
+        self.increment = int(data.get("creation_ttl") or data["ttl"])
+
+    def _set_ttl(self, ttl: int, renewable: bool):
+        self.ttl = int(ttl)
+        self.renewable = bool(renewable)
+        self.expires_at = time.monotonic() + self.ttl if self.ttl else None
+
+    def login(self):
+        if self.approle is None:
+            raise VaultError("Vault token cannot be renewed and no AppRole credentials are set")
+        self.approle.login(self.client)
+        echo_info_v("Logged in to Vault with AppRole")
+        self.lookup()
+
+    def refresh(self):
+        "Renews the token, or logs in again if it cannot be renewed."
+        with self._lock:
+            if self.renewable:
+                try:
+                    auth = self.client.auth.token.renew_self(increment=self.increment)["auth"]
+                except HvacError as e:
+                    echo_info_v(f"Vault token renewal failed: {e}")
+                else:
+                    self._set_ttl(auth["lease_duration"], auth.get("renewable", False))
+                    if self.ttl >= self.increment:
+                        echo_info_v(f"Renewed Vault token, TTL {self.ttl}s")
+                        return
+                    # Renewed for less than requested, the max TTL is reached
+                    echo_info_v(f"Vault token renewed up to its max TTL, {self.ttl}s left")
+                    if self.approle is None:
+                        return
+            self.login()
+
+    def next_delay(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        remaining = self.expires_at - time.monotonic()
+        return max(self.min_interval, remaining - self.ttl * (1 - self.renew_at))
+
+    def start(self):
+        if not self.client.token and self.approle is not None:
+            self.login()
+        else:
+            self.lookup()
+        super().start()
+
+    def run(self):
+        while True:
+            delay = self.next_delay()
+            if delay is None or self._stop_event.wait(delay):
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                echo_info(f"Could not keep Vault token alive: {e}")
+                return
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def __enter__(self) -> "TokenManager":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def manage_token(client: hvac.Client, approle: Optional[AppRoleCredentials] = None) -> TokenManager:
+    "Starts a TokenManager for a client returned by open_vault."
+    manager = TokenManager(client, approle=approle or AppRoleCredentials.from_env())
+    manager.start()
+    return manager
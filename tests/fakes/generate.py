@@ -0,0 +1,150 @@
+"""
+Synthetic fixtures for scale testing against the fake op CLI and Vault stub.
+
+    profile = LoadProfile(seed=1)
+    items, documents = generate_items(10_000, profile)
+    op_exe = install_fake_op(tmp_path, items, documents)
+    populate_kv(vault_stub.kv(), generate_kv_secrets(5_000, profile))
+"""
+
+import random
+import string
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from onepassvault.opw import OpItemFieldType
+
+from .vault import KVStore
+
+DEFAULT_CATEGORIES = {
+    "LOGIN": 50,
+    "PASSWORD": 20,
+    "API_CREDENTIAL": 15,
+    "SECURE_NOTE": 10,
+    "DOCUMENT": 5,
+}
+DEFAULT_FIELD_TYPES = {
+    OpItemFieldType.PASSWORD: 40,
+    OpItemFieldType.TEXT: 30,
+    OpItemFieldType.EMAIL: 8,
+    OpItemFieldType.URL: 8,
+    OpItemFieldType.DATE: 4,
+    OpItemFieldType.MONTH_YEAR: 3,
+    OpItemFieldType.PHONE: 4,
+    OpItemFieldType.OTP: 3,
+}
+# Document size in bytes: weight
+DEFAULT_DOCUMENT_SIZES = {1024: 50, 16 * 1024: 30, 256 * 1024: 15, 2 * 1024 * 1024: 5}
+# KV path depth (number of folders above the secret): weight
+DEFAULT_KV_DEPTHS = {0: 20, 1: 40, 2: 25, 3: 10, 5: 5}
+
+
+@dataclass
+class LoadProfile:
+    "Distributions of the generated fixtures; weights need not add up to 100."
+
+    categories: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_CATEGORIES))
+    field_types: Dict[OpItemFieldType, int] = field(
+        default_factory=lambda: dict(DEFAULT_FIELD_TYPES)
+    )
+    field_count: Tuple[int, int] = (1, 12)
+    document_sizes: Dict[int, int] = field(default_factory=lambda: dict(DEFAULT_DOCUMENT_SIZES))
+    # Fraction of documents whose contents are a copy of an earlier document
+    duplicate_documents: float = 0.2
+    kv_depths: Dict[int, int] = field(default_factory=lambda: dict(DEFAULT_KV_DEPTHS))
+    vaults: int = 3
+    seed: int = 0
+
+
+def _choice(rng: random.Random, weights: Dict) -> object:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _word(rng: random.Random, n: int = 8) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=n))
+
+
+def _value(rng: random.Random, type: OpItemFieldType) -> str:
+    if type == OpItemFieldType.PASSWORD:
+        return "".join(rng.choices(string.ascii_letters + string.digits + "!@#$%", k=24))
+    if type == OpItemFieldType.EMAIL:
+        return f"{_word(rng)}@{_word(rng, 6)}.com"
+    if type == OpItemFieldType.URL:
+        return f"https://{_word(rng, 6)}.example.com/{_word(rng)}"
+    if type == OpItemFieldType.DATE:
+        return str(rng.randrange(1_500_000_000, 1_900_000_000))
+    if type == OpItemFieldType.MONTH_YEAR:
+        return f"{rng.randrange(2020, 2035)}{rng.randrange(1, 13):02d}"
+    if type == OpItemFieldType.PHONE:
+        return f"+1{rng.randrange(10**9, 10**10)}"
+    if type == OpItemFieldType.OTP:
+        secret = "".join(rng.choices(string.ascii_uppercase + "234567", k=16))
+        return f"otpauth://totp/{_word(rng)}?secret={secret}"
+    return " ".join(_word(rng, rng.randrange(3, 10)) for _ in range(rng.randrange(1, 4)))
+
+
+def _fields(rng: random.Random, profile: LoadProfile) -> List[dict]:
+    fields = []
+    for i in range(rng.randint(*profile.field_count)):
+        type = _choice(rng, profile.field_types)
+        label = f"{type.name.lower()}_{i}"
+        fields.append(
+            {"id": f"field{i}", "label": label, "type": type.value, "value": _value(rng, type)}
+        )
+    return fields
+
+
+def generate_items(n: int, profile: LoadProfile) -> Tuple[List[dict], Dict[str, bytes]]:
+    """
+    Generates n items in the format of op item get, and the contents of the
+    DOCUMENT items by item id.
+    """
+    rng = random.Random(profile.seed)
+    vaults = [{"id": f"vault{v}", "name": f"Vault {v}"} for v in range(profile.vaults)]
+    items = []
+    documents: Dict[str, bytes] = {}
+    for i in range(n):
+        item_id = f"item{i:07d}"
+        category = _choice(rng, profile.categories)
+        item = {
+            "id": item_id,
+            "title": f"{category.lower()}-{i}-{_word(rng, 4)}",
+            "version": rng.randrange(1, 20),
+            "category": category,
+            "vault": rng.choice(vaults),
+            "tags": rng.sample(["prod", "staging", "ci", "team", "legacy"], rng.randrange(0, 3)),
+        }
+        if category == "LOGIN":
+            item["urls"] = [{"primary": True, "href": f"https://{_word(rng, 6)}.example.com"}]
+        if category == "DOCUMENT":
+            if documents and rng.random() < profile.duplicate_documents:
+                contents = documents[rng.choice(list(documents))]
+            else:
+                contents = rng.randbytes(_choice(rng, profile.document_sizes))
+            documents[item_id] = contents
+            item["files"] = [{"id": f"file{i}", "name": f"{_word(rng)}.bin", "size": len(contents)}]
+            item["fields"] = []
+        else:
+            item["fields"] = _fields(rng, profile)
+        items.append(item)
+    return items, documents
+
+
+def generate_kv_secrets(m: int, profile: LoadProfile) -> Dict[str, dict]:
+    "Generates m KV secrets by path, at the depths of the profile."
+    rng = random.Random(profile.seed + 1)
+    folders = [_word(rng, 5) for _ in range(20)]
+    secrets = {}
+    for i in range(m):
+        depth = _choice(rng, profile.kv_depths)
+        path = "/".join([rng.choice(folders) for _ in range(depth)] + [f"secret-{i}"])
+        secrets[path] = {
+            f"key{j}": _value(rng, _choice(rng, profile.field_types))
+            for j in range(rng.randint(*profile.field_count))
+        }
+    return secrets
+
+
+def populate_kv(kv: KVStore, secrets: Dict[str, dict]):
+    for path, data in secrets.items():
+        kv.write(path, data)
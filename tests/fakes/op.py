@@ -0,0 +1,163 @@
+"""
+Stand-in for the 1Password CLI, serving items from a fixture directory.
+
+install_fake_op writes an executable wrapper that can be passed to
+OnePassword(op_executable=...) or set as OPV_OP_EXECUTABLE.
+
+Setting FAKE_OP_SLOW_ITEM to an item id makes piped item gets of that item
+hang, to test timeouts.
+
+Each item is stored in its own file, so that a call only reads the items it
+returns, and fixtures of 100k items can be served without loading them all.
+"""
+
+import json
+import os
+import stat
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ACCOUNT = {"url": "fake.1password.com", "email": "fake@example.com", "user_uuid": "FAKEUSER"}
+
+
+def _summary(item: dict) -> dict:
+    return {k: v for k, v in item.items() if k not in ("fields", "sections")}
+
+
+def _error(message: str, code: int = 1):
+    sys.stderr.write(f"[ERROR] 2024/01/01 00:00:00 {message}\n")
+    sys.exit(code)
+
+
+def _option(args: List[str], name: str):
+    if name in args:
+        return args[args.index(name) + 1]
+    return None
+
+
+def _not_an_item(ref: str):
+    _error(f'"{ref}" isn\'t an item. Specify the item with its UUID, name, or domain.')
+
+
+def _resolve(data_dir: Path, ref: str) -> Path:
+    path = data_dir / "items" / f"{ref}.json"
+    if path.exists():
+        return path
+    with open(data_dir / "titles.json") as f:
+        item_id = json.load(f).get(ref)
+    if item_id is None:
+        _not_an_item(ref)
+    return data_dir / "items" / f"{item_id}.json"
+
+
+def main(args: List[str]):
+    data_dir = Path(os.environ["FAKE_OP_DATA"])
+
+    if args[0] in ("signin", "signout"):
+        return
+    if args[0] == "whoami":
+        print(json.dumps(ACCOUNT))
+        return
+    if args[:2] == ["vault", "list"]:
+        print((data_dir / "vaults.json").read_text())
+        return
+    if args[:2] == ["item", "list"]:
+        vault = _option(args, "--vault")
+        with open(data_dir / "list.json") as f:
+            items = json.load(f)
+        listed = [
+            item
+            for item in items
+            if vault is None or vault in (item["vault"]["id"], item["vault"]["name"])
+        ]
+        print(json.dumps(listed))
+        return
+    if args[:2] == ["item", "get"]:
+        if args[2] == "-":
+            out = sys.stdout
+            refs = json.load(sys.stdin)
+            if os.environ.get("FAKE_OP_SLOW_ITEM") in (ref["id"] for ref in refs):
+                time.sleep(60)
+            for ref in refs:
+                path = data_dir / "items" / f"{ref['id']}.json"
+                if not path.exists():
+                    _not_an_item(ref["id"])
+                out.write(path.read_text())
+                out.write("\n")
+            return
+        print(_resolve(data_dir, args[2]).read_text())
+        return
+    if args[:2] == ["item", "edit"]:
+        path = _resolve(data_dir, args[2])
+        old = json.loads(path.read_text())
+        item = dict(json.load(sys.stdin), id=old["id"], vault=old["vault"])
+        item["version"] = old.get("version", 1) + 1
+        path.write_text(json.dumps(item, indent=2))
+        with open(data_dir / "list.json") as f:
+            listed = json.load(f)
+        listed = [_summary(item) if i["id"] == item["id"] else i for i in listed]
+        (data_dir / "list.json").write_text(json.dumps(listed))
+        print(json.dumps(item))
+        return
+    if args[:2] == ["document", "edit"]:
+        path = _resolve(data_dir, args[2])
+        item = json.loads(path.read_text())
+        item["version"] = item.get("version", 1) + 1
+        path.write_text(json.dumps(item, indent=2))
+        (data_dir / "documents" / item["id"]).write_bytes(sys.stdin.buffer.read())
+        return
+    if args[:2] == ["document", "get"]:
+        ref = next(a for a in args[2:] if not a.startswith("--") and a != _option(args, "--vault"))
+        item_id = json.loads(_resolve(data_dir, ref).read_text())["id"]
+        sys.stdout.buffer.write((data_dir / "documents" / item_id).read_bytes())
+        return
+    _error(f"fake op does not support: {' '.join(args)}")
+
+
+def write_fixture(data_dir: Path, items: List[dict], documents: Optional[Dict[str, bytes]] = None):
+    "Writes items, and document contents by item id, in the layout read by the fake op."
+    (data_dir / "items").mkdir(parents=True, exist_ok=True)
+    (data_dir / "documents").mkdir(exist_ok=True)
+    vaults = {}
+    for item in items:
+        (data_dir / "items" / f"{item['id']}.json").write_text(json.dumps(item, indent=2))
+        vault = vaults.setdefault(item["vault"]["id"], dict(item["vault"], content_version=0))
+        vault["content_version"] += item.get("version", 1)
+    for item_id, contents in (documents or {}).items():
+        (data_dir / "documents" / item_id).write_bytes(contents)
+    (data_dir / "list.json").write_text(json.dumps([_summary(item) for item in items]))
+    (data_dir / "titles.json").write_text(json.dumps({item["title"]: item["id"] for item in items}))
+    (data_dir / "vaults.json").write_text(json.dumps(list(vaults.values())))
+
+
+def update_fixture_item(data_dir: Path, item: dict):
+    "Replaces an item of a fixture, as if it had been edited in 1Password."
+    (data_dir / "items" / f"{item['id']}.json").write_text(json.dumps(item, indent=2))
+    listed = json.loads((data_dir / "list.json").read_text())
+    listed = [_summary(item) if i["id"] == item["id"] else i for i in listed]
+    (data_dir / "list.json").write_text(json.dumps(listed))
+    vaults = json.loads((data_dir / "vaults.json").read_text())
+    for vault in vaults:
+        if vault["id"] == item["vault"]["id"]:
+            vault["content_version"] += 1
+    (data_dir / "vaults.json").write_text(json.dumps(vaults))
+
+
+def install_fake_op(
+    directory: Path, items: List[dict], documents: Optional[Dict[str, bytes]] = None
+) -> Path:
+    "Writes items to a fixture directory and an executable op wrapper serving them."
+    data_dir = directory / "op-data"
+    write_fixture(data_dir, items, documents)
+    exe = directory / "op"
+    exe.write_text(
+        f"#!/bin/sh\nFAKE_OP_DATA='{data_dir}' exec '{sys.executable}' '{__file__}' \"$@\"\n"
+    )
+    exe.chmod(exe.stat().st_mode | stat.S_IXUSR)
+    return exe
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
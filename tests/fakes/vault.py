@@ -0,0 +1,311 @@
+"""
+In-memory stand-in for the parts of the Vault HTTP API used by onepassvault:
+sys/health, token lookup and renewal, AppRole login, and the KV v2 secrets engine.
+"""
+
+import json
+import re
+import ssl
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+RE_KV = re.compile(r"^/v1/(?P<mount>[^/]+)/(?P<kind>data|metadata|destroy)/?(?P<path>.*)$")
+RE_LOGIN = re.compile(r"^/v1/auth/(?P<mount>[^/]+)/login$")
+
+
+class KVStore:
+    def __init__(self):
+        self.secrets: Dict[str, dict] = {}
+        self.lock = Lock()
+
+    def metadata(self, path: str) -> Optional[dict]:
+        secret = self.secrets.get(path)
+        if secret is None:
+            return None
+        return {
+            "current_version": len(secret["versions"]),
+            "custom_metadata": secret["custom_metadata"],
+            "delete_version_after": secret["delete_version_after"],
+            "created_time": secret["created_time"],
+            "updated_time": secret["updated_time"],
+            "versions": {
+                str(i + 1): {"created_time": v["created_time"], "destroyed": False}
+                for i, v in enumerate(secret["versions"])
+            },
+        }
+
+    def write(self, path: str, data: dict, cas: Optional[int] = None) -> Optional[dict]:
+        with self.lock:
+            now = time.strftime("%Y-%m-%dT%H:%M:%S.000000Z", time.gmtime())
+            secret = self.secrets.setdefault(
+                path,
+                {
+                    "versions": [],
+                    "custom_metadata": None,
+                    "delete_version_after": "0s",
+                    "created_time": now,
+                    "updated_time": now,
+                },
+            )
+            if cas is not None and cas != len(secret["versions"]):
+                return None
+            secret["versions"].append({"data": data, "created_time": now, "deleted": False})
+            secret["updated_time"] = now
+            return {"version": len(secret["versions"]), "created_time": now}
+
+    def list(self, prefix: str):
+        prefix = prefix.strip("/")
+        prefix = prefix + "/" if prefix else ""
+        keys = set()
+        for path in self.secrets:
+            if path.startswith(prefix):
+                rest = path[len(prefix) :]
+                head, sep, _ = rest.partition("/")
+                keys.add(head + sep)
+        return sorted(keys)
+
+
+class VaultStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, token: str = "stub-token", ssl_context: Optional[ssl.SSLContext] = None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.tls = ssl_context is not None
+        if ssl_context is not None:
+            self.socket = ssl_context.wrap_socket(self.socket, server_side=True)
+        self.mounts: Dict[str, KVStore] = {}
+        self.requests = Counter()
+        self.initialized = True
+        self.sealed = False
+        self.standby = False
+        # Namespace that requests must be made in, if set
+        self.namespace: Optional[str] = None
+        # Number of upcoming requests answered with 502, as by a proxy losing Vault
+        self.gateway_errors = 0
+        # AppRole (role_id, secret_id) accepted by login
+        self.approle: Optional[Tuple[str, str]] = None
+        self.set_token(token)
+        self._thread: Optional[Thread] = None
+
+    def set_token(self, token: str, ttl: int = 0, max_ttl: int = 0, renewable: bool = False):
+        """
+        Replaces the valid token. With a ttl, it expires like a service token, and
+        renewals cannot extend it past max_ttl seconds after it was issued.
+        """
+        self.token = token
+        self.token_ttl = ttl
+        self.token_max_ttl = max_ttl
+        self.token_renewable = renewable
+        self.token_issued_at = time.monotonic()
+        self.token_expires_at = self.token_issued_at + ttl if ttl else None
+
+    def token_remaining(self) -> int:
+        if self.token_expires_at is None:
+            return 0
+        return max(0, round(self.token_expires_at - time.monotonic()))
+
+    def renew_token(self, increment: Optional[int]) -> int:
+        ttl = int(increment or self.token_ttl)
+        if self.token_max_ttl:
+            max_remaining = self.token_issued_at + self.token_max_ttl - time.monotonic()
+            ttl = min(ttl, max(0, round(max_remaining)))
+        self.token_expires_at = time.monotonic() + ttl
+        return ttl
+
+    @property
+    def url(self) -> str:
+        return f"{'https' if self.tls else 'http'}://127.0.0.1:{self.server_port}"
+
+    def kv(self, mount: str = "secret") -> KVStore:
+        return self.mounts.setdefault(mount, KVStore())
+
+    def start(self) -> "VaultStub":
+        self._thread = Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: VaultStub
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes, avoid the Nagle / delayed ACK stall on keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: Optional[dict] = None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _handle(self, method: str):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if method == "GET" and query.get("list") == ["true"]:
+            method = "LIST"
+        body = self._body() if method in ("POST", "PUT", "PATCH") else {}
+
+        server = self.server
+        if server.gateway_errors:
+            server.gateway_errors -= 1
+            return self._reply(502)
+        if url.path == "/v1/sys/health":
+            server.requests[(method, "health")] += 1
+            # The status codes of sys/health with its default parameters
+            if not server.initialized:
+                status = 501
+            elif server.sealed:
+                status = 503
+            elif server.standby:
+                status = 429
+            else:
+                status = 200
+            health = {
+                "initialized": server.initialized,
+                "sealed": server.sealed,
+                "standby": server.standby,
+                "version": "stub",
+            }
+            return self._reply(status, health)
+        login = RE_LOGIN.match(url.path)
+        if login is not None and method in ("POST", "PUT"):
+            server.requests[(method, "login")] += 1
+            if server.approle != (body.get("role_id"), body.get("secret_id")):
+                return self._reply(400, {"errors": ["invalid role or secret ID"]})
+            token = f"approle-token-{server.requests[(method, 'login')]}"
+            server.set_token(token, server.token_ttl, server.token_max_ttl, server.token_renewable)
+            return self._reply(200, {"auth": self._auth(server.token_ttl)})
+        if (
+            server.namespace is not None
+            and self.headers.get("X-Vault-Namespace") != server.namespace
+        ):
+            return self._reply(404, {"errors": ["no handler for route"]})
+        expired = server.token_expires_at is not None and server.token_remaining() == 0
+        if self.headers.get("X-Vault-Token") != server.token or expired:
+            return self._reply(403, {"errors": ["permission denied"]})
+        if url.path == "/v1/auth/token/lookup-self":
+            server.requests[(method, "token")] += 1
+            data = {
+                "ttl": server.token_remaining(),
+                "creation_ttl": server.token_ttl,
+                "renewable": server.token_renewable,
+            }
+            return self._reply(200, {"data": data})
+        if url.path == "/v1/auth/token/renew-self":
+            server.requests[(method, "renew")] += 1
+            if not server.token_renewable:
+                return self._reply(400, {"errors": ["lease is not renewable"]})
+            return self._reply(200, {"auth": self._auth(server.renew_token(body.get("increment")))})
+
+        m = RE_KV.match(url.path)
+        if m is None:
+            return self._reply(404, {"errors": []})
+        kind, path = m.group("kind"), m.group("path").strip("/")
+        self.server.requests[(method, kind)] += 1
+        kv = self.server.kv(m.group("mount"))
+
+        with kv.lock:
+            secret = kv.secrets.get(path)
+            if method == "LIST" and kind == "metadata":
+                keys = kv.list(path)
+                if not keys:
+                    return self._reply(404, {"errors": []})
+                return self._reply(200, {"data": {"keys": keys}})
+            if method == "GET" and kind == "metadata":
+                if secret is None:
+                    return self._reply(404, {"errors": []})
+                return self._reply(200, {"data": kv.metadata(path)})
+            if method == "POST" and kind == "metadata":
+                if secret is None:
+                    return self._reply(404, {"errors": []})
+                for key in ("custom_metadata", "delete_version_after"):
+                    if key in body:
+                        secret[key] = body[key]
+                return self._reply(204)
+            if method == "PATCH" and kind == "metadata":
+                if self.headers.get("Content-Type") != "application/merge-patch+json":
+                    return self._reply(415, {"errors": ["unsupported content type"]})
+                if secret is None:
+                    return self._reply(404, {"errors": []})
+                custom_metadata = dict(secret["custom_metadata"] or {})
+                for key, value in (body.get("custom_metadata") or {}).items():
+                    if value is None:
+                        custom_metadata.pop(key, None)
+                    else:
+                        custom_metadata[key] = value
+                secret["custom_metadata"] = custom_metadata
+                if "delete_version_after" in body:
+                    secret["delete_version_after"] = body["delete_version_after"]
+                return self._reply(204)
+            if method == "DELETE" and kind == "metadata":
+                kv.secrets.pop(path, None)
+                return self._reply(204)
+            if method == "GET" and kind == "data":
+                if secret is None or secret["versions"][-1]["deleted"]:
+                    return self._reply(404, {"errors": []})
+                version = secret["versions"][-1]
+                return self._reply(
+                    200,
+                    {
+                        "data": {
+                            "data": version["data"],
+                            "metadata": {
+                                "version": len(secret["versions"]),
+                                "created_time": version["created_time"],
+                                "custom_metadata": secret["custom_metadata"],
+                            },
+                        }
+                    },
+                )
+            if method == "DELETE" and kind == "data":
+                if secret is not None:
+                    secret["versions"][-1]["deleted"] = True
+                return self._reply(204)
+
+        if method in ("POST", "PUT") and kind == "data":
+            result = kv.write(path, body.get("data", {}), body.get("options", {}).get("cas"))
+            if result is None:
+                return self._reply(400, {"errors": ["check-and-set parameter did not match"]})
+            return self._reply(200, {"data": result})
+        return self._reply(405, {"errors": [f"unsupported {method} on {kind}"]})
+
+    def _auth(self, ttl: int) -> dict:
+        return {
+            "client_token": self.server.token,
+            "lease_duration": ttl,
+            "renewable": self.server.token_renewable,
+        }
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_LIST(self):
+        self._handle("LIST")
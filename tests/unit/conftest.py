@@ -0,0 +1,17 @@
+import pytest
+
+from onepassvault.vault import VaultClientConfig, open_vault
+from tests.fakes.vault import VaultStub
+
+
+@pytest.fixture
+def vault_stub():
+    stub = VaultStub().start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def client(vault_stub):
+    "A Vault client of the stub, with its current token."
+    return open_vault(VaultClientConfig(url=vault_stub.url, token=vault_stub.token, timeout=5))
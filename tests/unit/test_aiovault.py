@@ -0,0 +1,151 @@
+import asyncio
+import datetime
+import ipaddress
+import json
+import ssl
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from onepassvault.aiovault import AsyncKV, open_async_vault  # noqa: E402
+from onepassvault.vault import VaultClientConfig, VaultError  # noqa: E402
+from tests.fakes.vault import VaultStub  # noqa: E402
+
+
+def make_kv(store):
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["X-Vault-Token"] == "t0ken"
+        kind, _, path = request.url.path.removeprefix("/v1/secret/").partition("/")
+        if request.method == "LIST":
+            keys = [k[len(path) :] for k in store if k.startswith(path)]
+            if not keys:
+                return httpx.Response(404, json={"errors": []})
+            return httpx.Response(200, json={"data": {"keys": keys}})
+        if request.method == "POST" and kind == "data":
+            store[path] = json.loads(request.content)["data"]
+            return httpx.Response(200, json={"data": {"version": 1}})
+        if request.method == "GET" and kind == "data":
+            if path not in store:
+                return httpx.Response(404, json={"errors": []})
+            return httpx.Response(200, json={"data": {"data": store[path], "metadata": {}}})
+        if request.method == "DELETE":
+            store.pop(path, None)
+            return httpx.Response(204)
+        return httpx.Response(405, json={"errors": ["unsupported"]})
+
+    http = httpx.AsyncClient(
+        base_url="http://vault.test",
+        headers={"X-Vault-Token": "t0ken"},
+        transport=httpx.MockTransport(handler),
+    )
+    return AsyncKV(http)
+
+
+def test_async_kv_concurrent_crud():
+    store = {}
+
+    async def run():
+        async with make_kv(store) as kv:
+            await asyncio.gather(*(kv.write(f"app/{i}", {"n": str(i)}) for i in range(20)))
+            secrets = await asyncio.gather(*(kv.read(f"app/{i}") for i in range(20)))
+            assert [s["data"]["n"] for s in secrets] == [str(i) for i in range(20)]
+            assert len(await kv.list("app")) == 20
+            await kv.delete("app/0")
+            assert await kv.read("app/0") is None
+            assert await kv.list("missing") == []
+
+    asyncio.run(run())
+
+
+def write_self_signed_cert(directory):
+    "Writes a certificate for 127.0.0.1 and its key, returns their paths."
+    pytest.importorskip("cryptography")
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "vault-stub")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(hours=1))
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .add_extension(
+            x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+            critical=False,
+        )
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = directory / "cert.pem", directory / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return cert_path, key_path
+
+
+def test_open_async_vault_maps_the_vault_config(vault_stub):
+    vault_stub.namespace = "team"
+    config = VaultClientConfig(
+        url=vault_stub.url, token=vault_stub.token, namespace="team", timeout=7
+    )
+
+    async def run():
+        async with open_async_vault(config) as kv:
+            assert kv.http.timeout.read == 7
+            await kv.write("app/db", {"password": "pw"})
+            await kv.update_metadata("app/db", {"owner": "team-db"})
+            secret = await kv.read("app/db")
+            assert secret["data"] == {"password": "pw"}
+            assert secret["metadata"]["custom_metadata"] == {"owner": "team-db"}
+            assert await kv.list("app") == ["db"]
+
+        # Outside the namespace Vault has no such route, writes fail instead of returning None
+        async with open_async_vault(config.model_copy(update={"namespace": None})) as kv:
+            with pytest.raises(VaultError, match="404"):
+                await kv.write("app/db", {"password": "pw"})
+        async with open_async_vault(config.model_copy(update={"token": "wrong"})) as kv:
+            with pytest.raises(VaultError, match="403"):
+                await kv.read("app/db")
+
+    asyncio.run(run())
+
+
+def test_open_async_vault_uses_the_configured_certificates(tmp_path):
+    cert_path, key_path = write_self_signed_cert(tmp_path)
+    # The stub requires a client certificate, signed by itself
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(cert_path, key_path)
+    server_context.load_verify_locations(cert_path)
+    server_context.verify_mode = ssl.CERT_REQUIRED
+    stub = VaultStub(ssl_context=server_context).start()
+    config = VaultClientConfig(
+        url=stub.url,
+        token=stub.token,
+        server_cert_path=cert_path,
+        client_cert_path=cert_path,
+        client_cert_key_path=key_path,
+        timeout=5,
+    )
+
+    async def run():
+        async with open_async_vault(config) as kv:
+            await kv.write("app/db", {"password": "pw"})
+            assert (await kv.read("app/db"))["data"] == {"password": "pw"}
+
+    try:
+        asyncio.run(run())
+    finally:
+        stub.stop()
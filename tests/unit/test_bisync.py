@@ -0,0 +1,80 @@
+import json
+
+from onepassvault.bisync import apply_secret, bisync
+from onepassvault.opw import OnePassword, OpItem, SecretBuffer
+from onepassvault.sync import item_secret
+from tests.fakes.op import install_fake_op
+
+
+def make_item(i, password):
+    return {
+        "id": f"item{i}",
+        "title": f"db-{i}",
+        "version": 1,
+        "category": "PASSWORD",
+        "vault": {"id": "vault1", "name": "Team"},
+        "fields": [{"id": "password", "label": "password", "type": "CONCEALED", "value": password}],
+    }
+
+
+def edit_op_item(tmp_path, item_id, password):
+    path = tmp_path / "op-data" / "items" / f"{item_id}.json"
+    item = json.loads(path.read_text())
+    item["version"] += 1
+    item["fields"][0]["value"] = password
+    path.write_text(json.dumps(item))
+    listing = tmp_path / "op-data" / "list.json"
+    listed = json.loads(listing.read_text())
+    for summary in listed:
+        if summary["id"] == item_id:
+            summary["version"] = item["version"]
+    listing.write_text(json.dumps(listed))
+
+
+def test_bisync_writes_only_the_stale_side(tmp_path, client, vault_stub):
+    items = [make_item(i, f"pw{i}") for i in range(4)]
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, items)))
+    kv = vault_stub.kv()
+
+    summary = bisync(op, client)
+    assert summary.pushed == 4
+
+    summary = bisync(op, client)
+    assert summary.unchanged == 4
+    assert all(len(secret["versions"]) == 1 for secret in kv.secrets.values())
+
+    # item0 edited in 1Password, item1 in Vault, item2 on both sides
+    edit_op_item(tmp_path, "item0", "new0")
+    client.secrets.kv.v2.create_or_update_secret("db-1", {"password": "new1", "user": "app"})
+    edit_op_item(tmp_path, "item2", "op2")
+    client.secrets.kv.v2.create_or_update_secret("db-2", {"password": "vault2"})
+
+    summary = bisync(op, client)
+    assert (summary.unchanged, summary.pushed, summary.pulled) == (1, 1, 1)
+    assert [(c.path, c.reason) for c in summary.conflicts] == [
+        ("db-2", "changed in both 1Password and Vault")
+    ]
+    assert kv.secrets["db-0"]["versions"][-1]["data"] == {"password": "new0"}
+    pulled = op.get_item("item1")
+    assert pulled.get_field_value("password") == "new1"
+    assert pulled.get_field_value("user") == "app"
+    assert len(kv.secrets["db-1"]["versions"]) == 2
+
+    # The conflict is still reported, everything else is in sync
+    summary = bisync(op, client)
+    assert summary.unchanged == 3 and len(summary.conflicts) == 1
+
+
+def test_apply_secret_conceals_values():
+    fields = [
+        {"id": "user", "label": "user", "type": "STRING", "value": "app"},
+        {"id": "password", "label": "password", "type": "CONCEALED", "value": "old"},
+        {"id": "gone", "label": "gone", "type": "STRING", "value": "x"},
+    ]
+    item = OpItem({"id": "abc", "title": "db", "category": "DATABASE", "fields": fields})
+    secret = {"user": "web", "password": "new", "token": "t0ken"}
+    apply_secret(item, secret)
+    assert item.get_field_value("user") == "web"
+    assert isinstance(item.get_field_value("password"), SecretBuffer)
+    assert isinstance(item.get_field_value("token"), SecretBuffer)
+    assert item_secret(item) == secret
@@ -0,0 +1,31 @@
+import threading
+import time
+
+from onepassvault import daemon
+from onepassvault.sync import PushSummary, SyncJob
+
+
+def test_overlapping_triggers_are_coalesced(monkeypatch):
+    release = threading.Event()
+    runs = []
+
+    def slow_run_job(op, client, job, snapshot=None):
+        runs.append(job.name)
+        release.wait(5)
+        return PushSummary()
+
+    monkeypatch.setattr(daemon, "run_job", slow_run_job)
+    monkeypatch.setattr(daemon, "assert_vault_is_live", lambda client, max_age: None)
+
+    sync_daemon = daemon.SyncDaemon(None, None, [SyncJob(name="a", op_vault="A", interval=60)])
+    for _ in range(5):
+        sync_daemon.trigger("a")
+    release.set()
+    deadline = time.monotonic() + 5
+    while sync_daemon.stats()["jobs"]["a"]["runs"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    sync_daemon.stop()
+
+    stats = sync_daemon.stats()["jobs"]["a"]
+    assert runs == ["a", "a"]
+    assert (stats["runs"], stats["failures"], stats["coalesced"]) == (2, 0, 3)
@@ -0,0 +1,73 @@
+import json
+import signal
+import threading
+import time
+
+import pytest
+
+from clickio.output import add_shutdown_hook, remove_shutdown_hook, signal_handlers
+from onepassvault.opw import OnePassword, OpCancelled, OpDeadlineExceeded, OpTimeout
+from onepassvault.sync import merge_checkpoints, push
+from tests.fakes.generate import LoadProfile, generate_items
+from tests.fakes.op import install_fake_op
+
+SLOW_INDEX = 220
+
+
+@pytest.fixture
+def op(tmp_path, monkeypatch):
+    profile = LoadProfile(seed=6, categories={"LOGIN": 1})
+    items, _ = generate_items(250, profile)
+    monkeypatch.setenv("FAKE_OP_SLOW_ITEM", items[SLOW_INDEX]["id"])
+    return OnePassword(op_executable=str(install_fake_op(tmp_path, items)))
+
+
+def test_call_timeout_kills_op(op):
+    op.timeout = 0.5
+    items = op.get_items()
+    start = time.monotonic()
+    with pytest.raises(OpTimeout):
+        op.get_items_details(items[SLOW_INDEX:])
+    assert time.monotonic() - start < 5
+
+
+def test_deadline_partial_push(op, client, tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    start = time.monotonic()
+    with op.with_deadline(3):
+        summary = push(op, client, checkpoint=str(checkpoint))
+        with pytest.raises(OpDeadlineExceeded):
+            op.get_items()
+    assert time.monotonic() - start < 10
+    # At least the chunk of the slow item and the ones after it are not fetched
+    assert summary.written <= 200 and summary.written + summary.unfinished == 250
+    assert op.deadline is None
+
+    # Only the written items are checkpointed, and the shard cannot be merged
+    assert len(json.loads(checkpoint.read_text())["item_ids"]) == summary.written
+    with pytest.raises(ValueError, match="unfinished"):
+        merge_checkpoints([str(checkpoint)])
+
+
+def test_cancel(op):
+    items = op.get_items()
+    with op.with_deadline() as deadline:
+        threading.Timer(0.5, deadline.cancel).start()
+        start = time.monotonic()
+        with pytest.raises(OpCancelled):
+            op.get_items_details(items[SLOW_INDEX:])
+        assert time.monotonic() - start < 5
+        assert op.get_items_details(items, partial=True) == []
+
+
+def test_shutdown_hooks_on_sigterm():
+    previous = signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)
+    called = threading.Event()
+    with signal_handlers(exit_on_sigterm=False):
+        add_shutdown_hook(called.set)
+        try:
+            signal.raise_signal(signal.SIGTERM)
+            assert called.is_set()
+        finally:
+            remove_shutdown_hook(called.set)
+    assert (signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)) == previous
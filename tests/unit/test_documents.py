@@ -0,0 +1,104 @@
+import io
+import os
+
+import pytest
+
+from onepassvault.documents import (
+    ContentIndex,
+    DocumentIntegrityError,
+    read_document,
+    write_document,
+)
+from onepassvault.metrics import OP_CALL_SECONDS
+from onepassvault.opw import OnePassword, OpDocument, OpItem
+from tests.fakes.op import install_fake_op
+
+
+def make_document(contents: bytes) -> OpDocument:
+    item = OpItem({"id": "doc1", "category": "DOCUMENT", "files": [{"name": "keystore.jks"}]})
+    return OpDocument.from_item(item, contents)
+
+
+def test_large_document_roundtrip_skips_unchanged_chunks(client, vault_stub):
+    contents = os.urandom(10_000)
+    kwargs = dict(threshold=4096, chunk_size=1024)
+    assert write_document(client, "docs/ks", make_document(contents), **kwargs) == 10
+
+    # Rewriting only lists the stored chunks, the previous version is not read
+    changed = contents[:5000] + b"X" + contents[5001:]
+    assert write_document(client, "docs/ks", make_document(changed), **kwargs) == 1
+    assert vault_stub.requests[("GET", "data")] == 0
+
+    out = io.BytesIO()
+    assert read_document(client, "docs/ks", out, max_workers=3) == "keystore.jks"
+    assert out.getvalue() == changed
+
+    # Chunks are never rewritten in place, and the replaced chunk is deleted
+    chunks = {p: s for p, s in vault_stub.kv().secrets.items() if "/chunks/" in p}
+    assert len(chunks) == 10
+    assert all(len(secret["versions"]) == 1 for secret in chunks.values())
+
+    # Shrinking below the threshold stores the document inline and removes its chunks
+    write_document(client, "docs/ks", make_document(b"small"), **kwargs)
+    assert list(vault_stub.kv().secrets) == ["docs/ks"]
+    out = io.BytesIO()
+    read_document(client, "docs/ks", out)
+    assert out.getvalue() == b"small"
+
+
+def test_corrupted_chunk_is_detected(client, vault_stub):
+    write_document(
+        client, "docs/ks", make_document(os.urandom(5000)), threshold=1024, chunk_size=1024
+    )
+    manifest = vault_stub.kv().secrets["docs/ks"]["versions"][-1]["data"]["manifest"]
+    vault_stub.kv().write(f"docs/ks/chunks/{manifest['chunks'][2]}", {"data": "AAAA"})
+    with pytest.raises(DocumentIntegrityError, match="Chunk 2"):
+        read_document(client, "docs/ks", io.BytesIO())
+
+
+def test_content_index_stores_identical_documents_once(tmp_path, client, vault_stub):
+    cert = os.urandom(2000)
+    items = [
+        {
+            "id": item_id,
+            "title": f"{item_id}.pem",
+            "version": 1,
+            "category": "DOCUMENT",
+            "vault": {"id": "vault1", "name": "Private"},
+            "files": [{"name": f"{item_id}.pem"}],
+        }
+        for item_id in ("a", "b")
+    ]
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, items, {"a": cert, "b": cert})))
+    items = [OpItem(item) for item in items]
+    calls = OP_CALL_SECONDS.count(subcommand="document get")
+    index = ContentIndex("docs")
+    for item in items:
+        index.store(client, f"docs/{item.id}", index.get_document(op, item))
+
+    assert OP_CALL_SECONDS.count(subcommand="document get") - calls == 2
+    assert index.stats.fetched == 2
+    assert index.stats.blobs_written == 1
+    assert index.stats.blobs_reused == 1
+    blobs = [path for path in vault_stub.kv().secrets if path.startswith("docs/_blobs/")]
+    assert len(blobs) == 1
+
+    out = io.BytesIO()
+    assert read_document(client, "docs/b", out) == "b.pem"
+    assert out.getvalue() == cert
+
+    # A new run finds the blob already in Vault
+    index = ContentIndex("docs")
+    assert not index.store(client, "docs/c", make_document(cert))
+
+
+def test_content_index_deletes_chunks_of_replaced_document(client, vault_stub):
+    write_document(
+        client, "docs/ks", make_document(os.urandom(5000)), threshold=1024, chunk_size=1024
+    )
+    ContentIndex("docs").store(client, "docs/ks", make_document(b"small"))
+
+    assert not [path for path in vault_stub.kv().secrets if path.startswith("docs/ks/")]
+    out = io.BytesIO()
+    read_document(client, "docs/ks", out)
+    assert out.getvalue() == b"small"
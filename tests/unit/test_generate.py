@@ -0,0 +1,26 @@
+from onepassvault.opw import OnePassword
+from onepassvault.sync import push
+from tests.fakes.generate import LoadProfile, generate_items, generate_kv_secrets, populate_kv
+from tests.fakes.op import install_fake_op
+
+
+def test_generated_fixtures_are_deterministic():
+    profile = LoadProfile(seed=7)
+    assert generate_items(50, profile) == generate_items(50, profile)
+    secrets = generate_kv_secrets(200, profile)
+    assert len(secrets) == 200
+    assert {path.count("/") for path in secrets} == set(profile.kv_depths)
+
+
+def test_push_generated_items(tmp_path, client, vault_stub):
+    profile = LoadProfile(seed=1, document_sizes={512: 1, 600 * 1024: 1})
+    items, documents = generate_items(300, profile)
+    assert {item["category"] for item in items} == set(profile.categories)
+    populate_kv(vault_stub.kv(), generate_kv_secrets(100, profile))
+
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, items, documents)))
+    summary = push(op, client, prefix="load")
+    assert (summary.listed, summary.written) == (300, 300)
+
+    summary = push(op, client, prefix="load")
+    assert (summary.fetched, summary.skipped) == (0, 300)
@@ -0,0 +1,141 @@
+import os
+import time
+
+import pytest
+
+from onepassvault.index import (
+    ItemIndex,
+    ItemIndexError,
+    get_cached_index_key,
+    get_or_create_index_key,
+)
+from onepassvault.opw import OnePassword, OpItemNotFound
+from tests.fakes.op import install_fake_op, update_fixture_item
+
+
+def login_item(item_id, title, version, vault="v1", urls=(), tags=(), labels=()):
+    return {
+        "id": item_id,
+        "title": title,
+        "version": version,
+        "category": "LOGIN",
+        "vault": {"id": vault, "name": vault.upper()},
+        "tags": list(tags),
+        "urls": [{"href": url} for url in urls],
+        "fields": [
+            {"id": label, "label": label, "type": "CONCEALED", "value": "secret"}
+            for label in labels
+        ],
+    }
+
+
+def test_index_refresh_and_queries(tmp_path, monkeypatch):
+    pytest.importorskip("cryptography")
+    from cryptography.fernet import Fernet
+
+    items = [
+        login_item(
+            "a", "GitHub", 1, urls=["https://github.com/login"], tags=["ci"], labels=["token"]
+        ),
+        login_item("b", "github", 1, urls=["github.com"], labels=["password"]),
+        login_item("c", "Database", 1, vault="v2", labels=["password"]),
+    ]
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, items)))
+    listed, fetched = [], []
+    get_items, get_items_details = op.get_items, op.get_items_details
+
+    def spy_get_items(vault=None):
+        listed.append(vault.id)
+        return get_items(vault)
+
+    def spy_get_items_details(items):
+        fetched.extend(item.id for item in items)
+        return get_items_details(items)
+
+    monkeypatch.setattr(op, "get_items", spy_get_items)
+    monkeypatch.setattr(op, "get_items_details", spy_get_items_details)
+
+    key = Fernet.generate_key()
+    path = str(tmp_path / "index")
+    index = ItemIndex.load(path, key=key)
+    assert index.is_stale(3600)
+    assert index.refresh(op) == 3
+    assert not index.is_stale(3600)
+    index.save()
+    assert b"GitHub" not in open(path, "rb").read()
+
+    index = ItemIndex.load(path, key=key)
+    assert not index.is_stale(3600) and index.is_stale(-1)
+    assert [e.id for e in index.find(url="https://github.com")] == ["a", "b"]
+    assert [e.id for e in index.find(url="github.com", tag="CI")] == ["a"]
+    assert [e.id for e in index.find(field_label="password", vault="V2")] == ["c"]
+    assert index.resolve("Database") == "c"
+    with pytest.raises(ItemIndexError, match="more than one item"):
+        index.resolve("github")
+    with pytest.raises(OpItemNotFound):
+        index.resolve("nope")
+
+    # Only the changed vault is listed, and only the changed item is fetched
+    listed.clear()
+    fetched.clear()
+    item = login_item("c", "Database", 2, vault="v2", labels=["password", "host"])
+    update_fixture_item(tmp_path / "op-data", item)
+    assert index.refresh(op) == 1
+    assert listed == ["v2"] and fetched == ["c"]
+    assert [e.id for e in index.find(field_label="host")] == ["c"]
+
+    with pytest.raises(ItemIndexError, match="decrypt"):
+        ItemIndex.load(path, key=Fernet.generate_key())
+
+
+def test_index_key_is_cached_until_it_expires(tmp_path, monkeypatch):
+    pytest.importorskip("cryptography")
+    import onepassvault.index
+
+    keys = iter([b"key1", b"key2", b"key3", b"key4"])
+    monkeypatch.setattr(onepassvault.index, "get_or_create_index_key", lambda op, name: next(keys))
+    calls = []
+
+    def get_op():
+        calls.append(1)
+
+    path = str(tmp_path / "session" / "index.key")
+    assert get_cached_index_key(get_op, cache_path=path, ttl=60) == b"key1"
+    assert get_cached_index_key(get_op, cache_path=path, ttl=60) == b"key1"
+    assert len(calls) == 1
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+    # Cached for another key item, or expired
+    assert get_cached_index_key(get_op, "other", cache_path=path, ttl=60) == b"key2"
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert get_cached_index_key(get_op, "other", cache_path=path, ttl=60) == b"key3"
+    assert len(calls) == 3
+
+    # An expired key is removed, even if it cannot be fetched again
+    monkeypatch.setattr(time, "time", lambda: now + 300)
+
+    def op_unavailable():
+        raise RuntimeError("op is not available")
+
+    with pytest.raises(RuntimeError):
+        get_cached_index_key(op_unavailable, "other", cache_path=path)
+    assert not os.path.exists(path)
+
+    # Without a cache path, the key is not written anywhere
+    assert get_cached_index_key(get_op, cache_path=None) == b"key4"
+    assert not os.path.exists(path)
+
+
+def test_index_key_item_without_key_field(tmp_path):
+    item = {
+        "id": "keyitem",
+        "title": "onepassvault index key",
+        "version": 1,
+        "category": "API_CREDENTIAL",
+        "vault": {"id": "vault1", "name": "Private"},
+        "fields": [],
+    }
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, [item])))
+    with pytest.raises(ItemIndexError, match='no "key" field'):
+        get_or_create_index_key(op)
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from onepassvault.opw import OnePassword, OpItem, OpItemNotFound
+from onepassvault.opw.client import parse_items
+from tests.fakes.generate import LoadProfile, generate_items
+from tests.fakes.op import install_fake_op
+
+
+@pytest.fixture
+def items(tmp_path):
+    items, documents = generate_items(250, LoadProfile(seed=3))
+    install_fake_op(tmp_path, items, documents)
+    return items
+
+
+def _op(tmp_path, **kwargs) -> OnePassword:
+    return OnePassword(op_executable=str(tmp_path / "op"), **kwargs)
+
+
+def _fetch(op: OnePassword, items, chunk_size: int):
+    chunks = []
+    get_chunk = op._get_items_chunk
+
+    def record(chunk):
+        chunks.append(len(chunk))
+        return get_chunk(chunk)
+
+    op._get_items_chunk = record
+    fetched = op.get_items_details(items, chunk_size=chunk_size)
+    return fetched, sorted(chunks, reverse=True)
+
+
+@pytest.mark.parametrize(
+    "n, chunks",
+    [(0, []), (1, [1]), (99, [99]), (100, [100]), (101, [100, 1]), (250, [100] * 2 + [50])],
+)
+def test_chunk_boundaries(tmp_path, items, n, chunks):
+    op = _op(tmp_path, fetch_workers=4)
+    listed = op.get_items()[:n]
+    fetched, sizes = _fetch(op, listed, chunk_size=100)
+    assert sizes == chunks
+    # In listing order, with their fields
+    assert [item.id for item in fetched] == [item["id"] for item in items[:n]]
+    assert [len(item.fields_by_id) for item in fetched] == [len(i["fields"]) for i in items[:n]]
+
+
+def test_missing_item_fails_its_chunk(tmp_path, items):
+    op = _op(tmp_path)
+    listed = op.get_items()[:3]
+    listed.insert(1, OpItem({"id": "gone", "vault": listed[0]._data["vault"]}))
+    with pytest.raises(OpItemNotFound):
+        op.get_items_details(listed, chunk_size=2)
+    # Chunks without it are fetched
+    assert len(op.get_items_details(listed[2:], chunk_size=2)) == 2
+    # Or the other items of its chunk are fetched one by one
+    fetched = op.get_items_details(listed, chunk_size=2, skip_missing=True)
+    assert [item.id for item in fetched] == [listed[0].id] + [item.id for item in listed[2:]]
+
+
+def test_parse_pool(tmp_path, items):
+    op = _op(tmp_path, parse_workers=2)
+    listed = op.get_items()
+    try:
+        pooled = op.get_items_details(listed, chunk_size=50)
+        assert op._parse_pool._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        op.close()
+    assert op._parse_pool is None
+    local = _op(tmp_path).get_items_details(listed, chunk_size=50)
+    assert [item._data for item in pooled] == [item._data for item in local]
+    assert [item.fields_by_id for item in pooled] == [item.fields_by_id for item in local]
+
+
+def test_parse_items_from_parsed():
+    raw = {
+        "id": "abc",
+        "title": "t",
+        "category": "LOGIN",
+        "fields": [{"id": "password", "label": "password", "type": "CONCEALED", "value": "pw"}],
+    }
+    data = (json.dumps(raw) + "\n" + json.dumps(dict(raw, id="def"))).encode("utf-8")
+    parsed = parse_items(data)
+    assert [d["id"] for d, _ in parsed] == ["abc", "def"]
+    item = OpItem.from_parsed(*parsed[0])
+    assert item.get_field_value("password") == "pw" and "fields" not in item._data
+    assert not any(item.changes())
@@ -0,0 +1,87 @@
+import pytest
+
+from onepassvault.credentials import op_item_to_vault_config, vault_config_to_op_item
+from onepassvault.kv import (
+    Confidentiality,
+    DocumentModel,
+    DocumentModelConfig,
+    Field,
+    Mutability,
+    Visibility,
+)
+from onepassvault.opw import OpItem, OpItemFieldType, SecretBuffer
+from onepassvault.vault import VaultClientConfig
+
+
+class Database(DocumentModel):
+    config = DocumentModelConfig(confidentiality=Confidentiality.PUBLIC, category="DATABASE")
+
+    host = Field(label="server")
+    port = Field(getter=int)
+    password = Field(visibility=Visibility.HIDDEN)
+
+
+class Frozen(Database):
+    config = DocumentModelConfig(mutability=Mutability.IMMUTABLE)
+
+
+def _item(**values) -> OpItem:
+    fields = [{"id": k, "label": k, "type": "STRING", "value": v} for k, v in values.items()]
+    return OpItem({"id": "abc", "title": "db", "category": "DATABASE", "fields": fields})
+
+
+def test_to_secret_maps_labels_and_converts():
+    item = _item(server="db.local", port="5432", password="hunter2", other="x")
+    assert Database.to_secret(item) == {"host": "db.local", "port": 5432, "password": "hunter2"}
+    assert Database.to_secrets([item, _item(server="b")]) == [
+        {"host": "db.local", "port": 5432, "password": "hunter2"},
+        {"host": "b"},
+    ]
+
+
+def test_to_item_field_types():
+    item = Database.to_item({"host": "db.local", "port": 5432, "password": None}, "db")
+    assert item.category == "DATABASE"
+    assert item.get_field("server").type == OpItemFieldType.TEXT
+    assert item.get_field_value("port") == "5432"
+    assert not item.has_field("password")
+    assert Database.to_secret(item) == {"host": "db.local", "port": 5432}
+
+    # Every field of a secret model is concealed
+    secret = Frozen.to_item({"host": "db.local"}, "db")
+    assert secret.get_field("server").type == OpItemFieldType.PASSWORD
+
+
+def test_update_item():
+    item = _item(server="old", other="x")
+    Database.update_item(item, {"host": "new", "password": "pw"})
+    assert item.get_field_value("server") == "new"
+    assert item.get_field("password").type == OpItemFieldType.PASSWORD
+    assert item.get_field_value("other") == "x"
+    with pytest.raises(TypeError):
+        Frozen.update_item(item, {"host": "new"})
+
+
+def test_field_specs_resolved_per_model():
+    assert [(s.label, s.key) for s in Frozen._specs] == [
+        ("server", "host"),
+        ("port", "port"),
+        ("password", "password"),
+    ]
+    assert [s.type for s in Database._specs] == [
+        OpItemFieldType.TEXT,
+        OpItemFieldType.TEXT,
+        OpItemFieldType.PASSWORD,
+    ]
+    assert {s.type for s in Frozen._specs} == {OpItemFieldType.PASSWORD}
+    assert Frozen.keys() == ["host", "port", "password"]
+
+
+def test_vault_config_roundtrip():
+    config = VaultClientConfig(url="https://vault:8200", token="s.abc", timeout=10)
+    item = vault_config_to_op_item(config, "vault")
+    assert item.get_field("token").type == OpItemFieldType.PASSWORD
+    assert isinstance(item.get_field_value("token"), SecretBuffer)
+    assert item.get_field("url").type == OpItemFieldType.TEXT
+    assert not item.has_field("namespace")
+    assert op_item_to_vault_config(item) == config
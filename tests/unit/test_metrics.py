@@ -0,0 +1,87 @@
+import urllib.request
+
+import pytest
+
+from onepassvault.metrics import (
+    OP_CALL_ERRORS,
+    OP_CALL_SECONDS,
+    VAULT_BYTES,
+    VAULT_REQUEST_SECONDS,
+    VAULT_RETRIES,
+    Registry,
+    serve_metrics,
+    vault_endpoint,
+)
+from onepassvault.opw import OnePassword, OpItemNotFound
+from onepassvault.opw.client import op_subcommand
+from tests.fakes.op import install_fake_op
+
+
+def test_render_prometheus_text_format():
+    registry = Registry()
+    counter = registry.counter("test_items_total", "Items.", ["outcome"])
+    counter.inc(3, outcome="written")
+    counter.inc(outcome='we"ird')
+    histogram = registry.histogram("test_seconds", "Latency.", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP test_items_total Items.",
+        "# TYPE test_items_total counter",
+        'test_items_total{outcome="we\\"ird"} 1',
+        'test_items_total{outcome="written"} 3',
+        "# HELP test_seconds Latency.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1"} 2',
+        'test_seconds_bucket{le="+Inf"} 3',
+        "test_seconds_sum 5.55",
+        "test_seconds_count 3",
+    ]
+
+
+def test_labels_do_not_leak_secret_paths():
+    assert vault_endpoint("https://vault:8200/v1/secret/data/team/db") == "/v1/secret/data"
+    assert vault_endpoint("/v1/auth/token/lookup-self") == "/v1/auth/token/lookup-self"
+    assert vault_endpoint("/v1/sys/health") == "/v1/sys/health"
+    assert vault_endpoint("/v1/kv1/team/db/password") == "/v1/kv1"
+    assert op_subcommand(["item", "get", "my item"]) == "item get"
+    assert op_subcommand(["whoami"]) == "whoami"
+
+
+def test_vault_requests_are_recorded_and_served(client):
+    before = VAULT_REQUEST_SECONDS.count(method="POST", endpoint="/v1/secret/data")
+    sent = VAULT_BYTES.get(direction="sent")
+    client.secrets.kv.v2.create_or_update_secret("team/db", {"password": "hunter2"})
+    assert VAULT_REQUEST_SECONDS.count(method="POST", endpoint="/v1/secret/data") == before + 1
+    assert VAULT_BYTES.get(direction="sent") > sent
+
+    server = serve_metrics(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+    finally:
+        server.shutdown()
+    assert 'opvault_vault_request_seconds_count{method="POST",endpoint="/v1/secret/data"}' in body
+    assert "team/db" not in body
+
+
+def test_op_calls_are_recorded(tmp_path):
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, [])))
+    calls = OP_CALL_SECONDS.count(subcommand="item get")
+    errors = OP_CALL_ERRORS.get(subcommand="item get")
+    with pytest.raises(OpItemNotFound):
+        op.get_item("nope")
+    assert OP_CALL_SECONDS.count(subcommand="item get") == calls + 1
+    assert OP_CALL_ERRORS.get(subcommand="item get") == errors + 1
+
+
+def test_vault_gateway_errors_are_retried(client, vault_stub):
+    client.secrets.kv.v2.create_or_update_secret("team/db", {"password": "hunter2"})
+    retries = VAULT_RETRIES.get()
+    vault_stub.gateway_errors = 2
+    secret = client.secrets.kv.v2.read_secret_version("team/db", raise_on_deleted_version=True)
+    assert secret["data"]["data"] == {"password": "hunter2"}
+    assert VAULT_RETRIES.get() == retries + 2
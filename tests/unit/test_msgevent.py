@@ -0,0 +1,72 @@
+import io
+import json
+import queue
+
+from clickio.msgevent import (
+    Intent,
+    JsonlWriter,
+    Message,
+    MessageBody,
+    MessageQueue,
+    MessageRouterWorker,
+    OutputConfig,
+    OutputModeConfig,
+    TextIOWriter,
+)
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+        self.flushes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+    def flush(self):
+        self.flushes += 1
+
+
+def info(text: str, verbosity: int = 0) -> Message:
+    return Message(intent=Intent.INFO, body=MessageBody(text), verbosity=verbosity)
+
+
+def test_text_writer_batch_is_one_write_and_flush():
+    stream = CountingStream()
+    TextIOWriter(stream).write_batch([info("a"), info("b"), info("c")])
+    assert stream.getvalue() == "a\nb\nc\n"
+    assert (stream.writes, stream.flushes) == (1, 1)
+
+
+def test_batching_worker_preserves_order_and_verbosity(tmp_path):
+    path = str(tmp_path / "out.txt")
+    mode = OutputModeConfig(info=path, out=path, err=path)
+    q = queue.SimpleQueue()
+    worker = MessageRouterWorker(
+        q, OutputConfig(non_interactive=mode, interactive=mode), batch_size=64, flush_interval=1
+    )
+    worker.start()
+    sender = MessageQueue(q, worker)
+    for i in range(200):
+        sender.send(info(str(i), verbosity=i % 2))
+    sender.finish()
+    with open(path) as f:
+        assert f.read().split() == [str(i) for i in range(0, 200, 2)]
+
+
+def test_jsonl_writer_writes_plain_records():
+    stream = io.StringIO()
+    writer = JsonlWriter(stream)
+    writer.write_batch([info("\x1b[31mred\x1b[0m"), info("plain", verbosity=1)])
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r["body"] for r in records] == ["red", "plain"]
+    assert records[1]["intent"] == "info" and records[1]["verbosity"] == 1
+    assert all(isinstance(r["timestamp"], float) for r in records)
+
+
+def test_ansi_body_strips_hyperlinks():
+    link = "\x1b]8;;https://example.com\x1b\\site\x1b]8;;\x1b\\"
+    body = MessageBody(f"\x1b[1m{link}\x1b[0m \x1b]0;title\x07done")
+    assert str(body) == "site done"
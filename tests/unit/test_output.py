@@ -0,0 +1,62 @@
+import pytest
+
+from clickio import output
+from clickio.core import get_verbosity, set_verbosity
+from clickio.msgevent import MessageSender
+from clickio.output import echo_info, echo_info_v, echo_info_vv, echo_info_vvv
+from clickio.style import Style, _style_string, style_string
+
+
+class Recorder(MessageSender):
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(message)
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    recorder = Recorder()
+    monkeypatch.setattr(output, "_sender", recorder)
+    verbosity = get_verbosity()
+    set_verbosity(1)
+    yield recorder.messages
+    set_verbosity(verbosity)
+
+
+def test_messages_above_verbosity_are_dropped(sent):
+    echo_info("a")
+    echo_info_v("b")
+    echo_info_vv("c")
+    echo_info_vvv("d")
+    assert [(str(m.body), m.verbosity) for m in sent] == [("a", 0), ("b", 1)]
+
+
+def test_callables_are_only_evaluated_when_printed(sent):
+    def build():
+        calls.append(1)
+        return "built"
+
+    calls = []
+    echo_info_vv(build)
+    assert calls == [] and sent == []
+    echo_info_v(build)
+    assert calls == [1] and str(sent[0].body) == "built"
+
+
+def test_format_args(sent):
+    echo_info("item %s: %d fields", args=("abc", 3))
+    echo_info_v("%s%%", False, args=(50,))
+    echo_info_vv("%s", args=(object(),))
+    assert [str(m.body) for m in sent] == ["item abc: 3 fields", "50%"]
+    assert not sent[1].newline
+
+
+def test_style_string_is_cached():
+    _style_string.cache_clear()
+    assert style_string(Style(fg="red", bold=True)) == "bold red"
+    assert style_string(Style(fg="red", bold=True)) == "bold red"
+    assert style_string(Style(bg="blue", strikethrough=True)) == "strike on blue"
+    info = _style_string.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
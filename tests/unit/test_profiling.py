@@ -0,0 +1,31 @@
+import pstats
+
+import click
+from click.testing import CliRunner
+
+from clickio.option import option_profile
+
+retained = []
+
+
+@click.group()
+@option_profile
+def cli():
+    pass
+
+
+@cli.command()
+def work():
+    retained.extend(bytes(1000) for _ in range(1000))
+
+
+def test_profile_covers_subcommands(tmp_path):
+    profile, memory = tmp_path / "run.pstats", tmp_path / "memory.txt"
+    result = CliRunner().invoke(
+        cli, ["--profile", str(profile), "--trace-memory", str(memory), "work"]
+    )
+    assert result.exit_code == 0, result.output
+
+    functions = {func for _, _, func in pstats.Stats(str(profile)).stats}
+    assert "work" in functions
+    assert "test_profiling.py" in memory.read_text()
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from clickio import output, progress
+from clickio.msgevent import Intent, MessageRouter, OutputConfig, OutputModeConfig
+from clickio.output import echo_info
+from clickio.progress import Counter, Progress
+
+
+def test_counter_across_threads():
+    counter = Counter()
+
+    def work():
+        for _ in range(10_000):
+            counter.add()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value == 80_000
+
+
+def test_non_interactive_summaries(monkeypatch):
+    lines = []
+    monkeypatch.setattr(progress, "echo_info", lines.append)
+    with Progress(interactive=False, summary_interval=0.05) as p:
+        fetch = p.stage("fetch")
+        fetch.start(total=5)
+        fetch.advance(3)
+        time.sleep(0.2)
+        fetch.advance(2)
+        fetch.finish()
+    assert "fetch 3/5" in lines
+    # Stages that did not start are left out
+    assert lines[-1] == "fetch 5/5"
+
+
+def test_live_display_on_the_info_console(tmp_path, monkeypatch):
+    path = tmp_path / "out.txt"
+    mode = OutputModeConfig(info=f"console[{path}]", out="null", err="null")
+    router = MessageRouter(OutputConfig(interactive=mode, non_interactive=mode))
+    monkeypatch.setattr(output, "_sender", router)
+    with Progress(interactive=True, refresh_per_second=20) as p:
+        assert p._live.console is router.console(Intent.INFO)
+        p.stage("fetch").advance(3)
+        echo_info("hello")
+    text = path.read_text()
+    assert "hello" in text and "fetch  running" in text
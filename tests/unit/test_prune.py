@@ -0,0 +1,52 @@
+from onepassvault.opw import OnePassword
+from onepassvault.prune import list_secrets_recursive, prune
+from onepassvault.sync import push
+from tests.fakes.generate import LoadProfile, generate_items, generate_kv_secrets, populate_kv
+from tests.fakes.op import install_fake_op
+
+
+def test_list_secrets_recursive(client, vault_stub):
+    secrets = generate_kv_secrets(300, LoadProfile(seed=3))
+    populate_kv(vault_stub.kv(), secrets)
+    assert list_secrets_recursive(client, max_workers=4) == sorted(secrets)
+
+
+def test_prune_deleted_and_renamed_items(tmp_path, client, vault_stub):
+    profile = LoadProfile(seed=2, document_sizes={600 * 1024: 1})
+    items, documents = generate_items(40, profile)
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path / "v1", items, documents)))
+    push(op, client, prefix="team")
+    populate_kv(vault_stub.kv(), {"team/unmanaged": {"key": "value"}})
+
+    deleted = items[:5]
+    renamed = items[5]
+    current = items[5:]
+    renamed["title"] += "-renamed"
+    (tmp_path / "v2").mkdir()
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path / "v2", current, documents)))
+
+    # Not pushed to its new path yet, the renamed item's old secret is kept
+    report = prune(op, client, prefix="team", dry_run=True)
+    assert sorted(report.orphans) == sorted((f"team/{i['title']}", "deleted") for i in deleted)
+
+    push(op, client, prefix="team")
+    report = prune(op, client, prefix="team", dry_run=False, destroy=True, max_workers=4)
+    assert len(report.orphans) == 6 and report.removed == 6
+
+    kv = vault_stub.kv()
+    remaining = {path for path in kv.secrets if "/chunks/" not in path}
+    assert remaining == {f"team/{item['title']}" for item in current} | {"team/unmanaged"}
+    chunk_owners = {path.rsplit("/chunks/", 1)[0] for path in kv.secrets if "/chunks/" in path}
+    assert chunk_owners <= remaining
+
+
+def test_prune_leaves_other_vaults_alone(tmp_path, client, vault_stub):
+    items, documents = generate_items(30, LoadProfile(seed=4, vaults=2))
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, items, documents)))
+    push(op, client, vault="vault0", prefix="team")
+    push(op, client, vault="vault1", prefix="team/infra")
+    pushed = set(vault_stub.kv().secrets)
+
+    report = prune(op, client, vault="vault0", prefix="team", dry_run=False, destroy=True)
+    assert report.orphans == [] and report.removed == 0
+    assert set(vault_stub.kv().secrets) == pushed
@@ -0,0 +1,69 @@
+import json
+
+from onepassvault.opw import OnePassword, OpItem, SecretBuffer
+from onepassvault.opw.secret import wipe, write_json_string
+from tests.fakes.op import install_fake_op
+
+VALUES = ["plain", 'quo"te\\back', "tab\tnew\nline\x00\x1f", "unicodé ✓ 🔑", ""]
+
+
+def test_write_json_string():
+    for value in VALUES:
+        out = bytearray()
+        write_json_string(out, value.encode("utf-8"))
+        assert json.loads(out) == value
+
+
+def test_secret_buffer():
+    secret = SecretBuffer("hunter2")
+    assert secret == "hunter2" and secret == SecretBuffer(b"hunter2") and secret != "hunter3"
+    assert "hunter2" not in str(secret) + repr(secret)
+    assert secret.reveal() == "hunter2"
+
+    buffer = bytearray(b"hunter2")
+    with SecretBuffer.adopt(buffer) as adopted:
+        assert adopted == secret
+    assert buffer == b"" and len(adopted) == 0
+
+    # A SecretBuffer whose __init__ failed is still garbage collected cleanly
+    half = SecretBuffer.__new__(SecretBuffer)
+    half.__del__()
+
+    payload = bytearray(b"secret")
+    wipe(payload)
+    assert payload == bytes(6)
+
+
+def test_item_to_json():
+    item = OpItem({"id": "abc", "title": "t", "category": "LOGIN", "fields": []})
+    for i, value in enumerate(VALUES):
+        item.add_field(f"str{i}", "CONCEALED", value)
+        item.add_field(f"buf{i}", "CONCEALED", SecretBuffer(value))
+    item.add_field("none", "STRING")
+    data = json.loads(item.to_json())
+    assert data["title"] == "t"
+    values = {f["label"]: f["value"] for f in data["fields"]}
+    for i, value in enumerate(VALUES):
+        assert values[f"str{i}"] == values[f"buf{i}"] == value
+    assert values["none"] is None
+
+    assert json.loads(OpItem({"fields": []}).to_json()) == {"fields": []}
+
+
+def test_update_item_with_secret_buffer(tmp_path):
+    items = [
+        {
+            "id": "item1",
+            "title": "db",
+            "version": 1,
+            "category": "PASSWORD",
+            "vault": {"id": "v1", "name": "V"},
+            "fields": [{"id": "password", "label": "password", "type": "CONCEALED", "value": "a"}],
+        }
+    ]
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, items)))
+    item = op.get_item("item1")
+    item.set_field_value("password", SecretBuffer('new "password"'))
+    updated = op.update_item(item)
+    assert updated.version == 2
+    assert updated.get_field_value("password") == 'new "password"'
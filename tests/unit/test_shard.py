@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from onepassvault.sync import Shard, merge_checkpoints
+from tests.fakes.op import install_fake_op
+
+ROOT = Path(__file__).parents[2]
+
+
+def make_items(n: int):
+    vault = {"id": "vault1", "name": "Team"}
+    return [
+        {
+            "id": f"item{i:04d}",
+            "title": f"secret-{i}",
+            "version": 1,
+            "category": "PASSWORD",
+            "vault": vault,
+            "fields": [
+                {"id": "password", "label": "password", "type": "CONCEALED", "value": str(i)}
+            ],
+        }
+        for i in range(n)
+    ]
+
+
+def test_shards_partition_items():
+    ids = [f"item{i}" for i in range(1000)]
+    shards = [Shard(i, 4) for i in range(1, 5)]
+    assigned = [[s for s in shards if s.contains(item_id)] for item_id in ids]
+    assert all(len(a) == 1 for a in assigned)
+    assert all(len([a for a in assigned if a[0] == s]) > 150 for s in shards)
+    with pytest.raises(ValueError):
+        Shard.parse("5/4")
+
+
+def test_sharded_push_processes_every_item_once(tmp_path, vault_stub):
+    items = make_items(60)
+    op_exe = install_fake_op(tmp_path, items)
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT),
+        OPV_OP_EXECUTABLE=str(op_exe),
+        VAULT_ADDR=vault_stub.url,
+        VAULT_TOKEN=vault_stub.token,
+    )
+    env.pop("VAULT_CONFIG_OP_ITEM_ID", None)
+
+    checkpoints = [str(tmp_path / f"shard{i}.json") for i in range(1, 4)]
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "onepassvault", "--non-interactive", "push"]
+            + ["--vault", "Team", "--shard", f"{i}/3", "--checkpoint", checkpoints[i - 1]],
+            env=env,
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        for i in range(1, 4)
+    ]
+    for proc in procs:
+        _, err = proc.communicate(timeout=60)
+        assert proc.returncode == 0, err.decode()
+
+    summary, item_ids = merge_checkpoints(checkpoints)
+    assert item_ids == sorted(item["id"] for item in items)
+    assert summary.written == 60
+    secrets = vault_stub.kv("secret").secrets
+    assert sorted(secrets) == sorted(item["title"] for item in items)
+    assert all(len(secret["versions"]) == 1 for secret in secrets.values())
+
+    with pytest.raises(ValueError, match="Missing checkpoints for shards 3/3"):
+        merge_checkpoints(checkpoints[:2])
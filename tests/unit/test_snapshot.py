@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from onepassvault.opw import OnePassword
+from onepassvault.snapshot import KVSnapshot
+from onepassvault.sync import push
+from tests.fakes.generate import LoadProfile, generate_items, generate_kv_secrets, populate_kv
+from tests.fakes.op import install_fake_op
+
+
+def test_snapshot_refresh(client, vault_stub):
+    secrets = generate_kv_secrets(200, LoadProfile(seed=4))
+    populate_kv(vault_stub.kv(), secrets)
+    snapshot = KVSnapshot(client, max_workers=4)
+    stats = snapshot.refresh()
+    assert stats.relisted == [""] and stats.metadata_reads == len(secrets)
+    assert snapshot.paths() == sorted(secrets)
+    folder = next(p.split("/")[0] for p in secrets if "/" in p)
+    assert snapshot.paths(folder) == sorted(p for p in secrets if p.startswith(folder + "/"))
+    top = next(p for p in secrets if "/" not in p)
+    assert snapshot.get(top).current_version == 1
+
+    # Nothing invalidated, nothing read
+    stats = snapshot.refresh()
+    assert stats.relisted == [] and stats.metadata_reads == 0
+
+    vault_stub.kv().write(top, {"key": "changed"})
+    vault_stub.kv().write(f"{folder}/new/secret", {"key": "new"})
+    snapshot.invalidate(top)
+    snapshot.invalidate_prefix(f"{folder}/new")
+    stats = snapshot.refresh()
+    assert stats.relisted == [f"{folder}/new"] and stats.metadata_reads == 2
+    assert snapshot.get(top).current_version == 2
+    assert snapshot.get(f"{folder}/new/secret") is not None
+    assert len(snapshot) == len(secrets) + 1
+
+
+def test_snapshot_max_age(client, vault_stub):
+    populate_kv(vault_stub.kv(), {"team/a": {"k": "v"}, "other/b": {"k": "v"}})
+    snapshot = KVSnapshot(client, prefix="team", max_age=0.05)
+    snapshot.refresh()
+    assert snapshot.paths() == ["team/a"]
+    populate_kv(vault_stub.kv(), {"team/c": {"k": "v"}})
+    time.sleep(0.1)
+    assert snapshot.refresh().relisted == ["team"]
+    assert snapshot.paths() == ["team/a", "team/c"]
+
+
+def test_push_with_snapshot(tmp_path, client):
+    items, documents = generate_items(30, LoadProfile(seed=5, document_sizes={1024: 1}))
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, items, documents)))
+    snapshot = KVSnapshot(client, prefix="team")
+    summary = push(op, client, prefix="team", snapshot=snapshot)
+    assert summary.written == 30
+
+    # The second run only reads the metadata of the secrets written by the first
+    summary = push(op, client, prefix="team", snapshot=snapshot)
+    assert summary.skipped == 30 and summary.fetched == 0
+    assert snapshot.refresh().metadata_reads == 0
+
+    with pytest.raises(ValueError):
+        push(op, client, prefix="other", snapshot=snapshot)
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from typing import Dict
+
+HEAVY_MODULES = {"hvac", "pydantic", "rich", "colorama", "requests"}
+# About 70ms when measured, most of it in click; importing hvac alone takes over 150ms
+MAIN_IMPORT_BUDGET_US = 300_000
+
+
+def import_times(*args: str) -> Dict[str, int]:
+    "Runs python -X importtime, returns the cumulative import time in us of each module."
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_help_does_not_import_heavy_modules():
+    times = import_times("-m", "onepassvault", "--help")
+    heavy = HEAVY_MODULES & times.keys()
+    assert not heavy, f"opvault --help imported {sorted(heavy)}"
+
+
+def test_import_main_is_lightweight():
+    times = import_times("-c", "import onepassvault.__main__")
+    heavy = HEAVY_MODULES & times.keys()
+    assert not heavy, f"onepassvault.__main__ imported {sorted(heavy)}"
+    elapsed = times["onepassvault.__main__"]
+    assert elapsed < MAIN_IMPORT_BUDGET_US, f"onepassvault.__main__ took {elapsed / 1000:.0f}ms"
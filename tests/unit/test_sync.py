@@ -0,0 +1,65 @@
+from onepassvault.opw import OnePassword, OpItem, OpItemFieldType
+from onepassvault.sync import Fingerprint, push
+from tests.fakes.op import install_fake_op, update_fixture_item
+
+
+def make_item(item_id, version, password):
+    item = OpItem({"id": item_id, "title": item_id, "version": version, "category": "LOGIN"})
+    item.add_field("password", OpItemFieldType.PASSWORD, password)
+    data = dict(item._data, vault={"id": "vault1", "name": "Team"})
+    data["fields"] = [dict(f.model_dump(), value=password) for f in item.fields_by_id.values()]
+    return data
+
+
+def test_fingerprint_metadata_roundtrip():
+    fp = Fingerprint(item_id="abc", item_version=3, content_hash="ff")
+    assert Fingerprint.from_metadata(fp.to_metadata()) == fp
+    fp = Fingerprint(item_id="abc", item_version=3, content_hash="ff", kv_version=7)
+    assert Fingerprint.from_metadata(fp.to_metadata()) == fp
+    assert Fingerprint.from_metadata({}) is None
+
+
+def test_push_skips_unchanged_items(tmp_path, client, vault_stub):
+    items = [make_item("a", 1, "pw-a"), make_item("b", 1, "pw-b")]
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, items)))
+    kv = vault_stub.kv()
+
+    summary = push(op, client)
+    assert (summary.fetched, summary.written, summary.skipped) == (2, 2, 0)
+
+    summary = push(op, client)
+    assert (summary.fetched, summary.written, summary.skipped) == (0, 0, 2)
+
+    # Version bump without content change refreshes metadata only
+    update_fixture_item(tmp_path / "op-data", make_item("a", 2, "pw-a"))
+    reads = vault_stub.requests[("GET", "data")]
+    summary = push(op, client)
+    assert (summary.fetched, summary.written, summary.skipped) == (1, 0, 2)
+    assert len(kv.secrets["a"]["versions"]) == 1
+    assert kv.secrets["a"]["custom_metadata"]["op_item_version"] == "2"
+    assert vault_stub.requests[("GET", "data")] == reads
+
+
+def test_push_keeps_other_secret_metadata(tmp_path, client, vault_stub):
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, [make_item("a", 1, "pw")])))
+    kv = vault_stub.kv()
+    kv.write("a", {"password": "old"})
+    kv.secrets["a"]["custom_metadata"] = {"owner": "team-db"}
+    kv.secrets["a"]["delete_version_after"] = "720h0m0s"
+
+    assert push(op, client).written == 1
+    metadata = kv.metadata("a")
+    assert metadata["delete_version_after"] == "720h0m0s"
+    assert metadata["custom_metadata"]["owner"] == "team-db"
+    assert metadata["custom_metadata"]["op_item_id"] == "a"
+
+
+def test_push_skips_items_deleted_since_listed(tmp_path, client, vault_stub):
+    items = [make_item(item_id, 1, f"pw-{item_id}") for item_id in "abc"]
+    op = OnePassword(op_executable=str(install_fake_op(tmp_path, items)))
+    # Still listed, but gone when its details are fetched
+    (tmp_path / "op-data" / "items" / "b.json").unlink()
+
+    summary = push(op, client)
+    assert (summary.written, summary.missing, summary.unfinished) == (2, 1, 0)
+    assert sorted(vault_stub.kv().secrets) == ["a", "c"]
@@ -0,0 +1,46 @@
+import pytest
+
+from onepassvault.vault import (
+    VaultClientConfig,
+    VaultError,
+    assert_vault_is_live,
+    check_vault_health,
+    open_vault,
+)
+
+
+def test_check_vault_health(client, vault_stub):
+    health = check_vault_health(client)
+    assert health.is_live and health.version == "stub"
+    assert (vault_stub.requests[("GET", "health")], vault_stub.requests[("GET", "token")]) == (1, 1)
+
+
+def test_check_vault_health_max_age(client, vault_stub):
+    first = check_vault_health(client, max_age=60)
+    assert check_vault_health(client, max_age=60) is first
+    assert vault_stub.requests[("GET", "health")] == 1
+    # Not reused without max_age, nor by another client
+    assert check_vault_health(client) is not first
+    other = open_vault(VaultClientConfig(url=vault_stub.url, token=vault_stub.token, timeout=5))
+    check_vault_health(other, max_age=60)
+    assert vault_stub.requests[("GET", "health")] == 3
+
+
+def test_sealed_and_standby(client, vault_stub):
+    vault_stub.standby = True
+    health = check_vault_health(client)
+    assert health.standby and not health.sealed and health.is_live
+
+    vault_stub.sealed = True
+    health = check_vault_health(client)
+    assert health.sealed and not health.is_live
+    with pytest.raises(VaultError, match="sealed"):
+        assert_vault_is_live(client)
+
+
+def test_failed_token_lookup(client):
+    client.token = "revoked"
+    health = check_vault_health(client)
+    assert not health.authenticated and not health.is_live
+    with pytest.raises(VaultError, match="not authenticated"):
+        assert_vault_is_live(client)
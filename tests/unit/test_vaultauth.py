@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from onepassvault.vault import VaultError
+from onepassvault.vaultauth import AppRoleCredentials, TokenManager
+
+
+@pytest.fixture(autouse=True)
+def renewable_token(vault_stub):
+    vault_stub.set_token("t0ken", ttl=60, max_ttl=3600, renewable=True)
+    vault_stub.approle = ("role", "secret")
+
+
+def test_refresh_renews_token(client, vault_stub):
+    manager = TokenManager(client)
+    manager.lookup()
+    assert (manager.ttl, manager.increment, manager.renewable) == (60, 60, True)
+    manager.refresh()
+    assert vault_stub.requests[("POST", "renew")] == 1
+    assert manager.ttl == 60 and client.token == "t0ken"
+
+
+def test_refresh_logs_in_at_max_ttl(client, vault_stub):
+    vault_stub.set_token("t0ken", ttl=60, max_ttl=30, renewable=True)
+    manager = TokenManager(client)
+    manager.lookup()
+    # Renewed for only 30 of the 60s asked, the token is kept without credentials
+    manager.refresh()
+    assert manager.ttl == 30 and client.token == "t0ken"
+
+    manager.approle = AppRoleCredentials("role", "secret")
+    manager.refresh()
+    assert vault_stub.requests[("POST", "login")] == 1
+    assert client.token == vault_stub.token == "approle-token-1"
+    assert manager.ttl == 60
+
+
+def test_refresh_without_renewal_or_credentials(client, vault_stub):
+    vault_stub.set_token("t0ken", ttl=60)
+    manager = TokenManager(client)
+    manager.lookup()
+    with pytest.raises(VaultError):
+        manager.refresh()
+    assert vault_stub.requests[("POST", "renew")] == 0
+
+
+def test_next_delay(client, vault_stub):
+    manager = TokenManager(client, renew_at=0.5, min_interval=5)
+    manager.lookup()
+    assert manager.next_delay() == pytest.approx(30, abs=1)
+    manager.expires_at = time.monotonic() + 10
+    assert manager.next_delay() == 5
+
+    vault_stub.set_token("t0ken")
+    manager.lookup()
+    assert manager.next_delay() is None
+
+
+def test_manager_renews_in_background(client, vault_stub):
+    vault_stub.set_token("t0ken", ttl=2, max_ttl=3600, renewable=True)
+    with TokenManager(client, renew_at=0.25, min_interval=0.1):
+        deadline = time.monotonic() + 5
+        while vault_stub.requests[("POST", "renew")] < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    assert vault_stub.requests[("POST", "renew")] >= 2
@@ -0,0 +1,110 @@
+import pytest
+
+from onepassvault.opw import OnePassword, OpDocument
+from tests.fakes.op import install_fake_op
+
+
+def _item(item_id: str, category: str = "PASSWORD") -> dict:
+    return {
+        "id": item_id,
+        "title": item_id,
+        "version": 1,
+        "category": category,
+        "vault": {"id": "v1", "name": "V"},
+        "fields": [{"id": "password", "label": "password", "type": "CONCEALED", "value": "a"}],
+    }
+
+
+@pytest.fixture
+def op(tmp_path):
+    items = [_item("item1"), _item("item2"), _item("doc1", "DOCUMENT")]
+    items[2]["files"] = [{"id": "file", "name": "doc.txt", "size": 3}]
+    return OnePassword(
+        op_executable=str(install_fake_op(tmp_path, items, {"doc1": b"old"})), fetch_workers=4
+    )
+
+
+def test_unit_of_work_coalesces_updates(op):
+    stale = op.get_item("item1")
+    with op.unit_of_work() as writes:
+        first = writes.get_item("item1")
+        first.set_field_value("password", "b")
+        assert writes.update_item(first).version == 1
+        # Edits the buffered item
+        second = writes.get_item("item1")
+        assert second is first
+        second.add_field("username", "STRING", "admin")
+        writes.update_item(second)
+        # Only the changes made to other copies are merged into it
+        stale.add_field("url", "URL", "https://example.com")
+        assert writes.update_item(stale) is first
+        item2 = writes.get_item("item2")
+        item2.set_field_value("password", "c")
+        writes.update_item(item2)
+        assert len(writes) == 2
+        # Not written until the end of the block
+        assert op.get_item("item1").version == 1
+
+    results = {r.item_id: r for r in writes.results}
+    assert results["item1"].ok and results["item1"].updates == 3
+    updated = op.get_item("item1")
+    assert updated.version == 2
+    assert updated.get_field_value("password") == "b"
+    assert updated.get_field_value("username") == "admin"
+    assert updated.get_field_value("url") == "https://example.com"
+    assert op.get_item("item2").get_field_value("password") == "c"
+
+
+def test_unit_of_work_merges_changes_of_copies(op):
+    item = op.get_item("item1")
+    item.add_field("username", "STRING", "u")
+    item = op.update_item(item)
+    a, b = op.get_item("item1"), op.get_item("item1")
+    with op.unit_of_work() as writes:
+        a.set_field_value("password", "NEW")
+        writes.update_item(a)
+        # b was fetched before a was edited, and changes another field
+        b.set_field_value("username", "admin")
+        writes.update_item(b)
+
+    updated = op.get_item("item1")
+    assert updated.get_field_value("password") == "NEW"
+    assert updated.get_field_value("username") == "admin"
+
+
+def test_units_of_work_are_independent(op):
+    with op.unit_of_work() as first, op.unit_of_work() as second:
+        item1 = first.get_item("item1")
+        item1.set_field_value("password", "b")
+        first.update_item(item1)
+        item2 = op.get_item("item2")
+        item2.set_field_value("password", "c")
+        # Not buffered by either unit of work
+        op.update_item(item2)
+        assert op.get_item("item2").version == 2
+        assert second.get_item("item1") is not item1
+        assert (len(first), len(second)) == (1, 0)
+    assert [r.item_id for r in first.results] == ["item1"] and second.results == []
+
+
+def test_unit_of_work_documents_and_errors(op):
+    document = OpDocument.from_item(op.get_item("doc1"), b"old")
+    missing = op.get_item("item2")
+    missing._data["id"] = "gone"
+    with op.unit_of_work() as writes:
+        writes.update_document(document, b"new", title="Doc")
+        document.set_field_value("password", "b")
+        writes.update_item(document)
+        writes.update_item(missing)
+
+    results = {r.item_id: r for r in writes.results}
+    assert isinstance(results["doc1"].item, OpDocument)
+    assert op.get_document_contents("doc1") == b"new"
+    assert op.get_item("doc1").get_field_value("password") == "b"
+    assert not results["gone"].ok
+
+    with pytest.raises(ValueError):
+        with op.unit_of_work() as writes:
+            writes.update_item(op.get_item("item1"))
+            raise ValueError
+    assert writes.results == [] and op.get_item("item1").version == 1